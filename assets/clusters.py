@@ -0,0 +1,269 @@
+"""
+خوشه‌های وابستگی: مؤلفه‌های همبند ضعیف گراف روابط، یک بار برای همه‌ی روابط (scope="") و
+اختیاری برای هر key رابطه.
+
+- محاسبه‌ی کامل: یک پیمایش روی لیست یال‌ها با union-find (ادغام بر اساس اندازه + نصف‌کردن مسیر)
+  روی آرایه‌های عددی و بعد جایگزینی ردیف‌های همان scope در یک تراکنش.
+- افزودن یال: در همان تراکنش نوشتن، خوشه‌های دو سر ادغام می‌شوند (عضوهای خوشه‌ی کوچک‌تر منتقل می‌شوند).
+- حذف یال: ادغام برگشت‌پذیر نیست؛ خوشه dirty می‌شود و در پس‌زمینه فقط همان مؤلفه دوباره تقسیم می‌شود.
+"""
+import uuid
+from array import array
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from core.jobs import start_job
+from assets.models import AssetRelation, DependencyCluster, UnitCluster, Relation
+
+CLUSTER_JOB_KIND = "compute_clusters"
+SPLIT_JOB_KIND = "split_clusters"
+WRITE_BATCH = 5000
+ALL_RELATIONS = ""
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = array("i")
+        self.size = array("i")
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+def _lock_scope(scope):
+    """
+    قفل advisory در سطح تراکنش برای یک scope: ادغام، تقسیم و محاسبه‌ی کامل خوشه‌های یک scope پشت سر هم
+    اجرا می‌شوند تا عضویت‌هایی که خوانده‌ایم تا پایان تراکنش معتبر بمانند.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"{CLUSTER_JOB_KIND}:{scope}"])
+
+
+def _edges(scope, source_ids=None):
+    qs = AssetRelation.objects.filter(
+        source_asset__pending_deletion=False, source_asset__asset__pending_deletion=False,
+        target_asset__pending_deletion=False, target_asset__asset__pending_deletion=False,
+    )
+    if scope:
+        qs = qs.filter(relation__key=scope)
+    if source_ids is not None:
+        qs = qs.filter(source_asset_id__in=source_ids)
+    return qs.order_by().values_list("source_asset_id", "target_asset_id").iterator(chunk_size=20000)
+
+
+def _components(edges):
+    """لیست مؤلفه‌ها (هر کدام لیست unit_id) با حداقل دو عضو"""
+    uf, index, ids = UnionFind(), {}, []
+    for s, t in edges:
+        for node in (s, t):
+            if node not in index:
+                index[node] = uf.add()
+                ids.append(node)
+        uf.union(index[s], index[t])
+
+    groups = defaultdict(list)
+    for i, node in enumerate(ids):
+        groups[uf.find(i)].append(node)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def _write_members(scope, cluster_id, unit_ids):
+    UnitCluster.objects.bulk_create(
+        [UnitCluster(scope=scope, unit_id=u, cluster_id=cluster_id) for u in unit_ids], batch_size=WRITE_BATCH
+    )
+
+
+def compute_clusters(scope=ALL_RELATIONS, job=None):
+    components = _components(_edges(scope))
+    if job is not None:
+        job.report(total=sum(len(c) for c in components))
+
+    clusters = [DependencyCluster(id=uuid.uuid4(), scope=scope, size=len(c)) for c in components]
+    processed = 0
+    with transaction.atomic():
+        _lock_scope(scope)
+        UnitCluster.objects.filter(scope=scope).delete()
+        DependencyCluster.objects.filter(scope=scope).delete()
+        DependencyCluster.objects.bulk_create(clusters, batch_size=WRITE_BATCH)
+        for cluster, members in zip(clusters, components):
+            _write_members(scope, cluster.pk, members)
+            processed += len(members)
+            if job is not None and processed % WRITE_BATCH < len(members):
+                job.report(processed=processed)
+    return {"scope": scope, "clusters": len(clusters), "units": processed}
+
+
+def split_cluster(cluster):
+    """بازمحاسبه‌ی یک خوشه‌ی dirty فقط از روی یال‌های بین اعضای خودش"""
+    with transaction.atomic():
+        _lock_scope(cluster.scope)
+        cluster = DependencyCluster.objects.select_for_update().filter(pk=cluster.pk, dirty=True).first()
+        if cluster is None:
+            return 0
+        members = UnitCluster.objects.filter(cluster=cluster).values("unit_id")
+        components = sorted(_components(_edges(cluster.scope, source_ids=members)), key=len, reverse=True)
+
+        # بزرگ‌ترین تکه id خوشه را نگه می‌دارد تا ارجاع‌های بیرونی پایدار بمانند
+        UnitCluster.objects.filter(cluster=cluster).delete()
+        if not components:
+            cluster.delete()
+            return 0
+        cluster.size, cluster.dirty = len(components[0]), False
+        cluster.save(update_fields=["size", "dirty", "updated_at"])
+        _write_members(cluster.scope, cluster.pk, components[0])
+        for members in components[1:]:
+            piece = DependencyCluster.objects.create(scope=cluster.scope, size=len(members))
+            _write_members(cluster.scope, piece.pk, members)
+        return len(components)
+
+
+def split_dirty_clusters(job=None):
+    dirty = list(DependencyCluster.objects.filter(dirty=True).order_by("-size"))
+    if job is not None:
+        job.report(total=len(dirty))
+    pieces = 0
+    for done, cluster in enumerate(dirty, start=1):
+        pieces += split_cluster(cluster)
+        if job is not None:
+            job.report(processed=done)
+    return {"clusters": len(dirty), "pieces": pieces}
+
+
+def _split_job(job):
+    return split_dirty_clusters(job=job)
+
+
+def _compute_job(job, scope=ALL_RELATIONS):
+    return compute_clusters(scope, job=job)
+
+
+def schedule_cluster_compute(scope=ALL_RELATIONS, owner=None):
+    return start_job(CLUSTER_JOB_KIND, _compute_job, params={"scope": scope}, owner=owner)
+
+
+def schedule_cluster_split():
+    return start_job(SPLIT_JOB_KIND, _split_job)
+
+
+def computed_scopes():
+    return list(DependencyCluster.objects.values_list("scope", flat=True).distinct())
+
+
+# ===== به‌روزرسانی افزایشی (سمت نوشتن روابط)
+
+def _maintained_scopes(relation_ids):
+    """scope هایی که محاسبه شده‌اند و این یال‌ها رویشان اثر دارند"""
+    keys = dict(Relation.objects.filter(pk__in=set(relation_ids)).values_list("pk", "key"))
+    present = set(
+        DependencyCluster.objects.filter(scope__in=[ALL_RELATIONS, *keys.values()])
+        .values_list("scope", flat=True).distinct()
+    )
+    return {str(pk): key for pk, key in keys.items() if key in present}, ALL_RELATIONS in present
+
+
+def _by_scope(edges):
+    edges = list(edges)
+    if not edges:
+        return {}
+    keys, all_present = _maintained_scopes(r for _, _, r in edges)
+    grouped = defaultdict(list)
+    for s, t, r in edges:
+        if all_present:
+            grouped[ALL_RELATIONS].append((s, t))
+        if r in keys:
+            grouped[keys[r]].append((s, t))
+    return grouped
+
+
+def _merge(scope, edges):
+    # قبل از خواندن عضویت‌ها؛ وگرنه ادغام/تقسیم هم‌زمان ممکن است خوشه‌ای را که خوانده‌ایم حذف کند
+    # یا دو نوشتن یک یونیت بی‌خوشه را هم‌زمان به دو خوشه‌ی جدید اضافه کنند
+    _lock_scope(scope)
+    unit_ids = {u for e in edges for u in e}
+    memberships = dict(
+        UnitCluster.objects.filter(scope=scope, unit_id__in=unit_ids).values_list("unit_id", "cluster_id")
+    )
+    clusters = {
+        c.pk: c for c in DependencyCluster.objects.select_for_update()
+        .filter(pk__in=set(memberships.values())).order_by("pk")
+    }
+    # عضویتی که خوشه‌اش دیگر وجود ندارد بی‌خوشه حساب می‌شود
+    memberships = {str(u): c for u, c in memberships.items() if c in clusters}
+
+    # union-find محلی روی «خوشه‌های موجود + یونیت‌های بی‌خوشه»
+    uf, index, items = UnionFind(), {}, []
+
+    def node(unit):
+        item = ("c", memberships[unit]) if unit in memberships else ("u", unit)
+        if item not in index:
+            index[item] = uf.add()
+            items.append(item)
+        return index[item]
+
+    for s, t in edges:
+        uf.union(node(s), node(t))
+
+    groups = defaultdict(list)
+    for i, item in enumerate(items):
+        groups[uf.find(i)].append(item)
+
+    for group in groups.values():
+        existing = sorted((clusters[c] for kind, c in group if kind == "c"), key=lambda c: c.size, reverse=True)
+        loose = [u for kind, u in group if kind == "u"]
+        if existing:
+            target, absorbed = existing[0], existing[1:]
+        else:
+            target, absorbed = DependencyCluster.objects.create(scope=scope, size=0), []
+        if absorbed:
+            # عضوهای خوشه‌های کوچک‌تر به خوشه‌ی بزرگ‌تر منتقل می‌شوند
+            UnitCluster.objects.filter(cluster__in=absorbed).update(cluster=target)
+            DependencyCluster.objects.filter(pk__in=[c.pk for c in absorbed]).delete()
+        _write_members(scope, target.pk, loose)
+        added = sum(c.size for c in absorbed) + len(loose)
+        dirty = target.dirty or any(c.dirty for c in absorbed)
+        if added or dirty != target.dirty:
+            DependencyCluster.objects.filter(pk=target.pk).update(size=F("size") + added, dirty=dirty)
+
+
+def clusters_edges_changed(added=(), removed=()):
+    """
+    باید داخل تراکنش نوشتن یال‌ها صدا زده شود. added/removed: سه‌تایی (source, target, relation).
+    """
+    # قفل scope ها همیشه به یک ترتیب گرفته می‌شود تا دو نوشتن هم‌زمان بن‌بست نسازند
+    for scope, edges in sorted(_by_scope(added).items()):
+        _merge(scope, [(s, t) for s, t in edges if s != t])
+
+    removed_by_scope = _by_scope(removed)
+    if removed_by_scope:
+        for scope, edges in removed_by_scope.items():
+            mark_units_dirty({u for e in edges for u in e}, scope)
+        schedule_cluster_split()
+
+
+def mark_units_dirty(unit_ids, scope=None):
+    """unit_ids: iterable یا queryset از شناسه‌ها"""
+    qs = DependencyCluster.objects.filter(members__unit_id__in=unit_ids)
+    if scope is not None:
+        qs = qs.filter(scope=scope)
+    return DependencyCluster.objects.filter(pk__in=qs.values("pk"), dirty=False).update(dirty=True)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F
+
+from assets.models import Asset, AssetUnit
+from assets.dashboard import bump_inventory_version
+
+
+class UnitCounterDeltas:
+    """
+    جمع تغییرات شمارنده‌های یونیت هر دارایی؛ در پایان با یک UPDATE برای هر دارایی
+    (در همان تراکنشی که یونیت‌ها نوشته شده‌اند) روی Asset اعمال می‌شود.
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: [0, 0, 0])  # asset_id -> [total, registered, active]
+
+    def add(self, unit, sign=1):
+        d = self._deltas[unit.asset_id]
+        d[0] += sign
+        d[1] += sign if unit.is_registered else 0
+        d[2] += sign if unit.is_active else 0
+
+    def remove(self, unit):
+        self.add(unit, sign=-1)
+
+    def registration(self, asset_id, delta):
+        self._deltas[asset_id][1] += delta
+
+    def apply(self):
+        changed = False
+        # ترتیب ثابت قفل‌ها تا دو تراکنش هم‌زمان روی دارایی‌های مشترک deadlock نکنند
+        for asset_id in sorted(self._deltas, key=str):
+            total, registered, active = self._deltas[asset_id]
+            if not (total or registered or active):
+                continue
+            Asset.objects.filter(pk=asset_id).update(
+                unit_count=F("unit_count") + total,
+                registered_unit_count=F("registered_unit_count") + registered,
+                active_unit_count=F("active_unit_count") + active,
+            )
+            changed = True
+        self._deltas.clear()
+        if changed:
+            bump_inventory_version()
+
+
+def units_added(units):
+    deltas = UnitCounterDeltas()
+    for unit in units:
+        deltas.add(unit)
+    deltas.apply()
+
+
+def units_removed(units):
+    deltas = UnitCounterDeltas()
+    for unit in units:
+        deltas.remove(unit)
+    deltas.apply()
+
+
+def registration_changed(asset_id, delta):
+    if delta:
+        deltas = UnitCounterDeltas()
+        deltas.registration(asset_id, delta)
+        deltas.apply()
+
+
+_RECONCILE_SQL = """
+    UPDATE {asset} AS a
+       SET unit_count = c.total,
+           registered_unit_count = c.registered,
+           active_unit_count = c.active
+      FROM (
+            SELECT a2.id,
+                   COUNT(u.id) AS total,
+                   COUNT(u.id) FILTER (WHERE u.is_registered) AS registered,
+                   COUNT(u.id) FILTER (WHERE u.is_active) AS active
+              FROM {asset} AS a2
+              LEFT JOIN {unit} AS u ON u.asset_id = a2.id AND NOT u.pending_deletion
+             {where}
+             GROUP BY a2.id
+           ) AS c
+     WHERE a.id = c.id
+       AND (a.unit_count, a.registered_unit_count, a.active_unit_count)
+           IS DISTINCT FROM (c.total, c.registered, c.active)
+    RETURNING a.id
+"""
+
+
+def reconcile_unit_counters(asset_ids=None):
+    """
+    شمارنده‌ها را از روی خود یونیت‌ها دوباره می‌شمارد و فقط دارایی‌هایی را که
+    اختلاف دارند اصلاح می‌کند؛ تعداد دارایی‌های اصلاح‌شده را برمی‌گرداند.
+    """
+    sql = _RECONCILE_SQL.format(
+        asset=Asset._meta.db_table,
+        unit=AssetUnit._meta.db_table,
+        where="WHERE a2.id = ANY(%s::uuid[])" if asset_ids is not None else "",
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [[str(pk) for pk in asset_ids]] if asset_ids is not None else [])
+        fixed = cursor.rowcount
+    if fixed:
+        bump_inventory_version()
+    return fixed
@@ -0,0 +1,210 @@
+"""
+ایمپورت گروهی روابط از CSV روی همان ImportSession / ImportIssue.
+
+هر سطر: مبدأ (code یا label، اختیاری با عنوان دارایی)، مقصد (همین‌طور)، key رابطه و تاریخ‌ها.
+به‌جای یک کوئری برای هر ارجاع، همه‌ی code ها، label ها و key ها یک‌جا جمع و با کوئری‌های IN
+(در تکه‌های LOOKUP_CHUNK تایی) حل می‌شوند؛ بعد یال‌ها با bulk_create در دسته‌ها نوشته می‌شوند
+و سطرهای حل‌نشده به‌صورت ImportIssue (باز هم با bulk_create) ثبت می‌شوند.
+
+نوشتن یال‌ها همه یا هیچ است (یک تراکنش)؛ session قبل از زمان‌بندی کار به COMMITTING می‌رود و در پایان،
+موفق یا ناموفق، issue ها و وضعیت نهایی (COMMITTED / FAILED) ثبت می‌شوند. FAILED دوباره قابل اجراست.
+"""
+from typing import Dict, List
+
+from django.db import transaction
+
+from assets.models import AssetUnit, AssetRelation, Relation, ImportSession, ImportIssue
+from assets.relation_changes import relations_changed, relations_bulk_loaded
+from core.jobs import start_job
+from core.models import BackgroundJob
+from .utils import iter_csv_rows, normalize_str, parse_date_flex
+
+RELATION_IMPORT_JOB_KIND = "relation_import"
+LOOKUP_CHUNK = 5000
+WRITE_BATCH = 5000
+# بیش از این تعداد یال، به‌جای ثبت تک‌تک تغییرات ایندکس گراف و خوشه‌ها از نو ساخته می‌شوند
+GRAPH_LOG_LIMIT = 10000
+
+# ستون‌های قابل مپ؛ برای هر طرف حداقل یکی از code / label لازم است
+RELATION_COMMITTABLE_STATES = (ImportSession.State.MAPPED, ImportSession.State.EDITED, ImportSession.State.FAILED)
+
+COLUMN_KEYS = (
+    "source_code", "source_label", "source_asset",
+    "target_code", "target_label", "target_asset",
+    "relation", "start_date", "end_date", "note",
+)
+
+
+def _chunks(items, size=LOOKUP_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class RelationImportService:
+    def __init__(self, session: ImportSession, user=None, job=None):
+        self.session = session
+        self.user = user
+        self.job = job
+        self.cols = session.column_map or {}
+        self.issues: List[ImportIssue] = []
+
+    def _cell(self, row, key):
+        col = self.cols.get(key)
+        return normalize_str(row.get(col)) if col else None
+
+    def _ref(self, row, side):
+        return (self._cell(row, f"{side}_code"), self._cell(row, f"{side}_label"), self._cell(row, f"{side}_asset"))
+
+    # ----- حل ارجاع‌ها با کوئری‌های مجموعه‌ای
+    def _resolve(self, refs, keys):
+        codes = {code for code, _, _ in refs if code}
+        labels = {label for code, label, _ in refs if not code and label}
+
+        by_code: Dict[str, str] = {}
+        for chunk in _chunks(codes):
+            by_code.update((c, str(pk)) for pk, c in AssetUnit.objects.filter(code__in=chunk).values_list("pk", "code"))
+
+        by_label: Dict[str, List[tuple]] = {}
+        for chunk in _chunks(labels):
+            for pk, label, asset_title in AssetUnit.objects.filter(label__in=chunk) \
+                    .values_list("pk", "label", "asset__title"):
+                by_label.setdefault(label, []).append((str(pk), asset_title))
+
+        relations = dict(Relation.objects.filter(key__in=keys).values_list("key", "pk"))
+        return by_code, by_label, {k: str(pk) for k, pk in relations.items()}
+
+    @staticmethod
+    def _lookup(ref, by_code, by_label):
+        """(unit_id, کد خطا)"""
+        code, label, asset = ref
+        if code:
+            return (by_code[code], None) if code in by_code else (None, "NOT_FOUND")
+        if not label:
+            return None, "EMPTY"
+        candidates = [pk for pk, title in by_label.get(label, []) if asset is None or title == asset]
+        if not candidates:
+            return None, "NOT_FOUND"
+        if len(candidates) > 1:
+            return None, "AMBIGUOUS"
+        return candidates[0], None
+
+    def run(self) -> Dict[str, int]:
+        s = self.session
+        s.issues.all().delete()
+        stats = dict(relations_created=0, rows_skipped=0, errors=0, warnings=0)
+        state = ImportSession.State.FAILED
+        try:
+            self._import(stats)
+            state = ImportSession.State.COMMITTED
+        finally:
+            # حتی با شکست کار، خطاهای تشخیص‌داده‌شده و وضعیت نهایی ذخیره شوند
+            ImportIssue.objects.bulk_create(self.issues, batch_size=WRITE_BATCH)
+            s.state = state
+            s.save(update_fields=["state"])
+        return stats
+
+    def _import(self, stats):
+        s = self.session
+
+        rows = [
+            (idx, self._ref(row, "source"), self._ref(row, "target"), self._cell(row, "relation"),
+             self._cell(row, "start_date"), self._cell(row, "end_date"), self._cell(row, "note"))
+            for idx, row in iter_csv_rows(s.file, delimiter=s.delimiter, has_header=s.has_header)
+            if idx != "__headers__"
+        ]
+        if self.job is not None:
+            self.job.report(total=len(rows))
+
+        by_code, by_label, relations = self._resolve(
+            [r[1] for r in rows] + [r[2] for r in rows], {r[3] for r in rows if r[3]}
+        )
+
+        candidates = []
+        for idx, source_ref, target_ref, key, start_raw, end_raw, note in rows:
+            source_id, source_err = self._lookup(source_ref, by_code, by_label)
+            target_id, target_err = self._lookup(target_ref, by_code, by_label)
+            failed = False
+            for ref, err, side, prefix in ((source_ref, source_err, "یونیت مبدأ", "SOURCE"),
+                                           (target_ref, target_err, "یونیت مقصد", "TARGET")):
+                if err:
+                    self._issue(idx, ref, code=f"{prefix}_{err}", msg=f"{side} ({ref[0] or ref[1] or '-'}) حل نشد: {err}")
+                    failed = True
+            if key not in relations:
+                self._issue(idx, source_ref, code="RELATION_NOT_FOUND", msg=f"رابطه با key={key} یافت نشد")
+                failed = True
+            try:
+                start_date, end_date = parse_date_flex(start_raw), parse_date_flex(end_raw)
+            except ValueError as e:
+                self._issue(idx, source_ref, code="DATE_INVALID", msg=str(e))
+                failed = True
+            else:
+                if start_date and end_date and end_date < start_date:
+                    self._issue(idx, source_ref, code="DATE_RANGE_INVALID", msg="تاریخ پایان قبل از تاریخ شروع است")
+                    failed = True
+            if failed:
+                stats["errors"] += 1
+                continue
+            candidates.append((idx, source_ref, (source_id, target_id, relations[key], start_date, end_date), note))
+
+        # تکراری‌ها: داخل همین فایل و یال‌های موجود (یک کوئری IN برای هر تکه از مبدأها)
+        existing = set()
+        for chunk in _chunks({c[2][0] for c in candidates}):
+            for src, tgt, rel, start, end in AssetRelation.objects.filter(source_asset_id__in=chunk) \
+                    .values_list("source_asset_id", "target_asset_id", "relation_id", "start_date", "end_date"):
+                existing.add((str(src), str(tgt), str(rel), start, end))
+
+        to_create, seen = [], set()
+        for idx, source_ref, edge, note in candidates:
+            if edge in seen or edge in existing:
+                self._issue(idx, source_ref, level=ImportIssue.Level.WARN,
+                            code="DUPLICATE_ROW_SKIPPED" if edge in seen else "RELATION_EXISTS_SKIPPED",
+                            msg="این رابطه قبلاً ثبت شده است؛ سطر نادیده گرفته شد.")
+                stats["rows_skipped"] += 1
+                stats["warnings"] += 1
+                continue
+            seen.add(edge)
+            source_id, target_id, relation_id, start_date, end_date = edge
+            to_create.append(AssetRelation(
+                source_asset_id=source_id, target_asset_id=target_id, relation_id=relation_id,
+                start_date=start_date, end_date=end_date, note=note, owner=self.user,
+            ))
+
+        # همه یا هیچ: شکست وسط کار هیچ یالی باقی نمی‌گذارد و session قابل تکرار می‌ماند
+        created = 0
+        with transaction.atomic():
+            for batch in _chunks(to_create, WRITE_BATCH):
+                AssetRelation.objects.bulk_create(batch)
+                if len(to_create) <= GRAPH_LOG_LIMIT:
+                    relations_changed(added=batch)
+                created += len(batch)
+                if self.job is not None:
+                    self.job.report(processed=created)
+            if len(to_create) > GRAPH_LOG_LIMIT:
+                relations_bulk_loaded()
+        stats["relations_created"] = created
+
+    def _issue(self, idx, ref, *, code, msg, level=ImportIssue.Level.ERROR):
+        code_ref, label, asset = ref
+        self.issues.append(ImportIssue(
+            session=self.session, row_index=idx, asset_ref=asset,
+            unit_label=code_ref or label, code=code, message=msg, level=level,
+        ))
+
+
+def _relation_import_job(job, session_id):
+    session = ImportSession.objects.get(pk=session_id)
+    stats = RelationImportService(session, user=session.created_by, job=job).run()
+    return {**stats, "issues_count": session.issues.count()}
+
+
+def relation_import_orphaned(session):
+    """COMMITTING ای که کارش دیگر در صف/اجرا نیست (مثلاً با ری‌استارت و reap_stale_jobs از بین رفته)"""
+    return session.state == ImportSession.State.COMMITTING and not BackgroundJob.objects.filter(
+        kind=RELATION_IMPORT_JOB_KIND, params__session_id=str(session.pk),
+        state__in=[BackgroundJob.State.PENDING, BackgroundJob.State.RUNNING],
+    ).exists()
+
+
+def schedule_relation_import(session, owner=None):
+    return start_job(RELATION_IMPORT_JOB_KIND, _relation_import_job, params={"session_id": str(session.pk)}, owner=owner)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from .relations import COLUMN_KEYS
+
 
 class CsvUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
@@ -21,6 +23,24 @@ class CsvMappingSerializer(serializers.Serializer):
     attribute_map = serializers.DictField(child=serializers.UUIDField(), required=False, allow_empty=True)
 
 
+class RelationCsvMappingSerializer(serializers.Serializer):
+    session_id = serializers.UUIDField()
+    # {"source_code": "col", "source_label": "col", "source_asset": "col", "target_...": ..., "relation": "col",
+    #  "start_date": "col", "end_date": "col", "note": "col"}
+    column_map = serializers.DictField(child=serializers.CharField())
+
+    def validate_column_map(self, value):
+        unknown = set(value) - set(COLUMN_KEYS)
+        if unknown:
+            raise serializers.ValidationError(f"کلیدهای نامعتبر: {', '.join(sorted(unknown))}")
+        if "relation" not in value:
+            raise serializers.ValidationError("ستون relation الزامی است.")
+        for side in ("source", "target"):
+            if not (value.get(f"{side}_code") or value.get(f"{side}_label")):
+                raise serializers.ValidationError(f"برای {side} یکی از ستون‌های code یا label الزامی است.")
+        return value
+
+
 class CsvCommitSerializer(serializers.Serializer):
     session_id = serializers.UUIDField()
 
@@ -39,6 +59,12 @@ class CsvListRowsQuerySerializer(serializers.Serializer):
     page_size = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
 
 
+class CsvSessionIssuesQuerySerializer(serializers.Serializer):
+    level = serializers.ChoiceField(choices=("error", "warn"), required=False)
+    page = serializers.IntegerField(required=False, min_value=1, default=1)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
+
+
 class CsvApplyEditsSerializer(serializers.Serializer):
     session_id = serializers.UUIDField()
     # edits: [{"row_index": 12, "values": {"colA":"...", "colB":"..."}}]
@@ -5,8 +5,11 @@ from rest_framework import serializers
 
 from assets.models import (
     Asset, AssetUnit, Attribute, AssetAttributeValue,
-    ImportSession, ImportIssue, AssetTypeAttribute
+    ImportSession, ImportIssue
 )
+from assets.rules import get_asset_rules
+from assets.counters import units_added
+from assets.history import record_value_changes
 from .utils import iter_csv_rows, normalize_str, coerce_value_for_attribute
 
 
@@ -67,7 +70,7 @@ class CsvImportService:
                 stats["warnings"] += 1
                 continue
 
-            if AssetUnit.objects.filter(asset=asset, label=unit_label).only("id").exists():
+            if AssetUnit.objects.of_asset(asset.pk).filter(label=unit_label).only("id").exists():
                 self._issue(idx, asset_ref, unit_label, asset=asset, level=ImportIssue.Level.WARN,
                             code="UNIT_ALREADY_EXISTS_SKIPPED",
                             msg="برای این دارایی، یونیتی با این label از قبل وجود دارد. سطر نادیده گرفته شد.")
@@ -82,18 +85,11 @@ class CsvImportService:
                 stats["units_created"] += 1
                 seen.add(key)
 
-                asset_attr_ids = set(
-                    str(pk) for pk in AssetTypeAttribute.objects.filter(asset=asset)
-                    .values_list("attribute_id", flat=True)
-                )
+                rules = get_asset_rules(asset.pk)
+                asset_attr_ids = set(rules.by_attribute.keys())
 
                 # ✅ پیدا کردن خصیصه‌های الزامی
-                required_attrs = Attribute.objects.filter(
-                    id__in=AssetTypeAttribute.objects.filter(
-                        asset=asset,
-                        is_required=True
-                    ).values_list("attribute_id", flat=True)
-                )
+                required_attrs = [r for r in rules if r.is_required]
                 # ✅ نگاشت خصیصه‌ها
                 effective_map = dict(s.attribute_map) if s.attribute_map else {}
                 if not effective_map:
@@ -116,7 +112,7 @@ class CsvImportService:
                 for ra in required_attrs:
                     raw_val = None
                     for col, attr_id in effective_map.items():
-                        if attr_id == str(ra.id):
+                        if attr_id == ra.attribute_id:
                             raw_val = row.get(col)
                             break
                     if raw_val is None or str(raw_val).strip() == "":
@@ -131,8 +127,10 @@ class CsvImportService:
                 else:
                     unit.is_registered = True
                     unit.save(update_fields=["is_registered"])
+                units_added([unit])
 
                 # ✅ ساخت AAVها حتی اگر ناقص باشد
+                created_values = []
                 for col, attr_id in effective_map.items():
                     raw_val = row.get(col, None)
                     if raw_val is None or str(raw_val).strip() == "":
@@ -149,8 +147,8 @@ class CsvImportService:
                         attribute = self.attr_cache.get(attr_id) or Attribute.objects.get(pk=attr_id)
                         self.attr_cache.setdefault(attr_id, attribute)
 
-                        payload = coerce_value_for_attribute(attribute, raw_val)
-                        AssetAttributeValue.objects.create(
+                        _, payload, _ = coerce_value_for_attribute(attribute, raw_val)
+                        created_values.append(AssetAttributeValue.objects.create(
                             asset=asset,
                             unit=unit,
                             attribute=attribute,
@@ -160,8 +158,9 @@ class CsvImportService:
                             value_bool=payload.get("value_bool"),
                             value_date=payload.get("value_date"),
                             choice=payload.get("choice"),
+                            value_list=payload.get("value_list"),
                             owner=self.user if hasattr(AssetAttributeValue, "owner") else None,
-                        )
+                        ))
                         stats["values_created"] += 1
                     except Attribute.DoesNotExist:
                         self._issue(idx, asset_ref, unit_label, asset=asset, unit=unit,
@@ -173,6 +172,8 @@ class CsvImportService:
                                     msg=f"خصیصه '{getattr(attribute, 'title', '?')}': {getattr(e, 'detail', e)}")
                         stats["errors"] += 1
 
+                record_value_changes(created=created_values)
+
         s.state = ImportSession.State.COMMITTED
         s.save(update_fields=["state"])
         return stats
@@ -7,7 +7,6 @@ from typing import Iterator, Tuple, Dict, Any
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import calendar
-import json
 
 
 PERSIAN_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
@@ -157,12 +156,12 @@ def coerce_value_for_attribute(attribute, raw):
                 f"مقادیر نامعتبر: {', '.join(invalid_parts)} | مقادیر مجاز: {', '.join(valid_choices)}"
             )
 
-        return True, {"choice": json.dumps(parts)}, None
+        return True, {"value_list": parts}, None
 
     if p == attribute.PropertyType.TAGS:
         # آزاد، بدون ولیدیشن
         parts = [x.strip() for x in re.split(r"[|,،]", s) if x.strip()]
-        return True, {"choice": json.dumps(parts)}, None
+        return True, {"value_list": parts}, None
 
     # پیش‌فرض (string معمولی)
     return True, {"value_str": s}, None
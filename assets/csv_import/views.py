@@ -2,13 +2,17 @@ from rest_framework.views import APIView
 from rest_framework import status
 from drf_spectacular.utils import extend_schema
 
+from django.db import transaction
+
 from core.utils import CustomResponse
 
-from assets.models import Attribute, ImportSession
+from assets.models import Attribute, ImportSession, ImportIssue
 from .serializers import CsvUploadSerializer, CsvMappingSerializer, CsvCommitSerializer, CsvEditRowsSerializer,\
-                          CsvListRowsQuerySerializer, CsvApplyEditsSerializer
+                          CsvListRowsQuerySerializer, CsvApplyEditsSerializer, RelationCsvMappingSerializer, \
+                          CsvSessionIssuesQuerySerializer
 from .utils import iter_csv_rows, read_csv_all, write_csv_all, overwrite_session_file
 from .services import CsvImportService
+from .relations import schedule_relation_import, relation_import_orphaned, RELATION_COMMITTABLE_STATES
 
 
 class CsvUploadView(APIView):
@@ -84,12 +88,103 @@ class CsvMappingView(APIView):
         session.asset_column = asset_column
         session.unit_label_column = unit_label_column
         session.attribute_map = {c: str(aid) for c, aid in attr_map.items()}
+        session.kind = ImportSession.Kind.UNITS
+        session.state = ImportSession.State.MAPPED
+        session.save(update_fields=["asset_column", "unit_label_column", "attribute_map", "kind", "state"])
+
+        return CustomResponse.success("مپینگ ثبت شد", {"session_id": str(session.id)})
+
+
+class RelationCsvMappingView(APIView):
+    queryset = ImportSession.objects.all()
+    """
+    مپینگ ستون‌های فایل بارگذاری‌شده برای ایمپورت روابط (session از همان csv/upload/preview/)
+    """
+    @extend_schema(request=RelationCsvMappingSerializer, responses=None)
+    def post(self, request):
+        ser = RelationCsvMappingSerializer(data=request.data)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        session = ImportSession.objects.filter(pk=ser.validated_data["session_id"]).first()
+        if not session:
+            return CustomResponse.error('داده مورد نظر یافت نشد')
+        if session.state in [ImportSession.State.COMMITTING, ImportSession.State.COMMITTED]:
+            return CustomResponse.error("این ایمپورت در حال اجرا است یا قبلاً ثبت شده است",
+                                        status=status.HTTP_409_CONFLICT)
+
+        column_map = ser.validated_data["column_map"]
+        missing = [col for col in column_map.values() if col not in session.headers]
+        if missing:
+            return CustomResponse.error(f"ستون‌های {', '.join(missing)} در هدر CSV پیدا نشد",
+                                        status=status.HTTP_400_BAD_REQUEST)
+
+        session.kind = ImportSession.Kind.RELATIONS
+        session.column_map = column_map
         session.state = ImportSession.State.MAPPED
-        session.save(update_fields=["asset_column", "unit_label_column", "attribute_map", "state"])
+        session.save(update_fields=["kind", "column_map", "state"])
 
         return CustomResponse.success("مپینگ ثبت شد", {"session_id": str(session.id)})
 
 
+class RelationCsvCommitView(APIView):
+    queryset = ImportSession.objects.all()
+    """
+    اجرای ایمپورت روابط در پس‌زمینه؛ پیشرفت و نتیجه از jobs/<id>/ و خطاها از csv/sessions/<id>/issues/
+    """
+    @extend_schema(request=CsvCommitSerializer, responses=None)
+    def post(self, request):
+        ser = CsvCommitSerializer(data=request.data)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # قفل ردیف session تا دو درخواست هم‌زمان دو کار ایمپورت نسازند
+            session = ImportSession.objects.select_for_update().filter(pk=ser.validated_data["session_id"]).first()
+            if not session:
+                return CustomResponse.error('داده مورد نظر یافت نشد')
+            if session.kind != ImportSession.Kind.RELATIONS:
+                return CustomResponse.error("ابتدا مپینگ روابط را تکمیل کنید", status=status.HTTP_400_BAD_REQUEST)
+            if session.state not in RELATION_COMMITTABLE_STATES and not relation_import_orphaned(session):
+                return CustomResponse.error("این ایمپورت در حال اجرا است یا قبلاً ثبت شده است",
+                                            status=status.HTTP_409_CONFLICT)
+            session.state = ImportSession.State.COMMITTING
+            session.save(update_fields=["state"])
+            job = schedule_relation_import(session, owner=request.user)
+        return CustomResponse.success("ایمپورت روابط در صف اجرا قرار گرفت",
+                                      {"session_id": str(session.id), "job": str(job.pk)},
+                                      status=status.HTTP_202_ACCEPTED)
+
+
+class CsvSessionIssuesView(APIView):
+    queryset = ImportIssue.objects.all()
+    """
+    خطاهای یک ImportSession (صفحه‌بندی‌شده)؛ برای ایمپورت روابط که issue ها به یونیت وصل نیستند
+    """
+    @extend_schema(parameters=[CsvSessionIssuesQuerySerializer], responses=None)
+    def get(self, request, pk):
+        ser = CsvSessionIssuesQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        page, page_size = ser.validated_data["page"], ser.validated_data["page_size"]
+
+        qs = ImportIssue.objects.filter(session_id=pk).order_by("row_index")
+        if ser.validated_data.get("level"):
+            qs = qs.filter(level=ser.validated_data["level"])
+        total = qs.count()
+        start = (page - 1) * page_size
+        items = list(qs[start:start + page_size].values(
+            "row_index", "level", "code", "message", "asset_ref", "unit_label"
+        ))
+
+        return CustomResponse.success("لیست خطاها", {
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "items": items,
+        })
+
+
 class CsvCommitView(APIView):
     @extend_schema(request=CsvCommitSerializer, responses=None)
     def post(self, request):
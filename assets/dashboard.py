@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_version, bump_version_on_commit
+from assets.models import Asset
+
+INVENTORY_VERSION_KEY = "inventory_version"
+DASHBOARD_DATA_KEY = "asset_dashboard:v{version}"
+DASHBOARD_LOCK_KEY = "asset_dashboard:v{version}:lock"
+DASHBOARD_TIMEOUT = getattr(settings, "ASSET_DASHBOARD_CACHE_TIMEOUT", 60 * 60 * 24)
+DASHBOARD_LOCK_TIMEOUT = 30
+DASHBOARD_WAIT = (0.05, 40)  # (فاصله، تعداد) انتظار برای ساخته‌شدن توسط درخواست دیگر
+
+
+def bump_inventory_version():
+    """هر تغییری در دارایی‌ها یا شمارنده‌های یونیت، نسخه‌ی داشبورد را بعد از commit بالا می‌برد"""
+    bump_version_on_commit(INVENTORY_VERSION_KEY)
+
+
+def inventory_etag(version):
+    return f'"inventory-{version}"'
+
+
+def build_dashboard():
+    qs = (
+        Asset.objects
+        .values("id", "title", "asset_type", "unit_count", "registered_unit_count", "active_unit_count")
+        .order_by("asset_type", "title")
+    )
+    grouped = {}
+    for row in qs:
+        row["id"] = str(row["id"])
+        grouped.setdefault(row.pop("asset_type"), []).append(row)
+    return grouped
+
+
+def get_dashboard(version=None):
+    """
+    payload داشبورد برای نسخه‌ی فعلی موجودی.
+    در هر نسخه فقط یک درخواست (دارنده‌ی قفل) payload را می‌سازد و بقیه منتظر نتیجه‌ی آن می‌مانند.
+    """
+    version = version or get_version(INVENTORY_VERSION_KEY)
+    key = DASHBOARD_DATA_KEY.format(version=version)
+    data = cache.get(key)
+    if data is not None:
+        return version, data
+
+    lock = DASHBOARD_LOCK_KEY.format(version=version)
+    if cache.add(lock, 1, timeout=DASHBOARD_LOCK_TIMEOUT):
+        try:
+            data = build_dashboard()
+            cache.set(key, data, timeout=DASHBOARD_TIMEOUT)
+        finally:
+            cache.delete(lock)
+        return version, data
+
+    interval, attempts = DASHBOARD_WAIT
+    for _ in range(attempts):
+        time.sleep(interval)
+        data = cache.get(key)
+        if data is not None:
+            return version, data
+    # سازنده‌ی اصلی کند یا از کار افتاده است
+    return version, build_dashboard()
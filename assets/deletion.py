@@ -0,0 +1,126 @@
+"""
+حذف تکه‌ای دارایی/یونیت در پس‌زمینه.
+
+درخواست حذف فقط pending_deletion را روشن می‌کند (شیء فوراً از کوئری‌های عادی پنهان می‌شود)
+و یک BackgroundJob فرزندان را در دسته‌های محدود، هر دسته در تراکنش کوتاه خودش، پاک می‌کند.
+اگر پروسه وسط کار بمیرد، دستور purge_pending_deletions کار را از همان‌جا ادامه می‌دهد.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.jobs import start_job
+from assets.models import (
+    Asset, AssetUnit, AssetAttributeValue, AssetRelation, AssetTypeAttribute,
+)
+from assets.counters import units_removed
+from assets.dashboard import bump_inventory_version
+from assets.history import close_units_history
+from assets.relation_changes import units_leaving_graph
+
+DELETE_ASSET_JOB_KIND = "delete_asset"
+DELETE_UNIT_JOB_KIND = "delete_unit"
+DELETE_BATCH_SIZE = getattr(settings, "ASSET_DELETE_BATCH_SIZE", 1000)
+
+
+def _delete_units_batch(asset_id, unit_ids):
+    with transaction.atomic():
+        close_units_history(unit_ids)
+        AssetRelation.objects.filter(Q(source_asset_id__in=unit_ids) | Q(target_asset_id__in=unit_ids)).delete()
+        AssetAttributeValue.objects.for_asset(asset_id).filter(unit_id__in=unit_ids).delete()
+        AssetUnit.all_objects.filter(pk__in=unit_ids).delete()
+
+
+def _delete_in_batches(queryset, batch_size):
+    """حذف ردیف‌های یک queryset در دسته‌های batch_size تایی؛ تعداد حذف‌شده را برمی‌گرداند"""
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            queryset.model._base_manager.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def delete_asset(asset_id, batch_size=DELETE_BATCH_SIZE, job=None):
+    units = AssetUnit.all_objects.filter(asset_id=asset_id).order_by("pk")
+    if job is not None:
+        job.report(total=units.count())
+
+    processed = 0
+    while True:
+        ids = list(units.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        _delete_units_batch(asset_id, ids)
+        processed += len(ids)
+        if job is not None:
+            job.report(processed=processed)
+
+    # مقادیر بدون یونیت، قوانین و در آخر خود دارایی
+    values = _delete_in_batches(
+        AssetAttributeValue.objects.for_asset(asset_id).filter(unit__isnull=True), batch_size
+    )
+    _delete_in_batches(AssetTypeAttribute.objects.filter(asset_id=asset_id), batch_size)
+    Asset.all_objects.filter(pk=asset_id).delete()
+    return {"units_deleted": processed, "orphan_values_deleted": values}
+
+
+def delete_unit(unit_id, batch_size=DELETE_BATCH_SIZE, job=None):
+    unit = AssetUnit.all_objects.filter(pk=unit_id).first()
+    if unit is None:
+        return {"units_deleted": 0}
+
+    values = AssetAttributeValue.objects.for_unit(unit)
+    relations = AssetRelation.objects.filter(Q(source_asset_id=unit.pk) | Q(target_asset_id=unit.pk))
+    if job is not None:
+        job.report(total=values.count() + relations.count())
+
+    deleted = _delete_in_batches(relations, batch_size)
+    if job is not None:
+        job.report(processed=deleted)
+    deleted += _delete_in_batches(values, batch_size)
+    if job is not None:
+        job.report(processed=deleted)
+
+    _delete_units_batch(unit.asset_id, [unit.pk])
+    return {"units_deleted": 1, "rows_deleted": deleted}
+
+
+def _delete_asset_job(job, asset_id):
+    return delete_asset(asset_id, job=job)
+
+
+def _delete_unit_job(job, unit_id):
+    return delete_unit(unit_id, job=job)
+
+
+@transaction.atomic
+def schedule_asset_deletion(asset, owner=None):
+    Asset.all_objects.filter(pk=asset.pk).update(pending_deletion=True)
+    asset.pending_deletion = True
+    bump_inventory_version()  # دارایی از داشبورد حذف می‌شود
+    units_leaving_graph(AssetUnit.all_objects.filter(asset_id=asset.pk).values("pk"))
+    return start_job(DELETE_ASSET_JOB_KIND, _delete_asset_job, params={"asset_id": str(asset.pk)}, owner=owner)
+
+
+@transaction.atomic
+def schedule_unit_deletion(unit, owner=None):
+    AssetUnit.all_objects.filter(pk=unit.pk).update(pending_deletion=True)
+    unit.pending_deletion = True
+    units_removed([unit])
+    units_leaving_graph([unit.pk])
+    return start_job(DELETE_UNIT_JOB_KIND, _delete_unit_job, params={"unit_id": str(unit.pk)}, owner=owner)
+
+
+def resume_pending_deletions(batch_size=DELETE_BATCH_SIZE):
+    """ادامه‌ی حذف‌هایی که job آن‌ها نیمه‌کاره مانده (مثلاً با ری‌استارت سرویس)"""
+    done = {"assets": 0, "units": 0}
+    for asset_id in Asset.all_objects.filter(pending_deletion=True).values_list("pk", flat=True):
+        delete_asset(asset_id, batch_size)
+        done["assets"] += 1
+    for unit_id in AssetUnit.all_objects.filter(pending_deletion=True).values_list("pk", flat=True):
+        delete_unit(unit_id, batch_size)
+        done["units"] += 1
+    return done
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_version, bump_version_on_commit
+from assets.models import Attribute, AttributeCategory
+from assets.serializers import AttributeCategorySerializer, AttributeSerializer
+
+DICTIONARY_VERSION_KEY = "attribute_dictionary_version"
+DICTIONARY_DATA_KEY = "attribute_dictionary:v{version}"
+DICTIONARY_TIMEOUT = getattr(settings, "ATTRIBUTE_DICTIONARY_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def bump_dictionary_version():
+    bump_version_on_commit(DICTIONARY_VERSION_KEY)
+
+
+def _timestamp(value):
+    # jDateTimeField مقدار jdatetime برمی‌گرداند
+    value = value.togregorian() if hasattr(value, "togregorian") else value
+    return int(value.timestamp())
+
+
+def build_dictionary(version):
+    categories = list(AttributeCategory.objects.order_by("name"))
+    attributes = list(Attribute.objects.select_related("category").order_by("title"))
+    stamps = [_timestamp(obj.updated_at) for obj in categories + attributes]
+    return {
+        # شمارنده‌ی نوشتن + بیشترین updated_at؛ تغییر هر کدام یعنی snapshot جدید
+        "etag": f'"dict-{version}-{max(stamps, default=0)}"',
+        "data": {
+            "version": version,
+            "categories": AttributeCategorySerializer(categories, many=True).data,
+            "attributes": AttributeSerializer(attributes, many=True).data,
+        },
+    }
+
+
+def get_cached_dictionary():
+    """(version, snapshot یا None) فقط از Redis؛ برای پاسخ 304 بدون کوئری دیتابیس"""
+    version = get_version(DICTIONARY_VERSION_KEY)
+    return version, cache.get(DICTIONARY_DATA_KEY.format(version=version))
+
+
+def get_dictionary():
+    version, snapshot = get_cached_dictionary()
+    if snapshot is None:
+        snapshot = build_dictionary(version)
+        cache.set(DICTIONARY_DATA_KEY.format(version=version), snapshot, timeout=DICTIONARY_TIMEOUT)
+    return snapshot
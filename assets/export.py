@@ -0,0 +1,150 @@
+"""
+خروجی جریانی گراف روابط (GraphML / NDJSON) برای ابزارهای بیرونی.
+
+یونیت‌ها و یال‌ها با iterator (server-side cursor در PostgreSQL) خوانده و خط به خط yield می‌شوند،
+پس حافظه مستقل از اندازه‌ی گراف است. مقادیر خصیصه‌های انتخابی برای هر دسته‌ی NODE_BATCH تایی از
+یونیت‌ها با یک کوئری IN گرفته می‌شوند.
+"""
+import json
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+import jdatetime
+
+from assets.models import AssetUnit, AssetRelation, AssetAttributeValue, Attribute, ActiveRange
+from assets.history import HISTORY_COLUMNS
+
+GRAPHML = "graphml"
+NDJSON = "ndjson"
+CONTENT_TYPES = {GRAPHML: "application/graphml+xml", NDJSON: "application/x-ndjson"}
+
+CURSOR_CHUNK = 2000
+NODE_BATCH = 1000
+
+NODE_FIELDS = ("label", "code", "asset", "asset_type", "is_registered")
+EDGE_FIELDS = ("relation", "start_date", "end_date")
+
+
+def _jalali(d):
+    if d is None:
+        return None
+    if isinstance(d, jdatetime.date):
+        return d.isoformat()
+    return jdatetime.date.fromgregorian(date=d).isoformat()
+
+
+def _batches(iterable, size):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+class GraphExport:
+    def __init__(self, asset_type=None, relation_keys=None, active_at=None, attribute_ids=None):
+        self.asset_type = asset_type
+        self.relation_keys = relation_keys or []
+        self.active_at = active_at
+        self.attributes = list(Attribute.objects.filter(pk__in=attribute_ids or []).order_by("title"))
+        # نام ستون هر خصیصه؛ عنوان تکراری با id متمایز می‌شود
+        self.attr_names, taken = {}, set()
+        for attr in self.attributes:
+            name = f"attr:{attr.title}"
+            self.attr_names[attr.pk] = f"{name}:{attr.pk}" if name in taken else name
+            taken.add(name)
+
+    # ----- کوئری‌ها
+    def units(self):
+        qs = AssetUnit.objects.all()
+        if self.asset_type:
+            qs = qs.filter(asset__asset_type=self.asset_type)
+        return qs.order_by().values_list(
+            "pk", "label", "code", "asset__title", "asset__asset_type", "is_registered"
+        ).iterator(chunk_size=CURSOR_CHUNK)
+
+    def relations(self):
+        qs = AssetRelation.objects.filter(
+            source_asset__pending_deletion=False, source_asset__asset__pending_deletion=False,
+            target_asset__pending_deletion=False, target_asset__asset__pending_deletion=False,
+        )
+        if self.asset_type:
+            # فقط یال‌هایی که هر دو سرشان در مجموعه‌ی گره‌های خروجی هستند
+            qs = qs.filter(source_asset__asset__asset_type=self.asset_type,
+                           target_asset__asset__asset_type=self.asset_type)
+        if self.relation_keys:
+            qs = qs.filter(relation__key__in=self.relation_keys)
+        if self.active_at:
+            qs = qs.alias(active=ActiveRange()).filter(active__contains=self.active_at)
+        return qs.order_by().values_list(
+            "pk", "source_asset_id", "target_asset_id", "relation__key", "start_date", "end_date"
+        ).iterator(chunk_size=CURSOR_CHUNK)
+
+    def nodes(self):
+        """(id, {field: value}) با مقادیر خصیصه‌های انتخابی"""
+        from assets.serializers import render_aav_value
+
+        attr_ids = [a.pk for a in self.attributes]
+        for batch in _batches(self.units(), NODE_BATCH):
+            values = {}
+            if attr_ids:
+                qs = AssetAttributeValue.objects.filter(
+                    unit_id__in=[row[0] for row in batch], attribute_id__in=attr_ids
+                ).only("unit_id", "attribute_id", *HISTORY_COLUMNS)
+                for aav in qs:
+                    values[(aav.unit_id, aav.attribute_id)] = render_aav_value(aav)
+            for pk, label, code, asset, asset_type, is_registered in batch:
+                data = {"label": label, "code": code, "asset": asset,
+                        "asset_type": asset_type, "is_registered": is_registered}
+                for attr_id, name in self.attr_names.items():
+                    data[name] = values.get((pk, attr_id))
+                yield str(pk), data
+
+    def edges(self):
+        for pk, source, target, key, start, end in self.relations():
+            yield str(pk), str(source), str(target), {
+                "relation": key, "start_date": _jalali(start), "end_date": _jalali(end),
+            }
+
+    # ----- فرمت‌ها
+    def ndjson(self):
+        for pk, data in self.nodes():
+            yield json.dumps({"type": "node", "id": pk, **data}, ensure_ascii=False, default=str) + "\n"
+        for pk, source, target, data in self.edges():
+            yield json.dumps({"type": "edge", "id": pk, "source": source, "target": target, **data},
+                             ensure_ascii=False) + "\n"
+
+    def graphml(self):
+        node_keys = list(NODE_FIELDS) + list(self.attr_names.values())
+        node_ids = {name: f"n{i}" for i, name in enumerate(node_keys)}
+        edge_ids = {name: f"e{i}" for i, name in enumerate(EDGE_FIELDS)}
+
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for name, key_id in node_ids.items():
+            kind = "boolean" if name == "is_registered" else "string"
+            yield f'  <key id="{key_id}" for="node" attr.name={quoteattr(name)} attr.type="{kind}"/>\n'
+        for name, key_id in edge_ids.items():
+            yield f'  <key id="{key_id}" for="edge" attr.name={quoteattr(name)} attr.type="string"/>\n'
+        yield '  <graph id="assets" edgedefault="directed">\n'
+
+        for pk, data in self.nodes():
+            yield f'    <node id="{pk}">' + self._data(node_ids, data) + '</node>\n'
+        for pk, source, target, data in self.edges():
+            yield f'    <edge id="{pk}" source="{source}" target="{target}">' + self._data(edge_ids, data) + '</edge>\n'
+
+        yield '  </graph>\n</graphml>\n'
+
+    @staticmethod
+    def _data(key_ids, data):
+        parts = []
+        for name, value in data.items():
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = "true" if value else "false"
+            elif isinstance(value, list):
+                value = json.dumps(value, ensure_ascii=False)
+            parts.append(f'<data key="{key_ids[name]}">{escape(str(value))}</data>')
+        return "".join(parts)
+
+    def stream(self, fmt):
+        return self.graphml() if fmt == GRAPHML else self.ndjson()
@@ -0,0 +1,121 @@
+import jdatetime
+from django.db import connection
+
+from assets.models import Asset, AssetUnit, AssetRelation, Relation
+
+DOWNSTREAM = "downstream"
+UPSTREAM = "upstream"
+
+# downstream: از source به target (یال‌های خروجی)؛ upstream: برعکس
+_DIRECTION_COLUMNS = {
+    DOWNSTREAM: ("source_asset_id", "target_asset_id"),
+    UPSTREAM: ("target_asset_id", "source_asset_id"),
+}
+
+# یک سطح از پیمایش: یال‌های خروجی (در جهت پیمایش) گره‌های مرز فعلی به یونیت‌های قابل مشاهده
+_LEVEL_SQL = """
+    SELECT e.id, e.{this}, e.{next}, e.source_asset_id, e.target_asset_id, r.key, e.start_date, e.end_date
+      FROM {edge} AS e
+      JOIN {relation} AS r ON r.id = e.relation_id
+      JOIN {unit} AS u ON u.id = e.{next}
+      JOIN {asset} AS a ON a.id = u.asset_id
+     WHERE e.{this} = ANY(%(frontier)s::uuid[])
+       AND NOT u.pending_deletion
+       AND NOT a.pending_deletion
+       {edge_filters}
+"""
+
+
+def _jalali(d):
+    return jdatetime.date.fromgregorian(date=d).isoformat() if d else None
+
+
+def _tables():
+    return dict(
+        edge=AssetRelation._meta.db_table,
+        relation=Relation._meta.db_table,
+        unit=AssetUnit._meta.db_table,
+        asset=Asset._meta.db_table,
+    )
+
+
+def _back_edges(root, adjacency):
+    """یال‌هایی که در DFS از root به گره‌ای روی پشته‌ی فعلی برمی‌گردند (بستن دور)"""
+    closing, on_stack, done = set(), {root}, set()
+    stack = [(root, iter(adjacency.get(root, ())))]
+    while stack:
+        node, it = stack[-1]
+        for edge_id, nxt in it:
+            if nxt in on_stack:
+                closing.add(edge_id)
+            elif nxt not in done:
+                on_stack.add(nxt)
+                stack.append((nxt, iter(adjacency.get(nxt, ()))))
+                break
+        else:
+            stack.pop()
+            on_stack.discard(node)
+            done.add(node)
+    return closing
+
+
+def traverse(unit_id, direction=DOWNSTREAM, max_depth=3, relation_keys=None, active_at=None):
+    """
+    پیمایش چندمرحله‌ای گراف وابستگی از یک یونیت، سطح به سطح (BFS) با یک کوئری برای هر سطح.
+    هر گره فقط یک بار و در کمترین عمقش گسترش می‌یابد، پس تعداد ردیف‌ها حداکثر به اندازه‌ی
+    یال‌های زیرگراف دیده‌شده است (نه تعداد مسیرها). یال‌هایی که دور را می‌بندند بعد از پیمایش
+    با یک DFS روی همین زیرگراف علامت می‌خورند.
+    خروجی: گره‌ها و یال‌ها با کمترین عمقی که به آن‌ها رسیده‌ایم.
+    """
+    this, next_ = _DIRECTION_COLUMNS[direction]
+    filters = []
+    params = {}
+    if relation_keys:
+        filters.append("AND r.key = ANY(%(keys)s)")
+        params["keys"] = list(relation_keys)
+    if active_at:
+        # بازه‌ی بسته؛ تاریخ خالی یعنی بی‌کران (همان عبارت ایندکس زمانی روابط)
+        filters.append("AND daterange(e.start_date, e.end_date, '[]') @> %(active_at)s::date")
+        params["active_at"] = active_at
+    sql = _LEVEL_SQL.format(this=this, next=next_, edge_filters=" ".join(filters), **_tables())
+
+    root = str(unit_id)
+    depths, edges, adjacency = {root: 0}, [], {}
+    frontier = [root]
+    with connection.cursor() as cursor:
+        for depth in range(1, max_depth + 1):
+            if not frontier:
+                break
+            cursor.execute(sql, {**params, "frontier": frontier})
+            next_frontier = []
+            for pk, here, there, source, target, key, start, end in cursor.fetchall():
+                here, there = str(here), str(there)
+                adjacency.setdefault(here, []).append((str(pk), there))
+                edges.append((depth, str(pk), str(source), str(target), key, start, end))
+                if there not in depths:
+                    depths[there] = depth
+                    next_frontier.append(there)
+            frontier = next_frontier
+
+    closing = _back_edges(root, adjacency)
+    details = {
+        str(pk): (label, code, asset)
+        for pk, label, code, asset in AssetUnit.objects.filter(pk__in=[n for n in depths if n != root])
+        .values_list("pk", "label", "code", "asset__title")
+    }
+
+    nodes = [
+        {"id": pk, "label": label, "code": code, "asset": asset, "depth": depths[pk]}
+        for pk, (label, code, asset) in details.items()
+    ]
+    nodes.sort(key=lambda n: (n["depth"], n["id"]))
+    edges.sort(key=lambda e: (e[0], e[1]))
+    return {
+        "root": root, "direction": direction, "nodes": nodes,
+        "edges": [{
+            "id": pk, "source": source, "target": target, "relation": key,
+            "start_date": _jalali(start),
+            "end_date": _jalali(end),
+            "depth": depth, "closes_cycle": pk in closing,
+        } for depth, pk, source, target, key, start, end in edges],
+    }
@@ -0,0 +1,311 @@
+"""
+ایندکس درون‌حافظه‌ای گراف روابط (CSR) برای هر worker.
+
+یال‌ها به شکل compressed sparse row نگه داشته می‌شوند: offsets[u]..offsets[u+1] بازه‌ی همسایه‌های
+گره u در آرایه‌ی targets است و relations[i] شماره‌ی نوع رابطه‌ی همان یال. برای پیمایش upstream
+یک CSR معکوس هم ساخته می‌شود. آرایه‌ها از ماژول استاندارد array هستند (numpy جزو وابستگی‌ها نیست)
+و هر عنصر ۴ بایت جا می‌گیرد.
+
+به‌روزرسانی افزایشی: هر نوشتن روی AssetRelation بعد از commit شمارنده‌ی relation_graph_version
+را بالا می‌برد و تغییرات خودش را زیر کلید همان نسخه در Redis می‌گذارد. ایندکس با دیدن نسخه‌ی
+جدیدتر فقط این تغییرات را روی یک لایه‌ی overlay اعمال می‌کند؛ اگر تغییری گم شده باشد یا overlay
+بزرگ شود، ایندکس از نو ساخته می‌شود.
+"""
+import copy
+import threading
+import time
+from array import array
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import get_version, bump_version
+from assets.models import AssetRelation, Relation
+
+GRAPH_VERSION_KEY = "relation_graph_version"
+GRAPH_CHANGES_KEY = "relation_graph_changes:{version}"
+GRAPH_CHANGES_TIMEOUT = 60 * 60 * 24
+# بعد از این مدت ایندکس حتماً از نو ساخته می‌شود (برای نوشتن‌هایی که از مسیر ثبت تغییرات نگذشته‌اند)
+GRAPH_INDEX_MAX_AGE = getattr(settings, "RELATION_GRAPH_INDEX_MAX_AGE", 60 * 60)
+MAX_INCREMENTAL_STEPS = 500
+MAX_OVERLAY_RATIO = 0.05
+
+
+# ===== ثبت تغییرات (سمت نوشتن)
+
+def edge_key(relation):
+    return str(relation.source_asset_id), str(relation.target_asset_id), str(relation.relation_id)
+
+
+def record_edge_changes(added=(), removed=()):
+    """
+    بعد از commit تراکنش جاری نسخه‌ی گراف را بالا می‌برد و تغییرات را زیر همان نسخه ذخیره می‌کند.
+    added/removed: اشیای AssetRelation یا سه‌تایی (source, target, relation).
+    """
+    changes = [("+",) + (e if isinstance(e, tuple) else edge_key(e)) for e in added]
+    changes += [("-",) + (e if isinstance(e, tuple) else edge_key(e)) for e in removed]
+    if not changes:
+        return
+
+    def _publish():
+        version = bump_version(GRAPH_VERSION_KEY)
+        cache.set(GRAPH_CHANGES_KEY.format(version=version), changes, timeout=GRAPH_CHANGES_TIMEOUT)
+
+    transaction.on_commit(_publish)
+
+
+def invalidate_graph():
+    """تغییرات گروهی که جزئیاتشان ثبت نمی‌شود (مثل حذف دسته‌ای): نسخه بدون لاگ → بازسازی کامل"""
+    transaction.on_commit(lambda: bump_version(GRAPH_VERSION_KEY))
+
+
+# ===== ایندکس
+
+class GraphIndex:
+    def __init__(self, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.node_ids = []          # index → uuid str
+        self.node_index = {}        # uuid str → index
+        self.relation_keys = []     # index → Relation.key
+        self.relation_index = {}    # Relation.id (str) → index
+        self.out = self.inc = None  # (offsets, targets, relations)
+        self.base_nodes = 0
+        self.base_edges = 0
+        # overlay تغییرات افزایشی تا بازسازی بعدی
+        self.added = ({}, {})       # (out, in): node → [(neighbor, relation)]
+        self.removed = ({}, {})     # (out, in): node → Counter[(neighbor, relation)]
+        self.overlay_size = 0
+
+    # ----- ساخت کامل
+    @classmethod
+    def build(cls, version):
+        index = cls(version)
+        for pk, key in Relation.objects.values_list("pk", "key"):
+            index.relation_index[str(pk)] = len(index.relation_keys)
+            index.relation_keys.append(key)
+
+        sources, targets, relations = array("i"), array("i"), array("i")
+        # یونیت‌های در صف حذف از گراف بیرون می‌مانند (schedule_*_deletion نسخه را بالا می‌برد)
+        qs = AssetRelation.objects.filter(
+            source_asset__pending_deletion=False, source_asset__asset__pending_deletion=False,
+            target_asset__pending_deletion=False, target_asset__asset__pending_deletion=False,
+        ).values_list("source_asset_id", "target_asset_id", "relation_id")
+        for s, t, r in qs.iterator(chunk_size=20000):
+            sources.append(index._node(str(s)))
+            targets.append(index._node(str(t)))
+            relations.append(index.relation_index[str(r)])
+
+        index.base_nodes = len(index.node_ids)
+        index.base_edges = len(sources)
+        index.out = cls._csr(index.base_nodes, sources, targets, relations)
+        index.inc = cls._csr(index.base_nodes, targets, sources, relations)
+        return index
+
+    @staticmethod
+    def _csr(n, heads, tails, relations):
+        """counting sort یال‌ها بر اساس گره‌ی مبدأ در O(n + e)"""
+        offsets = array("q", [0]) * (n + 1)
+        for h in heads:
+            offsets[h + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        cursor = array("q", offsets[:-1]) if n else array("q")
+        out_targets = array("i", [0]) * len(heads)
+        out_relations = array("i", [0]) * len(heads)
+        for h, t, r in zip(heads, tails, relations):
+            pos = cursor[h]
+            out_targets[pos] = t
+            out_relations[pos] = r
+            cursor[h] = pos + 1
+        return offsets, out_targets, out_relations
+
+    def _node(self, uuid):
+        idx = self.node_index.get(uuid)
+        if idx is None:
+            idx = self.node_index[uuid] = len(self.node_ids)
+            self.node_ids.append(uuid)
+        return idx
+
+    # ----- به‌روزرسانی افزایشی (copy-on-write)
+    def with_changes(self, batches, version):
+        """
+        ایندکس جدیدی با تغییرات batches برمی‌گرداند و خود این شیء را دست نمی‌زند، چون خواننده‌های
+        thread های دیگر بدون قفل رویش پیمایش می‌کنند. آرایه‌های CSR مشترک و فقط‌خواندنی‌اند؛
+        node_ids/node_index فقط append می‌شوند (اندیس‌های قبلی ثابت می‌مانند)؛ dict های overlay کپی
+        سطحی و لیست/Counter هر گره‌ی تغییرکرده پیش از نوشتن کپی می‌شود.
+        """
+        clone = copy.copy(self)
+        clone.version = version
+        clone.relation_index = dict(self.relation_index)
+        clone.relation_keys = list(self.relation_keys)
+        clone.added = tuple(dict(d) for d in self.added)
+        clone.removed = tuple(dict(d) for d in self.removed)
+
+        changes = [change for batch in batches for change in batch]
+        unknown = {r for _, _, _, r in changes if r not in clone.relation_index}
+        if unknown:  # نوع رابطه‌ی جدید؛ همه با یک کوئری
+            for pk, key in Relation.objects.filter(pk__in=unknown).values_list("pk", "key"):
+                clone.relation_index[str(pk)] = len(clone.relation_keys)
+                clone.relation_keys.append(key)
+
+        copied = set()
+        for op, s, t, r in changes:
+            rel = clone.relation_index.get(r)
+            if rel is None:  # رابطه در این فاصله حذف شده؛ یالش هم دیگر وجود ندارد
+                continue
+            si, ti = clone._node(s), clone._node(t)
+            for direction, (a, b) in enumerate(((si, ti), (ti, si))):
+                added, removed = clone.added[direction], clone.removed[direction]
+                if (direction, a) not in copied:
+                    copied.add((direction, a))
+                    if a in added:
+                        added[a] = list(added[a])
+                    if a in removed:
+                        removed[a] = Counter(removed[a])
+                if op == "+":
+                    added.setdefault(a, []).append((b, rel))
+                else:
+                    pending = added.get(a)
+                    if pending and (b, rel) in pending:
+                        pending.remove((b, rel))
+                    else:
+                        removed.setdefault(a, Counter())[(b, rel)] += 1
+            clone.overlay_size += 1
+        return clone
+
+    def needs_rebuild(self):
+        return (self.overlay_size > max(10000, self.base_edges * MAX_OVERLAY_RATIO)
+                or time.monotonic() - self.built_at > GRAPH_INDEX_MAX_AGE)
+
+    # ----- پرس‌وجو
+    def neighbors(self, node, upstream=False, relations=None):
+        direction = 1 if upstream else 0
+        offsets, targets, rels = self.inc if upstream else self.out
+        removed = self.removed[direction].get(node)
+        removed = Counter(removed) if removed else None
+        if node < self.base_nodes:
+            for i in range(offsets[node], offsets[node + 1]):
+                t, r = targets[i], rels[i]
+                if removed and removed[(t, r)] > 0:
+                    removed[(t, r)] -= 1
+                    continue
+                if relations is None or r in relations:
+                    yield t, r
+        for t, r in self.added[direction].get(node, ()):
+            if relations is None or r in relations:
+                yield t, r
+
+    def relation_filter(self, keys):
+        if not keys:
+            return None
+        keys = set(keys)
+        return {i for i, key in enumerate(self.relation_keys) if key in keys}
+
+    def bfs(self, start, upstream=False, relations=None, max_depth=None, limit=None):
+        """
+        گره‌های قابل دسترس از start: {node: (depth, parent, relation)}؛ خود start هم در نتیجه است.
+        با limit، به محض رسیدن به limit + 1 گره (بدون start) متوقف می‌شود تا caller بریده شدن را بفهمد.
+        """
+        seen = {start: (0, None, None)}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            depth = seen[node][0]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for t, r in self.neighbors(node, upstream, relations):
+                if t not in seen:
+                    seen[t] = (depth + 1, node, r)
+                    if limit and len(seen) - 1 > limit:
+                        return seen
+                    queue.append(t)
+        return seen
+
+    def shortest_path(self, start, goal, upstream=False, relations=None, max_depth=None):
+        """BFS دوطرفه روی یال‌های بدون وزن؛ مسیر به‌صورت لیست (node, relation) یا None"""
+        if start == goal:
+            return [(start, None)]
+        front = {start: (None, None)}   # node → (parent, relation) از سمت start
+        back = {goal: (None, None)}     # node → (child, relation) از سمت goal
+        fq, bq = [start], [goal]
+        depth = 0
+        while fq and bq:
+            if max_depth is not None and depth >= max_depth:
+                return None
+            depth += 1
+            expand_front = len(fq) <= len(bq)
+            frontier, visited, other = (fq, front, back) if expand_front else (bq, back, front)
+            next_level = []
+            for node in frontier:
+                for t, r in self.neighbors(node, upstream if expand_front else not upstream, relations):
+                    if t in visited:
+                        continue
+                    visited[t] = (node, r)
+                    if t in other:
+                        return self._join_path(t, front, back)
+                    next_level.append(t)
+            if expand_front:
+                fq = next_level
+            else:
+                bq = next_level
+        return None
+
+    @staticmethod
+    def _join_path(meet, front, back):
+        path, node = [], meet
+        while node is not None:
+            parent, rel = front[node]
+            path.append((node, rel))
+            node = parent
+        path.reverse()
+        # رابطه‌ی هر گام روی گره‌ی مقصد همان گام نوشته می‌شود
+        node = meet
+        while back[node][0] is not None:
+            child, rel = back[node]
+            path.append((child, rel))
+            node = child
+        return path
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_graph_index():
+    """ایندکس به‌روز این worker؛ در حالت عادی فقط یک GET نسخه از Redis"""
+    global _index
+    version = get_version(GRAPH_VERSION_KEY)
+    index = _index
+    if index is not None and index.version == version and not index.needs_rebuild():
+        return index
+
+    with _lock:
+        index = _index
+        if index is not None and index.version == version and not index.needs_rebuild():
+            return index
+        if index is not None and 0 < version - index.version <= MAX_INCREMENTAL_STEPS and not index.needs_rebuild():
+            keys = [GRAPH_CHANGES_KEY.format(version=v) for v in range(index.version + 1, version + 1)]
+            found = cache.get_many(keys)
+            if len(found) == len(keys):
+                # جایگزینی اتمیک؛ خواننده‌هایی که ایندکس قبلی را گرفته‌اند روی همان نسخه‌ی ثابت می‌مانند
+                _index = index.with_changes([found[key] for key in keys], version)
+                return _index
+        _index = GraphIndex.build(version)
+        return _index
+
+
+def graph_index_stats():
+    index = _index
+    if index is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "version": index.version,
+        "nodes": len(index.node_ids),
+        "edges": index.base_edges,
+        "overlay": index.overlay_size,
+        "age_seconds": int(time.monotonic() - index.built_at),
+    }
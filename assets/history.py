@@ -0,0 +1,67 @@
+import datetime
+
+import jdatetime
+from django.utils import timezone
+
+from assets.models import AssetAttributeValueHistory, ValidityRange
+
+HISTORY_COLUMNS = (
+    "value_int", "value_float", "value_str", "value_bool", "value_date", "choice", "value_list",
+)
+
+
+def record_value_changes(created=(), updated=(), deleted_ids=(), now=None):
+    """
+    ثبت گروهی تاریخچه برای یک دسته تغییر مقادیر:
+      - نسخه‌ی باز مقادیر ویرایش/حذف‌شده با یک UPDATE بسته می‌شود (valid_to = now)
+      - برای مقادیر جدید/ویرایش‌شده یک نسخه‌ی باز با یک bulk_create اضافه می‌شود
+    باید در همان تراکنشی صدا زده شود که خود مقادیر نوشته می‌شوند.
+    """
+    now = now or timezone.now()
+    updated = list(updated)
+    closing = [row.pk for row in updated] + list(deleted_ids)
+    if closing:
+        AssetAttributeValueHistory.objects.filter(value_id__in=closing, valid_to__isnull=True).update(valid_to=now)
+
+    opened = [
+        AssetAttributeValueHistory(
+            value_id=row.pk,
+            asset_id=row.asset_id,
+            unit_id=row.unit_id,
+            attribute_id=row.attribute_id,
+            valid_from=now,
+            **{col: getattr(row, col) for col in HISTORY_COLUMNS},
+        )
+        for row in list(created) + updated
+    ]
+    if opened:
+        AssetAttributeValueHistory.objects.bulk_create(opened, batch_size=500)
+
+
+def close_units_history(unit_ids, now=None):
+    """حذف یونیت‌ها: نسخه‌های باز بسته می‌شوند ولی تاریخچه باقی می‌ماند"""
+    AssetAttributeValueHistory.objects.filter(unit_id__in=list(unit_ids), valid_to__isnull=True) \
+        .update(valid_to=now or timezone.now())
+
+
+def parse_as_of(value):
+    """
+    «تا پایان روز» تاریخ شمسی YYYY-MM-DD یا YYYY/MM/DD (یا YYYY-MM-DD HH:MM) → datetime آگاه از منطقه‌ی زمانی.
+    مقدار نامعتبر ValueError می‌دهد.
+    """
+    value = str(value).strip().replace("/", "-")
+    try:
+        moment = jdatetime.datetime.strptime(value, "%Y-%m-%d %H:%M").togregorian()
+    except ValueError:
+        day = jdatetime.datetime.strptime(value, "%Y-%m-%d").togregorian().date()
+        moment = datetime.datetime.combine(day, datetime.time.max)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def values_as_of(as_of):
+    """نسخه‌هایی که در لحظه‌ی as_of معتبر بوده‌اند؛ همراه با unit روی ایندکس GiST (unit, validity) می‌نشیند"""
+    return AssetAttributeValueHistory.objects.alias(validity=ValidityRange()).filter(validity__contains=as_of)
+
+
+def unit_values_as_of(unit, as_of):
+    return values_as_of(as_of).filter(unit_id=unit.pk)
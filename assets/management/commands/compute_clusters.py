@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from assets.clusters import ALL_RELATIONS, compute_clusters, split_dirty_clusters
+
+
+class Command(BaseCommand):
+    help = "محاسبه‌ی کامل خوشه‌های وابستگی (مؤلفه‌های همبند) یا تقسیم خوشه‌های dirty"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", action="append", dest="scopes",
+                            help="key رابطه (قابل تکرار)؛ بدون آن همه‌ی روابط با هم")
+        parser.add_argument("--split-dirty", action="store_true",
+                            help="فقط خوشه‌هایی که بعد از حذف یال dirty شده‌اند بازمحاسبه شوند")
+
+    def handle(self, *args, **options):
+        if options["split_dirty"]:
+            stats = split_dirty_clusters()
+            self.stdout.write(f"dirty clusters={stats['clusters']} pieces={stats['pieces']}")
+            return
+        for scope in options["scopes"] or [ALL_RELATIONS]:
+            stats = compute_clusters(scope)
+            self.stdout.write(f"{scope or '*'}: clusters={stats['clusters']} units={stats['units']}")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.partitioning import (
+    DEFAULT_PARTITIONS, build_partition_sql, is_partitioned, partition_attribute_values, partition_stats,
+)
+
+
+class Command(BaseCommand):
+    help = ("تبدیل اختیاری AssetAttributeValue به جدول هش‌پارتیشن‌شده روی asset_id (در پنجره‌ی نگهداری اجرا شود). "
+            "پیش‌نیاز: همه‌ی مایگریشن‌ها اجرا شده باشند؛ FK های ورودی به این جدول باید db_constraint=False باشند "
+            "(AssetRelation.attribute_value از مایگریشن 0028) وگرنه دستور بدون تغییر متوقف می‌شود.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+        parser.add_argument("--keep-old", action="store_true", help="جدول قبلی با پسوند _unpartitioned نگه داشته شود")
+        parser.add_argument("--dry-run", action="store_true", help="فقط SQL را چاپ کن")
+        parser.add_argument("--status", action="store_true", help="نمایش پارتیشن‌ها و حجمشان")
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            if not is_partitioned():
+                self.stdout.write("not partitioned")
+                return
+            for p in partition_stats():
+                self.stdout.write(f"{p['partition']}: ~{p['rows']} rows, {p['bytes']} bytes")
+            return
+
+        if options["partitions"] < 2:
+            raise CommandError("--partitions must be at least 2")
+        if is_partitioned():
+            raise CommandError("table is already partitioned")
+
+        try:
+            if options["dry_run"]:
+                for statement in build_partition_sql(options["partitions"], options["keep_old"]):
+                    self.stdout.write(statement + ";")
+                return
+
+            statements = partition_attribute_values(options["partitions"], options["keep_old"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"done ({len(statements)} statements)")
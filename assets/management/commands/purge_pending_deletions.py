@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from assets.deletion import resume_pending_deletions, DELETE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "ادامه‌ی حذف دارایی‌ها/یونیت‌هایی که در انتظار حذف مانده‌اند (مثلاً بعد از ری‌استارت سرویس)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        done = resume_pending_deletions(options["batch_size"])
+        self.stdout.write(f"assets={done['assets']} units={done['units']}")
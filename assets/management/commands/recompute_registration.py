@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from assets.models import Asset
+from assets.registration import recompute_registration, RECOMPUTE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "بازمحاسبه‌ی is_registered یونیت‌ها بر اساس خصیصه‌های الزامی فعلی"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asset", action="append", dest="assets", help="شناسه‌ی دارایی (قابل تکرار)")
+        parser.add_argument("--chunk-size", type=int, default=RECOMPUTE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        asset_ids = options["assets"] or Asset.objects.values_list("pk", flat=True)
+        for asset_id in asset_ids:
+            stats = recompute_registration(str(asset_id), chunk_size=options["chunk_size"])
+            self.stdout.write(
+                f"{asset_id}: processed={stats['processed']} flipped={stats['flipped']} "
+                f"(+{stats['registered']} / -{stats['unregistered']})"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from assets.counters import reconcile_unit_counters
+
+
+class Command(BaseCommand):
+    help = "بازشماری unit_count / registered_unit_count / active_unit_count دارایی‌ها (برای اجرای دوره‌ای با cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asset", action="append", dest="assets", help="شناسه‌ی دارایی (قابل تکرار)")
+
+    def handle(self, *args, **options):
+        fixed = reconcile_unit_counters(options["assets"])
+        self.stdout.write(f"{fixed} asset(s) corrected")
@@ -0,0 +1,81 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:15
+
+import ast
+import json
+
+import django.contrib.postgres.fields
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+
+BATCH_SIZE = 2000
+LIST_TYPES = ('multi_choice', 'tags')
+
+
+def _decode(raw):
+    for loader in (json.loads, ast.literal_eval):
+        try:
+            value = loader(raw)
+        except (ValueError, SyntaxError, TypeError):
+            continue
+        if isinstance(value, (list, tuple)):
+            return [str(v) for v in value]
+        return [str(value)]
+    return [raw]
+
+
+def backfill_value_list(apps, schema_editor):
+    AssetAttributeValue = apps.get_model('assets', 'AssetAttributeValue')
+    qs = (AssetAttributeValue.objects
+          .filter(attribute__property_type__in=LIST_TYPES, choice__isnull=False)
+          .order_by('pk')
+          .only('pk', 'choice'))
+
+    last_pk = None
+    while True:
+        page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        batch = list(page[:BATCH_SIZE])
+        if not batch:
+            break
+        for row in batch:
+            row.value_list = _decode(row.choice)
+            row.choice = None
+        with transaction.atomic():
+            AssetAttributeValue.objects.bulk_update(batch, ['value_list', 'choice'])
+        last_pk = batch[-1].pk
+
+
+def restore_choice(apps, schema_editor):
+    AssetAttributeValue = apps.get_model('assets', 'AssetAttributeValue')
+    qs = AssetAttributeValue.objects.filter(value_list__isnull=False).order_by('pk').only('pk', 'value_list')
+
+    last_pk = None
+    while True:
+        page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        batch = list(page[:BATCH_SIZE])
+        if not batch:
+            break
+        for row in batch:
+            row.choice = json.dumps(row.value_list)
+        with transaction.atomic():
+            AssetAttributeValue.objects.bulk_update(batch, ['choice'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # هر batch در تراکنش خودش commit می‌شود تا جدول بزرگ یک‌جا قفل نشود
+    atomic = False
+
+    dependencies = [
+        ('assets', '0018_alter_importsession_attribute_map'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assetattributevalue',
+            name='value_list',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, null=True, size=None),
+        ),
+        migrations.RunPython(backfill_value_list, restore_choice),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:15
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('assets', '0019_assetattributevalue_value_list'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='assetattributevalue',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['value_list'], name='idx_v_list'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0020_assetattributevalue_idx_v_list'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['title'], name='idx_asset_title_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+    UPDATE assets_asset AS a
+       SET unit_count = c.total,
+           registered_unit_count = c.registered,
+           active_unit_count = c.active
+      FROM (
+            SELECT asset_id,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE is_registered) AS registered,
+                   COUNT(*) FILTER (WHERE is_active) AS active
+              FROM assets_assetunit
+             GROUP BY asset_id
+           ) AS c
+     WHERE a.id = c.asset_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0021_asset_title_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='active_unit_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='registered_unit_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='unit_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
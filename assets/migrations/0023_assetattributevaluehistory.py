@@ -0,0 +1,94 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:26
+
+import assets.models
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+import django.db.models.deletion
+import django_jalali.db.models
+import uuid
+from django.db import migrations, models, transaction
+
+
+BATCH_SIZE = 5000
+
+# نسخه‌ی فعلی مقادیر به‌عنوان نقطه‌ی شروع تاریخچه؛ صفحه به صفحه روی کلید id
+NEXT_IDS_SQL = """
+    SELECT id FROM assets_assetattributevalue WHERE id > %s ORDER BY id LIMIT %s
+"""
+BACKFILL_SQL = """
+    INSERT INTO assets_assetattributevaluehistory
+        (id, created_at, updated_at, value_id, asset_id, unit_id, attribute_id,
+         value_int, value_float, value_str, value_bool, value_date, choice, value_list,
+         valid_from, valid_to)
+    SELECT gen_random_uuid(), NOW(), NOW(), v.id, v.asset_id, v.unit_id, v.attribute_id,
+           v.value_int, v.value_float, v.value_str, v.value_bool, v.value_date, v.choice, v.value_list,
+           v.updated_at, NULL
+      FROM assets_assetattributevalue AS v
+     WHERE v.id = ANY(%s::uuid[])
+"""
+# اجرای دوباره بعد از قطع شدن از آخرین مقدار کپی‌شده ادامه می‌دهد
+RESUME_SQL = """
+    SELECT value_id FROM assets_assetattributevaluehistory ORDER BY value_id DESC LIMIT 1
+"""
+
+
+def backfill_history(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(RESUME_SQL)
+        row = cursor.fetchone()
+        last_id = str(row[0]) if row else str(uuid.UUID(int=0))
+        while True:
+            cursor.execute(NEXT_IDS_SQL, [last_id, BATCH_SIZE])
+            ids = [str(r[0]) for r in cursor.fetchall()]
+            if not ids:
+                break
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(BACKFILL_SQL, [ids])
+            last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # هر batch در تراکنش خودش commit می‌شود تا کپی جدول بزرگ مقادیر یک‌جا در یک تراکنش نباشد
+    atomic = False
+
+    dependencies = [
+        ('assets', '0022_asset_unit_counters'),
+    ]
+
+    operations = [
+        # GiST روی ستون uuid (unit_id) به btree_gist نیاز دارد
+        BtreeGistExtension(),
+        migrations.CreateModel(
+            name='AssetAttributeValueHistory',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', django_jalali.db.models.jDateTimeField(auto_now_add=True)),
+                ('updated_at', django_jalali.db.models.jDateTimeField(auto_now=True)),
+                ('value_id', models.UUIDField()),
+                ('value_int', models.BigIntegerField(blank=True, null=True)),
+                ('value_float', models.FloatField(blank=True, null=True)),
+                ('value_str', models.TextField(blank=True, null=True)),
+                ('value_bool', models.BooleanField(blank=True, null=True)),
+                ('value_date', django_jalali.db.models.jDateField(blank=True, null=True)),
+                ('choice', models.TextField(blank=True, null=True)),
+                ('value_list', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, null=True, size=None)),
+                ('valid_from', django_jalali.db.models.jDateTimeField()),
+                ('valid_to', django_jalali.db.models.jDateTimeField(blank=True, null=True)),
+                ('asset', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.asset')),
+                ('attribute', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.attribute')),
+                ('unit', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='assets.assetunit')),
+            ],
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+        # ایندکس‌ها بعد از بارگذاری یک‌جا ساخته می‌شوند، نه ردیف به ردیف حین کپی
+        migrations.AddIndex(
+            model_name='assetattributevaluehistory',
+            index=django.contrib.postgres.indexes.GistIndex(models.F('unit'), assets.models.ValidityRange(), name='idx_vh_unit_validity'),
+        ),
+        migrations.AddIndex(
+            model_name='assetattributevaluehistory',
+            index=models.Index(condition=models.Q(('valid_to__isnull', True)), fields=['value_id'], name='idx_vh_open'),
+        ),
+    ]
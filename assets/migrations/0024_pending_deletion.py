@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0023_assetattributevaluehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='assetunit',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:32
+
+import assets.models
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+MAX_LISTED_ROWS = 50
+
+
+def check_date_order(apps, schema_editor):
+    """
+    ردیف‌های با start_date بعد از end_date جلوی ck_rel_date_order و ایندکس‌های daterange را می‌گیرند.
+    داده‌ی کاربر بی‌صدا عوض نمی‌شود: مهاجرت با فهرست این ردیف‌ها متوقف می‌شود تا قبل از اجرای دوباره
+    دستی اصلاح شوند (جابه‌جایی تاریخ‌ها یا خالی کردن end_date).
+    """
+    AssetRelation = apps.get_model('assets', 'AssetRelation')
+    inverted = AssetRelation.objects.filter(start_date__gt=F('end_date')).order_by('pk')
+    count = inverted.count()
+    if not count:
+        return
+    rows = "\n".join(
+        f"  {pk}: start_date={start} end_date={end}"
+        for pk, start, end in inverted.values_list('pk', 'start_date', 'end_date')[:MAX_LISTED_ROWS]
+    )
+    more = f"\n  ... و {count - MAX_LISTED_ROWS} ردیف دیگر" if count > MAX_LISTED_ROWS else ""
+    raise RuntimeError(
+        f"{count} رابطه در assets_assetrelation تاریخ شروع بعد از پایان دارند؛ قبل از مهاجرت اصلاحشان کنید:\n"
+        f"{rows}{more}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0024_pending_deletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # ردیف‌های قدیمی با تاریخ وارونه ساختن ایندکس‌های daterange را می‌شکنند؛ مهاجرت با فهرستشان متوقف می‌شود
+        migrations.RunPython(check_date_order, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='assetrelation',
+            constraint=models.CheckConstraint(condition=models.Q(('start_date__isnull', True), ('end_date__isnull', True), ('start_date__lte', models.F('end_date')), _connector='OR'), name='ck_rel_date_order'),
+        ),
+        migrations.AddIndex(
+            model_name='assetrelation',
+            index=django.contrib.postgres.indexes.GistIndex(assets.models.ActiveRange(), name='idx_rel_active'),
+        ),
+        migrations.AddIndex(
+            model_name='assetrelation',
+            index=django.contrib.postgres.indexes.GistIndex(models.F('source_asset'), assets.models.ActiveRange(), name='idx_rel_source_active'),
+        ),
+        migrations.AddIndex(
+            model_name='assetrelation',
+            index=django.contrib.postgres.indexes.GistIndex(models.F('target_asset'), assets.models.ActiveRange(), name='idx_rel_target_active'),
+        ),
+        migrations.AddIndex(
+            model_name='assetrelation',
+            index=models.Index(condition=models.Q(('end_date__isnull', False)), fields=['end_date', 'id'], name='idx_rel_end_date'),
+        ),
+    ]
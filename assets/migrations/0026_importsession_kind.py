@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0025_relation_temporal_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importsession',
+            name='column_map',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='importsession',
+            name='kind',
+            field=models.CharField(choices=[('units', 'Units'), ('relations', 'Relations')], default='units', max_length=16),
+        ),
+    ]
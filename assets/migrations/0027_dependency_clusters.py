@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:36
+
+import django.db.models.deletion
+import django_jalali.db.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0026_importsession_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DependencyCluster',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', django_jalali.db.models.jDateTimeField(auto_now_add=True)),
+                ('updated_at', django_jalali.db.models.jDateTimeField(auto_now=True)),
+                ('scope', models.CharField(blank=True, default='', max_length=100)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('dirty', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', '-size'], name='idx_cluster_scope_size'), models.Index(condition=models.Q(('dirty', True)), fields=['scope'], name='idx_cluster_dirty')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UnitCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(blank=True, default='', max_length=100)),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='assets.dependencycluster')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clusters', to='assets.assetunit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cluster', 'unit'], name='idx_unit_cluster_members')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'unit'), name='uq_unit_cluster_scope')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# قید ممکن است قبلاً با دستور partition_attribute_values حذف شده باشد؛ پس با IF EXISTS و از روی کاتالوگ
+DROP_FK_SQL = """
+DO $$
+DECLARE fk record;
+BEGIN
+    FOR fk IN
+        SELECT conname FROM pg_constraint
+         WHERE conrelid = 'assets_assetrelation'::regclass
+           AND confrelid = 'assets_assetattributevalue'::regclass
+           AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE assets_assetrelation DROP CONSTRAINT IF EXISTS %I', fk.conname);
+    END LOOP;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0027_dependency_clusters'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(DROP_FK_SQL, reverse_sql=migrations.RunSQL.noop),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='assetrelation',
+                    name='attribute_value',
+                    field=models.ForeignKey(db_constraint=False, null=True,
+                                            on_delete=django.db.models.deletion.SET_NULL,
+                                            related_name='edges', to='assets.assetattributevalue'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0028_relation_attribute_value_no_db_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importsession',
+            name='state',
+            field=models.CharField(choices=[('uploaded', 'Uploaded'), ('mapped', 'Mapped'), ('edited', 'Edited'), ('committing', 'Committing'), ('committed', 'Committed'), ('failed', 'Failed')], default='uploaded', max_length=16),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import DateTimeRangeField, DateRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 import django_jalali.db.models as jmodels
 
 from accounts.models import User
@@ -50,6 +52,22 @@ class Attribute(BaseModel):
 
 # ---------- Assets & Type Rules ----------
 
+class VisibleAssetManager(models.Manager):
+    """دارایی‌های در انتظار حذف (assets.deletion) از همه‌ی کوئری‌های عادی پنهان هستند"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
+class VisibleUnitManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False, asset__pending_deletion=False)
+
+    def of_asset(self, asset_id):
+        """یونیت‌های دارایی‌ای که قابل مشاهده بودنش را caller قبلاً سنجیده؛ بدون JOIN به جدول asset"""
+        return super().get_queryset().filter(asset_id=asset_id, pending_deletion=False)
+
+
 class Asset(BaseModel):
     class AssetType(models.TextChoices):
         IT = 'it', 'دارایی‌های IT'
@@ -61,12 +79,23 @@ class Asset(BaseModel):
     is_active = models.BooleanField(default=True)
     is_registered = models.BooleanField(default=True, db_index=True)
 
+    # شمارنده‌های دنرمال‌شده‌ی یونیت‌ها (assets.counters)؛ هم‌زمان با نوشتن یونیت‌ها به‌روز می‌شوند
+    unit_count = models.PositiveIntegerField(default=0)
+    registered_unit_count = models.PositiveIntegerField(default=0)
+    active_unit_count = models.PositiveIntegerField(default=0)
+    pending_deletion = models.BooleanField(default=False, db_index=True)
+
     owner = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
 
+    objects = VisibleAssetManager()
+    all_objects = models.Manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['asset_type']),
             models.Index(fields=['title']),
+            # LIKE 'prefix%' با collation غیر C فقط از pattern_ops استفاده می‌کند
+            models.Index(fields=['title'], name='idx_asset_title_prefix', opclasses=['varchar_pattern_ops']),
         ]
 
     def __str__(self):
@@ -82,8 +111,12 @@ class AssetUnit(BaseModel):
     code  = models.CharField(max_length=120, null=True, blank=True, unique=True)    # اگر code نمی‌دهی، خالی بگذار
     is_active = models.BooleanField(default=True)
     is_registered = models.BooleanField(default=True, db_index=True)
+    pending_deletion = models.BooleanField(default=False, db_index=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
 
+    objects = VisibleUnitManager()
+    all_objects = models.Manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['asset']),
@@ -109,6 +142,19 @@ class AssetTypeAttribute(BaseModel):
 
 # ---------- EAV Values ----------
 
+class AssetAttributeValueQuerySet(models.QuerySet):
+    """
+    جدول می‌تواند روی asset_id هش‌پارتیشن شده باشد (assets.partitioning)؛
+    فیلتر asset_id کنار unit باعث می‌شود PostgreSQL فقط یک پارتیشن را بخواند.
+    """
+
+    def for_asset(self, asset_id):
+        return self.filter(asset_id=asset_id)
+
+    def for_unit(self, unit):
+        return self.filter(asset_id=unit.asset_id, unit=unit)
+
+
 class AssetAttributeValue(BaseModel):
     class Status(models.TextChoices):
         REGISTERED = 'registered', 'رجیستر شده'
@@ -126,11 +172,15 @@ class AssetAttributeValue(BaseModel):
     value_bool = models.BooleanField(null=True, blank=True)
     value_date = jmodels.jDateField(null=True, blank=True)
     choice = models.TextField(null=True, blank=True)
+    # MULTI_CHOICE و TAGS؛ با GIN ایندکس می‌شود تا value_list @> ARRAY[...] سریع باشد
+    value_list = ArrayField(base_field=models.TextField(), null=True, blank=True)
 
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.REGISTERED)
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
 
+    objects = AssetAttributeValueQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['asset', 'attribute'], name='idx_v_asset_attr'),
@@ -139,14 +189,64 @@ class AssetAttributeValue(BaseModel):
             models.Index(fields=['value_date'], name='idx_v_date'),
             models.Index(fields=['value_int'], name='idx_v_int'),
             models.Index(fields=['value_float'], name='idx_v_float'),
+            GinIndex(fields=['value_list'], name='idx_v_list'),
         ]
 
     def __str__(self):
         return self.asset.title
 
 
+class ValidityRange(models.Func):
+    """tstzrange(valid_from, valid_to, '[)')؛ valid_to خالی یعنی بازه‌ی باز (نسخه‌ی فعلی)"""
+    function = 'tstzrange'
+    output_field = DateTimeRangeField()
+
+    def __init__(self, start='valid_from', end='valid_to', **extra):
+        super().__init__(models.F(start), models.F(end), models.Value('[)'), **extra)
+
+
+class AssetAttributeValueHistory(BaseModel):
+    """
+    تاریخچه‌ی append-only مقادیر: هر نسخه‌ی یک AssetAttributeValue با بازه‌ی اعتبار [valid_from, valid_to).
+    FK ها بدون قید دیتابیس هستند تا با حذف یونیت/دارایی تاریخچه باقی بماند.
+    """
+    value_id = models.UUIDField()
+    asset = models.ForeignKey(Asset, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    unit = models.ForeignKey('AssetUnit', on_delete=models.DO_NOTHING, db_constraint=False,
+                             null=True, blank=True, related_name='+')
+    attribute = models.ForeignKey(Attribute, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+
+    value_int = models.BigIntegerField(null=True, blank=True)
+    value_float = models.FloatField(null=True, blank=True)
+    value_str = models.TextField(null=True, blank=True)
+    value_bool = models.BooleanField(null=True, blank=True)
+    value_date = jmodels.jDateField(null=True, blank=True)
+    choice = models.TextField(null=True, blank=True)
+    value_list = ArrayField(base_field=models.TextField(), null=True, blank=True)
+
+    valid_from = jmodels.jDateTimeField()
+    valid_to = jmodels.jDateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # «مقادیر یونیت X در لحظه‌ی T» = یک probe روی این ایندکس
+            GistIndex(models.F('unit'), ValidityRange(), name='idx_vh_unit_validity'),
+            # بستن نسخه‌ی باز یک مقدار هنگام ویرایش/حذف
+            models.Index(fields=['value_id'], name='idx_vh_open', condition=models.Q(valid_to__isnull=True)),
+        ]
+
+
 # ---------- Relations (Temporal Edges) ----------
 
+class ActiveRange(models.Func):
+    """daterange(start_date, end_date, '[]')؛ هر دو سر شامل می‌شوند و تاریخ خالی یعنی بی‌کران"""
+    function = 'daterange'
+    output_field = DateRangeField()
+
+    def __init__(self, start='start_date', end='end_date', **extra):
+        super().__init__(models.F(start), models.F(end), models.Value('[]'), **extra)
+
+
 class Relation(BaseModel):
     key = models.CharField(max_length=100, unique=True)  # مثل: depends_on / connected_to / owns
     name = models.CharField(max_length=200)              # برچسب خوانا
@@ -165,24 +265,82 @@ class AssetRelation(BaseModel):
     start_date = jmodels.jDateField(null=True, blank=True)
     end_date =  jmodels.jDateField(null=True, blank=True)
 
-    attribute_value = models.ForeignKey(AssetAttributeValue, on_delete=models.SET_NULL, related_name="edges", null=True)
+    # بدون قید FK در دیتابیس: جدول AssetAttributeValue ممکن است پارتیشن‌شده باشد (assets.partitioning)
+    # و FK به آن فقط روی کلید کامل (id, asset_id) ممکن است؛ SET_NULL را خود Django انجام می‌دهد
+    attribute_value = models.ForeignKey(AssetAttributeValue, on_delete=models.SET_NULL, related_name="edges", null=True,
+                                        db_constraint=False)
 
     note = models.TextField(null=True, blank=True)
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            # daterange() با ابتدای بزرگ‌تر از انتها خطا می‌دهد؛ بدون این قید ایندکس‌های زیر نوشتن را می‌شکنند
+            models.CheckConstraint(
+                condition=models.Q(start_date__isnull=True) | models.Q(end_date__isnull=True)
+                | models.Q(start_date__lte=models.F('end_date')),
+                name='ck_rel_date_order',
+            ),
+        ]
+        indexes = [
+            # «روابط فعال در تاریخ X» سراسری و برای یک یونیت (btree_gist برای ستون uuid)
+            GistIndex(ActiveRange(), name='idx_rel_active'),
+            GistIndex(models.F('source_asset'), ActiveRange(), name='idx_rel_source_active'),
+            GistIndex(models.F('target_asset'), ActiveRange(), name='idx_rel_target_active'),
+            # روابط رو به انقضا / منقضی به ترتیب end_date (keyset)
+            models.Index(fields=['end_date', 'id'], name='idx_rel_end_date', condition=models.Q(end_date__isnull=False)),
+        ]
+
     def __str__(self):
         return f"{self.relation.key}: {self.source_asset_id} -> {self.target_asset_id}"
 
+class DependencyCluster(BaseModel):
+    """
+    مؤلفه‌ی همبند ضعیف گراف روابط (assets.clusters). scope خالی = همه‌ی روابط، وگرنه key یک رابطه.
+    یونیت‌های بدون یال عضو هیچ خوشه‌ای نیستند (خوشه‌ی تک‌عضوی ضمنی).
+    """
+    scope = models.CharField(max_length=100, blank=True, default="")
+    size = models.PositiveIntegerField(default=0)
+    # حذف یال ممکن است خوشه را بشکند؛ تا بازمحاسبه‌ی آن در پس‌زمینه dirty می‌ماند
+    dirty = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['scope', '-size'], name='idx_cluster_scope_size'),
+            models.Index(fields=['scope'], name='idx_cluster_dirty', condition=models.Q(dirty=True)),
+        ]
+
+
+class UnitCluster(models.Model):
+    scope = models.CharField(max_length=100, blank=True, default="")
+    unit = models.ForeignKey(AssetUnit, on_delete=models.CASCADE, related_name='clusters')
+    cluster = models.ForeignKey(DependencyCluster, on_delete=models.CASCADE, related_name='members')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'unit'], name='uq_unit_cluster_scope'),
+        ]
+        indexes = [
+            models.Index(fields=['cluster', 'unit'], name='idx_unit_cluster_members'),
+        ]
+
+
 # ---------- Upload CSB ------------------
 
 
 class ImportSession(BaseModel):
+    class Kind(models.TextChoices):
+        UNITS     = "units",     "Units"
+        RELATIONS = "relations", "Relations"
+
     class State(models.TextChoices):
         UPLOADED  = "uploaded",  "Uploaded"
         MAPPED    = "mapped",    "Mapped"
         EDITED    = "edited", "Edited"
+        COMMITTING = "committing", "Committing"   # کار پس‌زمینه‌ی ایمپورت روابط در حال اجرا
         COMMITTED = "committed", "Committed"
+        FAILED    = "failed", "Failed"            # ایمپورت روابط شکست خورد؛ چیزی نوشته نشده و قابل تکرار است
 
     file = models.FileField(upload_to="imports/%Y/%m/%d/")
     filename = models.CharField(max_length=255)
@@ -198,6 +356,10 @@ class ImportSession(BaseModel):
     unit_label_column = models.CharField(max_length=255, null=True, blank=True)  # الزامی در مرحله Mapping
     attribute_map = models.JSONField(default=dict, blank=True, null=True)  # {"col_name": "attribute_uuid", ...} (اختیاری)
 
+    kind = models.CharField(max_length=16, choices=Kind.choices, default=Kind.UNITS)
+    # ایمپورت روابط: {"source_code": "col", "target_label": "col", "relation": "col", ...}
+    column_map = models.JSONField(default=dict, blank=True)
+
     state = models.CharField(max_length=16, choices=State.choices, default=State.UPLOADED)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
 
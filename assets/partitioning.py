@@ -0,0 +1,123 @@
+"""
+مهاجرت اختیاری AssetAttributeValue به هش‌پارتیشن روی asset_id (PostgreSQL declarative partitioning).
+
+با مایگریشن‌های معمولی انجام نمی‌شود چون روی جدول بزرگ زمان‌بر است و باید در پنجره‌ی نگهداری
+اجرا شود؛ از طریق دستور partition_attribute_values اجرا کنید.
+
+محدودیت‌های PostgreSQL که اینجا رعایت شده‌اند:
+  - کلید اصلی باید ستون پارتیشن را شامل شود → PRIMARY KEY (id, asset_id)
+  - FK از جدول دیگر به جدول پارتیشن‌شده فقط روی کلید یکتای کامل ممکن است؛ برای همین
+    AssetRelation.attribute_value با db_constraint=False تعریف شده (مایگریشن 0028) و قید دیتابیسی ندارد.
+    اگر هنوز FK ورودی‌ای وجود داشته باشد (مایگریشن‌ها اجرا نشده‌اند یا مدل جدیدی اضافه شده) تبدیل
+    انجام نمی‌شود، چون حذف قید با SQL خام وضعیت مایگریشن‌های Django را از دیتابیس جدا می‌کند.
+  - ایندکس CONCURRENTLY روی جدول پارتیشن‌شده پشتیبانی نمی‌شود؛ مایگریشن‌های بعدی این جدول
+    باید از AddIndex معمولی استفاده کنند.
+"""
+from django.db import connection, transaction
+
+from assets.models import AssetAttributeValue
+
+DEFAULT_PARTITIONS = 16
+
+
+def _table():
+    return AssetAttributeValue._meta.db_table
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [_table()])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def _fetch(cursor, sql, params):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def build_partition_sql(partitions=DEFAULT_PARTITIONS, keep_old=False):
+    """فهرست دستورات SQL تبدیل جدول؛ ایندکس‌ها و FK های فعلی از کاتالوگ خوانده و روی جدول جدید ساخته می‌شوند"""
+    table = _table()
+    old = f"{table}_unpartitioned"
+
+    with connection.cursor() as cursor:
+        indexes = _fetch(cursor, """
+            SELECT i.relname, pg_get_indexdef(i.oid)
+              FROM pg_index x
+              JOIN pg_class i ON i.oid = x.indexrelid
+             WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary
+        """, [table])
+        outgoing_fks = _fetch(cursor, """
+            SELECT conname, pg_get_constraintdef(oid)
+              FROM pg_constraint
+             WHERE conrelid = to_regclass(%s) AND contype = 'f'
+        """, [table])
+        primary_key = _fetch(cursor, """
+            SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'
+        """, [table])
+        incoming_fks = _fetch(cursor, """
+            SELECT conrelid::regclass::text, conname
+              FROM pg_constraint
+             WHERE confrelid = to_regclass(%s) AND contype = 'f'
+        """, [table])
+
+    if incoming_fks:
+        refs = ", ".join(f"{ref_table}.{name}" for ref_table, name in incoming_fks)
+        raise RuntimeError(
+            f"foreign keys reference {table} ({refs}); declare them with db_constraint=False in a migration first"
+        )
+
+    sql = [f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE']
+    sql.append(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    for (name,) in primary_key:
+        # نام ایندکس کلید اصلی آزاد شود تا جدول جدید همان نام را بگیرد
+        sql.append(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{name}" TO "{old}_pkey"')
+    sql += [
+        f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY HASH (asset_id)',
+        f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, asset_id)',
+    ]
+    for remainder in range(partitions):
+        sql.append(
+            f'CREATE TABLE "{table}_p{remainder}" PARTITION OF "{table}" '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    sql.append(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+
+    for name, definition in outgoing_fks:
+        sql.append(f'ALTER TABLE "{old}" DROP CONSTRAINT "{name}"')
+        sql.append(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+    for name, definition in indexes:
+        # نام ایندکس‌ها (idx_v_asset_attr و ...) روی جدول جدید حفظ می‌شود تا مایگریشن‌های Django پیدایشان کنند
+        sql.append(f'DROP INDEX "{name}"')
+        sql.append(definition.replace(f' ON public.{table} ', f' ON public."{table}" ')
+                   .replace(f' ON {table} ', f' ON "{table}" '))
+
+    sql.append(f'DROP TABLE "{old}"' if not keep_old else f'ANALYZE "{old}"')
+    sql.append(f'ANALYZE "{table}"')
+    return sql
+
+
+def partition_attribute_values(partitions=DEFAULT_PARTITIONS, keep_old=False):
+    if is_partitioned():
+        raise RuntimeError(f"{_table()} is already partitioned")
+    statements = build_partition_sql(partitions, keep_old)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    return statements
+
+
+def partition_stats():
+    """هر پارتیشن با تخمین تعداد ردیف و حجم؛ VACUUM/REINDEX را می‌توان پارتیشن به پارتیشن اجرا کرد"""
+    with connection.cursor() as cursor:
+        rows = _fetch(cursor, """
+            SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+              FROM pg_inherits i
+              JOIN pg_class c ON c.oid = i.inhrelid
+             WHERE i.inhparent = to_regclass(%s)
+             ORDER BY c.relname
+        """, [_table()])
+    return [{"partition": name, "rows": rows_estimate, "bytes": size} for name, rows_estimate, size in rows]
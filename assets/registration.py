@@ -0,0 +1,102 @@
+from django.db import connection, transaction
+
+from core.jobs import start_job
+from assets.counters import registration_changed
+from assets.models import Asset, AssetUnit, AssetTypeAttribute, AssetAttributeValue
+
+RECOMPUTE_JOB_KIND = "recompute_registration"
+RECOMPUTE_CHUNK_SIZE = 5000
+
+# یونیت ثبت‌شده است اگر هیچ خصیصه‌ی الزامی‌ای بدون مقدار نداشته باشد.
+# فقط ردیف‌هایی که مقدارشان واقعاً عوض می‌شود UPDATE می‌شوند.
+_RECOMPUTE_SQL = """
+    WITH computed AS (
+        SELECT u.id,
+               NOT EXISTS (
+                   SELECT 1
+                     FROM {rule} AS r
+                    WHERE r.asset_id = u.asset_id
+                      AND r.is_required
+                      AND NOT EXISTS (
+                          SELECT 1 FROM {value} AS v
+                           WHERE v.asset_id = u.asset_id
+                             AND v.unit_id = u.id
+                             AND v.attribute_id = r.attribute_id
+                      )
+               ) AS registered
+          FROM {unit} AS u
+         WHERE u.asset_id = %s
+           AND NOT u.pending_deletion
+           AND u.id > %s
+           {upper}
+    )
+    UPDATE {unit} AS u
+       SET is_registered = c.registered,
+           updated_at = NOW()
+      FROM computed AS c
+     WHERE u.id = c.id
+       AND u.is_registered IS DISTINCT FROM c.registered
+    RETURNING c.registered
+"""
+
+_ZERO_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+def _recompute_sql(bounded):
+    return _RECOMPUTE_SQL.format(
+        unit=AssetUnit._meta.db_table,
+        rule=AssetTypeAttribute._meta.db_table,
+        value=AssetAttributeValue._meta.db_table,
+        upper="AND u.id <= %s" if bounded else "",
+    )
+
+
+def recompute_registration(asset_id, chunk_size=RECOMPUTE_CHUNK_SIZE, job=None):
+    """
+    بازمحاسبه‌ی is_registered همه‌ی یونیت‌های یک دارایی.
+    یونیت‌ها به ترتیب id در بازه‌های chunk_size تایی (keyset) پیمایش می‌شوند و هر بازه
+    با یک UPDATE در تراکنش خودش به‌روز می‌شود تا قفل‌ها کوتاه بمانند.
+    """
+    stats = {"processed": 0, "flipped": 0, "registered": 0, "unregistered": 0}
+    # دارایی در انتظار حذف: یونیت‌هایش در حال پاک شدن‌اند و شمارنده‌هایش دیگر معنا ندارند
+    if not Asset.objects.filter(pk=asset_id).exists():
+        return stats
+
+    units = AssetUnit.objects.of_asset(asset_id).order_by("pk")
+    if job is not None:
+        job.report(total=units.count())
+
+    last = _ZERO_UUID
+    while True:
+        # آخرین id این بازه؛ None یعنی بازه‌ی آخر
+        edge = list(units.filter(pk__gt=last).values_list("pk", flat=True)[chunk_size - 1:chunk_size])
+        upper = edge[0] if edge else None
+        size = chunk_size if upper else units.filter(pk__gt=last).count()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(_recompute_sql(upper is not None), [asset_id, last] + ([upper] if upper else []))
+            flipped = [row[0] for row in cursor.fetchall()]
+            gained = sum(1 for v in flipped if v)
+            registration_changed(asset_id, gained - (len(flipped) - gained))
+
+        stats["processed"] += size
+        stats["flipped"] += len(flipped)
+        stats["registered"] += sum(1 for v in flipped if v)
+        stats["unregistered"] += sum(1 for v in flipped if not v)
+        if job is not None:
+            job.report(processed=stats["processed"], **stats)
+
+        if upper is None:
+            break
+        last = upper
+
+    return stats
+
+
+def _recompute_job(job, asset_id):
+    return recompute_registration(asset_id, job=job)
+
+
+def schedule_registration_recompute(asset_id, owner=None):
+    """بازمحاسبه را بعد از commit تراکنش جاری در پس‌زمینه اجرا می‌کند"""
+    return start_job(RECOMPUTE_JOB_KIND, _recompute_job, params={"asset_id": str(asset_id)}, owner=owner)
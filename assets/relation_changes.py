@@ -0,0 +1,40 @@
+"""
+نقطه‌ی واحد اعلام تغییر یال‌ها به ساختارهای مشتق از گراف روابط
+(ایندکس درون‌حافظه‌ای assets.graph_index و خوشه‌های assets.clusters).
+داخل همان تراکنشی صدا زده شود که یال‌ها نوشته می‌شوند.
+"""
+from collections import Counter
+
+from assets.graph_index import edge_key, record_edge_changes, invalidate_graph
+from assets.clusters import clusters_edges_changed, computed_scopes, mark_units_dirty, \
+    schedule_cluster_compute, schedule_cluster_split
+
+
+def _triple(e):
+    return e if isinstance(e, tuple) else edge_key(e)
+
+
+def relations_changed(added=(), removed=()):
+    """added/removed: اشیای AssetRelation یا سه‌تایی (source, target, relation)"""
+    added, removed = Counter(_triple(e) for e in added), Counter(_triple(e) for e in removed)
+    # ویرایش تاریخ/یادداشت یک یال همان سه‌تایی را هم حذف و هم اضافه می‌کند؛ برای گراف تغییری نیست
+    unchanged = added & removed
+    added, removed = list((added - unchanged).elements()), list((removed - unchanged).elements())
+    if not added and not removed:
+        return
+    record_edge_changes(added, removed)
+    clusters_edges_changed(added, removed)
+
+
+def relations_bulk_loaded():
+    """بارگذاری‌های خیلی بزرگ: به‌جای تغییر به تغییر، ایندکس و خوشه‌ها از نو ساخته می‌شوند"""
+    invalidate_graph()
+    for scope in computed_scopes():
+        schedule_cluster_compute(scope)
+
+
+def units_leaving_graph(unit_ids):
+    """یونیت‌های در صف حذف: یال‌هایشان از گراف بیرون می‌رود"""
+    invalidate_graph()
+    if mark_units_dirty(unit_ids):
+        schedule_cluster_split()
@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_version, get_versions, bump_version_on_commit
+from assets.models import AssetTypeAttribute
+
+
+RULES_VERSION_KEY = "asset_rules_version:{asset_id}"
+RULES_DATA_KEY = "asset_rules:{asset_id}:v{version}"
+RULES_DATA_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class AttributeRule:
+    """
+    یک قانون AssetTypeAttribute به همراه اطلاعات لازم از Attribute؛
+    immutable است تا بین درخواست‌ها و thread ها به اشتراک گذاشته شود.
+    """
+    attribute_id: str
+    title: str
+    title_en: str
+    property_type: str
+    options: Tuple[str, ...]
+    category_id: Optional[str]
+    category_name: Optional[str]
+    owner_id: Optional[int]
+    is_required: bool
+    is_multi: bool
+    min_count: int
+    max_count: Optional[int]
+
+
+class AssetRules:
+    """مجموعه‌ی قوانین یک دارایی در یک نسخه‌ی مشخص"""
+    __slots__ = ("asset_id", "version", "rules", "by_attribute", "required_ids")
+
+    def __init__(self, asset_id, version, rules: Tuple[AttributeRule, ...]):
+        self.asset_id = str(asset_id)
+        self.version = version
+        self.rules = rules
+        self.by_attribute = MappingProxyType({r.attribute_id: r for r in rules})
+        self.required_ids = frozenset(r.attribute_id for r in rules if r.is_required)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get(self, attribute_id):
+        return self.by_attribute.get(str(attribute_id))
+
+
+class _RulesLRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+_local = _RulesLRU(getattr(settings, "ASSET_RULES_CACHE_SIZE", 512))
+
+
+def _load_from_db(asset_ids) -> Dict[str, Tuple[AttributeRule, ...]]:
+    loaded = {str(pk): [] for pk in asset_ids}
+    qs = (AssetTypeAttribute.objects
+          .filter(asset_id__in=list(asset_ids))
+          .select_related("attribute__category")
+          .order_by("created_at"))
+    for r in qs:
+        a = r.attribute
+        loaded[str(r.asset_id)].append(AttributeRule(
+            attribute_id=str(a.id),
+            title=a.title,
+            title_en=a.title_en,
+            property_type=a.property_type,
+            options=tuple(a.options or ()),
+            category_id=str(a.category_id) if a.category_id else None,
+            category_name=a.category.name if a.category else None,
+            owner_id=a.owner_id,
+            is_required=r.is_required,
+            is_multi=r.is_multi,
+            min_count=r.min_count,
+            max_count=r.max_count,
+        ))
+    return {pk: tuple(rules) for pk, rules in loaded.items()}
+
+
+def get_asset_rules(asset_id) -> AssetRules:
+    return get_asset_rules_many([asset_id])[str(asset_id)]
+
+
+def get_asset_rules_many(asset_ids: Iterable) -> Dict[str, AssetRules]:
+    """
+    قوانین چند دارایی؛ به‌ترتیب از LRU محلی، Redis و در نهایت دیتابیس خوانده می‌شود.
+    کلید کش = شناسه‌ی دارایی + نسخه، پس بعد از bump نسخه‌ی قدیمی دیگر خوانده نمی‌شود.
+    """
+    asset_ids = {str(pk) for pk in asset_ids}
+    if not asset_ids:
+        return {}
+
+    version_keys = {pk: RULES_VERSION_KEY.format(asset_id=pk) for pk in asset_ids}
+    versions = get_versions(version_keys.values())
+
+    result, missing_local = {}, {}
+    for pk in asset_ids:
+        version = versions[version_keys[pk]]
+        rules = _local.get((pk, version))
+        if rules is not None:
+            _local.count("local_hits")
+            result[pk] = rules
+        else:
+            missing_local[pk] = version
+
+    if missing_local:
+        data_keys = {pk: RULES_DATA_KEY.format(asset_id=pk, version=v) for pk, v in missing_local.items()}
+        from_redis = cache.get_many(list(data_keys.values()))
+        missing_redis = [pk for pk in missing_local if data_keys[pk] not in from_redis]
+        from_db = _load_from_db(missing_redis) if missing_redis else {}
+        if from_db:
+            cache.set_many({data_keys[pk]: rules for pk, rules in from_db.items()}, timeout=RULES_DATA_TIMEOUT)
+
+        for pk, version in missing_local.items():
+            if pk in from_db:
+                _local.count("misses")
+                rules = from_db[pk]
+            else:
+                _local.count("redis_hits")
+                rules = from_redis[data_keys[pk]]
+            result[pk] = AssetRules(pk, version, rules)
+            _local.put((pk, version), result[pk])
+
+    return result
+
+
+def bump_rules_version(asset_ids: Iterable):
+    for pk in {str(pk) for pk in asset_ids}:
+        bump_version_on_commit(RULES_VERSION_KEY.format(asset_id=pk))
+
+
+def rules_cache_stats():
+    stats = dict(_local.stats)
+    total = sum(stats.values())
+    stats["size"] = len(_local._data)
+    stats["hit_ratio"] = round((stats["local_hits"] + stats["redis_hits"]) / total, 4) if total else None
+    return stats
@@ -4,12 +4,23 @@ from multiprocessing.resource_tracker import register
 
 import jdatetime
 import json
+import uuid
 from rest_framework import serializers
 
 from django.db.models import Count, Q
 from django.db import transaction
+from django.utils import timezone
 
 from assets.models import *
+from assets.rules import get_asset_rules, bump_rules_version
+from assets.registration import schedule_registration_recompute
+from assets.counters import units_added, registration_changed
+from assets.history import record_value_changes, parse_as_of
+from assets.graph_index import edge_key
+from assets.relation_changes import relations_changed
+from assets.csv_import.utils import parse_date_flex
+from assets.temporal import ACTIVE, EXPIRING, EXPIRED, OUTGOING, INCOMING, BOTH
+from core.utils import decode_cursor
 
 
 class AttributeCategorySerializer(serializers.ModelSerializer):
@@ -108,6 +119,7 @@ class AssetCreateUpdateSerializer(serializers.ModelSerializer):
             ]
             if rules:
                 AssetTypeAttribute.objects.bulk_create(rules, ignore_conflicts=False)
+            bump_rules_version([asset.pk])
 
         return asset
 
@@ -123,6 +135,9 @@ class AssetCreateUpdateSerializer(serializers.ModelSerializer):
 
         if attrs_list is not None:
             self._validate_unique_attributes(attrs_list)
+            required_before = set(
+                instance.type_rules.filter(is_required=True).values_list("attribute_id", flat=True)
+            )
             instance.type_rules.all().delete()
             rules = [
                 AssetTypeAttribute(
@@ -138,6 +153,13 @@ class AssetCreateUpdateSerializer(serializers.ModelSerializer):
             ]
             if rules:
                 AssetTypeAttribute.objects.bulk_create(rules, ignore_conflicts=False)
+            # bulk_create سیگنال نمی‌فرستد
+            bump_rules_version([instance.pk])
+
+            required_after = {item["attribute"].pk for item in attrs_list if item.get("is_required", False)}
+            if required_after != required_before:
+                # وضعیت ثبت یونیت‌های موجود با قوانین جدید در پس‌زمینه بازمحاسبه می‌شود
+                self.registration_job = schedule_registration_recompute(instance.pk, owner=owner)
 
         return instance
 
@@ -152,9 +174,18 @@ class AssetReadSerializer(serializers.ModelSerializer):
                   'updated_at',
                   'title',
                   'asset_type',
+                  'unit_count',
+                  'registered_unit_count',
+                  'active_unit_count',
                   'attributes',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get("include_rules", True):
+            self.fields.pop("attributes")
+
     def get_attributes(self, obj):
+        # در لیست با Prefetch از قبل لود شده و کوئری جدیدی نمی‌زند
         return AssetTypeAttributeSerializer(obj.type_rules.all(), many=True).data
 
 
@@ -375,6 +406,8 @@ def render_aav_value(aav: AssetAttributeValue):
         return aav.value_bool
     if aav.value_date is not None:
         return aav.value_date.isoformat()
+    if aav.value_list is not None:
+        return aav.value_list
     if aav.choice is not None:
         return aav.choice
     return aav.value_str
@@ -532,6 +565,19 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
     def _parse_jalali_date(self, s):
         return jdatetime.datetime.strptime(str(s), "%Y/%m/%d").date()
 
+    LIST_TYPES = (Attribute.PropertyType.MULTI_CHOICE, Attribute.PropertyType.TAGS)
+
+    def _as_list(self, v):
+        """MULTI_CHOICE/TAGS: لیست، رشته‌ی JSON یک لیست یا یک مقدار تکی"""
+        if isinstance(v, str):
+            try:
+                v = json.loads(v)
+            except ValueError:
+                pass
+        if isinstance(v, (list, tuple)):
+            return [str(x) for x in v]
+        return [str(v)]
+
     def _to_bool(self, v):
         if isinstance(v, bool): return v
         if isinstance(v, str): return v.strip().lower() in ("true","1","yes","y","on","بله")
@@ -540,7 +586,7 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
     def _choices_validate(self, attribute, value):
         """
         اعتبارسنجی مقادیر انتخابی (single_choice / multi_choice)
-        - attribute: نمونه‌ی Attribute
+        - attribute: نمونه‌ی Attribute یا AttributeRule
         - value: مقدار ارسال‌شده (str یا list)
         """
         options = getattr(attribute, "options", None)  # یا هر فیلدی که گذاشتی
@@ -581,23 +627,103 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
 
         return value
 
+    def _load_rules(self, asset):
+        """
+        قوانین خصیصه‌ی یک دارایی؛ اگر فراخوان (مثلاً bulk) قبلاً آن‌ها را لود کرده
+        باشد از context خوانده می‌شود.
+        """
+        preloaded = self.context.get("rules_by_asset")
+        if preloaded is not None and str(asset.pk) in preloaded:
+            return preloaded[str(asset.pk)]
+        return get_asset_rules(asset.pk)
+
+    @staticmethod
+    def _canonical_uuid(value):
+        """شکل استاندارد uuid (حروف کوچک با خط تیره) یا None برای مقدار نامعتبر"""
+        try:
+            return str(uuid.UUID(str(value)))
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+    def _validate_relations(self, rels):
+        """
+        اعتبارسنجی روابط با یک کوئری IN برای target ها و یک کوئری برای relation ها.
+        در حالت bulk، شناسه‌های معتبر از قبل در context قرار می‌گیرند.
+        شناسه‌ها (id / target_asset / relation) به شکل استاندارد uuid بازنویسی می‌شوند.
+        """
+        for r in rels:
+            for key in ("id", "target_asset", "relation"):
+                if r.get(key):
+                    r[key] = self._canonical_uuid(r[key]) or r[key]
+
+        checked = [r for r in rels if not (r.get("_delete") and not r.get("id"))]
+        target_ids = {r["target_asset"] for r in checked if self._canonical_uuid(r.get("target_asset"))}
+        relation_ids = {r["relation"] for r in checked if self._canonical_uuid(r.get("relation"))}
+
+        known_units = self.context.get("known_unit_ids")
+        if known_units is None:
+            known_units = {str(pk) for pk in
+                           AssetUnit.objects.filter(pk__in=target_ids).values_list("pk", flat=True)} \
+                if target_ids else set()
+        known_relations = self.context.get("known_relation_ids")
+        if known_relations is None:
+            known_relations = {str(pk) for pk in
+                               Relation.objects.filter(pk__in=relation_ids).values_list("pk", flat=True)} \
+                if relation_ids else set()
+
+        # تاریخ‌های یال‌های موجود برای مقایسه‌ی start/end وقتی فقط یکی ارسال شده (یک کوئری IN)
+        edit_ids = {r["id"] for r in checked if r.get("id") and not r.get("_delete")
+                    and ("start_date" in r) != ("end_date" in r) and self._canonical_uuid(r["id"])}
+        current_dates = {str(pk): (start, end) for pk, start, end in
+                         AssetRelation.objects.filter(pk__in=edit_ids).values_list("pk", "start_date", "end_date")} \
+            if edit_ids else {}
+
+        for i, r in enumerate(rels, start=1):
+            if r.get("_delete") and not r.get("id"):
+                continue
+            if r.get("target_asset") and r["target_asset"] not in known_units:
+                raise serializers.ValidationError({"relations": f"[{i}] target_asset نامعتبر"})
+            if r.get("relation") and r["relation"] not in known_relations:
+                raise serializers.ValidationError({"relations": f"[{i}] relation نامعتبر"})
+            if r.get("_delete"):
+                continue
+
+            start, end = current_dates.get(r.get("id"), (None, None))
+            for key in ("start_date", "end_date"):
+                if key not in r:
+                    continue
+                value = self._rel_date(key, r[key])
+                if isinstance(value, date):
+                    value = jdatetime.date.fromgregorian(date=value)
+                if value is not None and not isinstance(value, jdatetime.date):
+                    raise serializers.ValidationError({"relations": f"[{i}] {key} نامعتبر"})
+                if key == "start_date":
+                    start = value
+                else:
+                    end = value
+            if start and end and end < start:
+                raise serializers.ValidationError({"relations": f"[{i}] end_date نباید قبل از start_date باشد."})
+
     # ===== validate
     def validate(self, data):
         mode = self._mode()
 
-        # asset را تعیین کن
-        asset = data.get('asset') if mode == 'create' else (data.get('asset') or self.instance.asset)
+        # asset را تعیین کن (در حالت bulk از context می‌آید تا برای هر آیتم کوئری نزنیم)
+        asset = data.get('asset') or self.context.get('asset')
+        if mode == 'update':
+            asset = asset or self.instance.asset
         if mode == 'update' and 'asset' in data and data['asset'] != self.instance.asset:
             raise serializers.ValidationError({"asset_id": "تغییر دارایی برای یک یونیت مجاز نیست."})
 
+        if asset is None:
+            raise serializers.ValidationError({"asset_id": "دارایی مشخص نشده است."})
+
         # قوانین
-        rules_qs = (AssetTypeAttribute.objects
-                    .select_related('attribute')
-                    .filter(asset=asset))
-        if not rules_qs.exists():
+        rules_list = self._load_rules(asset)
+        if not rules_list:
             raise serializers.ValidationError("برای این دارایی هیچ قانون خصیصه‌ای تعریف نشده.")
-        rules = {str(r.attribute_id): r for r in rules_qs}
-        required_ids = {str(r.attribute_id) for r in rules_qs if r.is_required}
+        rules = rules_list.by_attribute
+        required_ids = set(rules_list.required_ids)
 
         attrs = data.get('attributes', None)
 
@@ -605,17 +731,20 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
         current = {}
         if mode == 'update':
             by_attr = {}
-            for row in AssetAttributeValue.objects.filter(unit=self.instance).select_related('attribute'):
+            for row in AssetAttributeValue.objects.for_unit(self.instance).select_related('attribute'):
                 by_attr.setdefault(str(row.attribute_id), []).append(row)
             for aid, rows in by_attr.items():
-                a = rows[0].attribute
-                p = a.property_type
+                r = rules.get(aid)
+                p = r.property_type if r else rows[0].attribute.property_type
 
                 if p == Attribute.PropertyType.INT:     current[aid] = rows[0].value_int
                 elif p == Attribute.PropertyType.FLOAT: current[aid] = rows[0].value_float
                 elif p == Attribute.PropertyType.BOOL:  current[aid] = rows[0].value_bool
                 elif p == Attribute.PropertyType.DATE:  current[aid] = rows[0].value_date
+                elif p in self.LIST_TYPES:              current[aid] = rows[0].value_list
                 else:                                   current[aid] = rows[0].value_str
+            # update دوباره این ردیف‌ها را نمی‌خواند
+            data['_current_rows'] = by_attr
 
         effective = ({**current, **attrs} if attrs is not None else (current if mode=='update' else {}))
 
@@ -644,10 +773,9 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
 
             for attr_id, val in attrs.items():
                 r = rules[attr_id]
-                a = r.attribute
-                p = a.property_type
+                p = r.property_type
 
-                if not r.is_multi and isinstance(val, (list, tuple)):
+                if not r.is_multi and p not in self.LIST_TYPES and isinstance(val, (list, tuple)):
                     raise serializers.ValidationError({attr_id: "این خصیصه تک‌مقداری است؛ لیست ندهید"})
 
                 try:
@@ -660,7 +788,7 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
                     elif p == Attribute.PropertyType.DATE:
                         self._parse_jalali_date(val)
                     elif p == Attribute.PropertyType.MULTI_CHOICE:
-                        self._choices_validate(a, json.loads(val))
+                        self._choices_validate(r, self._as_list(val))
                     else:  # STR/CHOICE
                         if val is None:
                             raise ValueError()
@@ -674,22 +802,42 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
         # روابط (در صورت ارسال)
         rels = data.get('relations', None)
         if rels is not None:
-            for i, r in enumerate(rels, start=1):
-                if r.get("_delete") and not r.get("id"):
-                    continue
-                if r.get("target_asset") and not AssetUnit.objects.filter(pk=r["target_asset"]).exists():
-                    raise serializers.ValidationError({"relations": f"[{i}] target_asset نامعتبر"})
-                if r.get("relation") and not Relation.objects.filter(pk=r["relation"]).exists():
-                    raise serializers.ValidationError({"relations": f"[{i}] relation نامعتبر"})
-
+            self._validate_relations(rels)
 
         data["_rules"] = rules
         data["_asset"] = asset
         return data
 
     # ===== persistence
-    @transaction.atomic
-    def create(self, vd):
+    VALUE_COLUMNS = ("value_int", "value_float", "value_str", "value_bool", "value_date", "choice", "value_list")
+
+    def _value_columns(self, p, v):
+        """مقدار ورودی → ستون‌های نوع‌دار AssetAttributeValue (بقیه‌ی ستون‌ها None)"""
+        cols = dict.fromkeys(self.VALUE_COLUMNS)
+        if p == Attribute.PropertyType.INT:      cols["value_int"]   = int(v)
+        elif p == Attribute.PropertyType.FLOAT:  cols["value_float"] = float(v)
+        elif p == Attribute.PropertyType.BOOL:   cols["value_bool"]  = self._to_bool(v)
+        elif p == Attribute.PropertyType.DATE:   cols["value_date"]  = self._parse_jalali_date(v)
+        elif p in self.LIST_TYPES:               cols["value_list"]  = self._as_list(v)
+        else:  # STR یا SINGLE_CHOICE
+            cols["value_str"] = str(v)
+        return cols
+
+    def _rel_date(self, field, v):
+        try:
+            return AssetRelation._meta.get_field(field).to_python(v)
+        except Exception:
+            pass
+        try:
+            return self._parse_jalali_date(v)
+        except Exception:
+            return v
+
+    def build_objects(self, vd):
+        """
+        ساخت (بدون ذخیره) یونیت، مقادیر و روابط آن از روی validated_data.
+        create و bulk upsert هر دو از همین متد استفاده می‌کنند.
+        """
         asset = vd["_asset"]
         label = vd.get('label') or None
         code  = vd.get('code') or None
@@ -697,36 +845,26 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
         rules = vd["_rules"]
         rels  = vd.get('relations') or []
         registration = vd.get('_registration')
-        unit = AssetUnit.objects.create(
+        unit = AssetUnit(
             asset=asset, label=label, code=code,
-            is_active=True, is_registered=registration
+            is_active=True, is_registered=registration,
+            owner=vd.get('owner'),
         )
 
         rows = []
         def add_row(a, p, v):
-            row = {"asset": asset, "unit": unit, "attribute": a}
-            if p == Attribute.PropertyType.INT:      row["value_int"]   = int(v)
-            elif p == Attribute.PropertyType.FLOAT:  row["value_float"] = float(v)
-            elif p == Attribute.PropertyType.BOOL:   row["value_bool"]  = self._to_bool(v)
-            elif p == Attribute.PropertyType.DATE:   row["value_date"]  = self._parse_jalali_date(v)
-            elif p == Attribute.PropertyType.TAGS:   row['choice']      = str(val)
-            elif p == Attribute.PropertyType.MULTI_CHOICE: row['choice']      = str(val)
-            else:
-                row["value_str"] = str(v)
+            row = {"asset": asset, "unit": unit, "attribute_id": a.attribute_id, **self._value_columns(p, v)}
             rows.append(AssetAttributeValue(**row))
 
         for attr_id, val in attrs.items():
             rule = rules[attr_id]
-            a, p = rule.attribute, rule.attribute.property_type
+            a, p = rule, rule.property_type
             # if rule.is_multi and p == Attribute.PropertyType.CHOICE:
             #     for v in (val or []):
             #         add_row(a, p, v)
             # else:
             add_row(a, p, val)
 
-        if rows:
-            AssetAttributeValue.objects.bulk_create(rows, batch_size=500)
-
         rel_objs = []
         for r in (rels or []):
             relation_id = r.get("relation")
@@ -740,8 +878,20 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
                 start_date=r.get("start_date"),
                 end_date=r.get("end_date")
             ))
+
+        return unit, rows, rel_objs
+
+    @transaction.atomic
+    def create(self, vd):
+        unit, rows, rel_objs = self.build_objects(vd)
+        unit.save(force_insert=True)
+        units_added([unit])
+        if rows:
+            AssetAttributeValue.objects.bulk_create(rows, batch_size=500)
+            record_value_changes(created=rows)
         if rel_objs:
             AssetRelation.objects.bulk_create(rel_objs, batch_size=200)
+            relations_changed(added=rel_objs)
 
         return unit
 
@@ -749,80 +899,443 @@ class AssetUnitUpsertSerializer(serializers.Serializer):
     def update(self, unit: AssetUnit, vd):
         unit = AssetUnit.objects.select_for_update().get(pk=unit.pk)
 
-        if "label" in vd:
+        changed = []
+        if "label" in vd and unit.label != (vd.get("label") or None):
             unit.label = vd.get("label") or None
-        if "code" in vd:
+            changed.append("label")
+        if "code" in vd and unit.code != (vd.get("code") or None):
             unit.code = vd.get("code") or None
-        unit.is_registered = vd['_registration']
-        unit.save(update_fields=["label", "code", "is_registered"])
-
-        rules = vd["_rules"]
+            changed.append("code")
+        if "_registration" in vd and unit.is_registered != vd["_registration"]:
+            unit.is_registered = vd["_registration"]
+            changed.append("is_registered")
+            registration_changed(unit.asset_id, 1 if unit.is_registered else -1)
+        if changed:
+            unit.save(update_fields=changed + ["updated_at"])
 
         # attributes فقط اگر ارسال شده باشند
         attrs = vd.get("attributes", None)
         if attrs is not None:
-            for attr_id, val in attrs.items():
-                rule = rules[attr_id]
-                a, p = rule.attribute, rule.attribute.property_type
+            self._apply_value_diff(unit, vd["_rules"], attrs, vd.get("_current_rows"))
 
-                # همه مقدارهای قبلی رو پاک کن
-                AssetAttributeValue.objects.filter(unit=unit, attribute_id=a.id).delete()
+        # روابط
+        rels = vd.get("relations", None)
+        if rels is not None:
+            self._apply_relation_diff(unit, rels, vd.get("relations_mode", "patch"))
 
-                rows = []
+        return unit
 
-                def add(v):
-                    row = {"asset": unit.asset, "unit": unit, "attribute": a}
-                    if p == Attribute.PropertyType.INT:
-                        row["value_int"] = int(v)
-                    elif p == Attribute.PropertyType.FLOAT:
-                        row["value_float"] = float(v)
-                    elif p == Attribute.PropertyType.BOOL:
-                        row["value_bool"] = self._to_bool(v)
-                    elif p == Attribute.PropertyType.DATE:
-                        row["value_date"] = self._parse_jalali_date(v)
-                    elif p == Attribute.PropertyType.TAGS:
-                        row["choice"] = str(v)  # میشه JSON string از لیست
-                    elif p == Attribute.PropertyType.MULTI_CHOICE:
-                        row["choice"] = str(v)  # میشه JSON string از لیست
-                    else:  # STR یا SINGLE_CHOICE
-                        row["value_str"] = str(v)
-                    rows.append(AssetAttributeValue(**row))
+    def _apply_value_diff(self, unit, rules, attrs, current_rows=None):
+        """
+        مقادیر فعلی یک بار خوانده می‌شوند و فقط تفاوت‌ها نوشته می‌شوند:
+        ردیف‌های بدون تغییر دست نمی‌خورند، تغییرکرده‌ها با bulk_update،
+        جدیدها با bulk_create و ردیف‌های اضافه با یک DELETE ... IN.
+        """
+        if current_rows is None:
+            current_rows = {}
+            for row in AssetAttributeValue.objects.for_unit(unit).filter(attribute_id__in=list(attrs.keys())):
+                current_rows.setdefault(str(row.attribute_id), []).append(row)
+
+        now = timezone.now()
+        to_create, to_update, to_delete = [], [], []
+        update_fields = set()
+        for attr_id, val in attrs.items():
+            rule = rules[attr_id]
+            cols = self._value_columns(rule.property_type, val)
+            existing = current_rows.get(attr_id, [])
+
+            if not existing:
+                to_create.append(AssetAttributeValue(
+                    asset_id=unit.asset_id, unit=unit, attribute_id=rule.attribute_id, **cols
+                ))
+                continue
+
+            keep, extra = existing[0], existing[1:]
+            to_delete.extend(r.pk for r in extra)
+            diff = {k: v for k, v in cols.items() if getattr(keep, k) != v}
+            if diff:
+                for k, v in diff.items():
+                    setattr(keep, k, v)
+                keep.updated_at = now  # bulk_update فیلد auto_now را خودش پر نمی‌کند
+                update_fields.update(diff)
+                to_update.append(keep)
+
+        # فیلتر asset_id → روی جدول پارتیشن‌شده فقط پارتیشن همین دارایی قفل/اسکن می‌شود
+        values = AssetAttributeValue.objects.for_asset(unit.asset_id)
+        if to_delete:
+            values.filter(pk__in=to_delete).delete()
+        if to_update:
+            values.bulk_update(to_update, sorted(update_fields) + ["updated_at"], batch_size=500)
+        if to_create:
+            AssetAttributeValue.objects.bulk_create(to_create, batch_size=500)
+        record_value_changes(created=to_create, updated=to_update, deleted_ids=to_delete, now=now)
+
+    def _apply_relation_diff(self, unit, rels, mode):
+        """
+        روابط خروجی یونیت یک بار خوانده می‌شوند.
+        - patch: آیتم‌های id دار ویرایش/حذف و بقیه ایجاد می‌شوند.
+        - replace: مجموعه‌ی ارسالی وضعیت نهایی است؛ یال‌های موجود با id یا با
+          (relation, target, start, end) تطبیق داده می‌شوند و فقط اختلاف‌ها نوشته می‌شود.
+        """
+        existing = {str(r.pk): r for r in AssetRelation.objects.filter(source_asset=unit)}
+        by_key = {}
+        if mode == "replace":
+            for r in existing.values():
+                key = (str(r.relation_id), str(r.target_asset_id), r.start_date, r.end_date)
+                by_key.setdefault(key, []).append(r)
+
+        now = timezone.now()
+        matched, to_create, to_update, to_delete = set(), [], [], []
+        update_fields, old_edges = set(), []
+        for r in rels:
+            rel_id = str(r["id"]) if r.get("id") else None
+            if r.get("_delete"):
+                if rel_id in existing:
+                    to_delete.append(rel_id)
+                    matched.add(rel_id)
+                continue
+
+            fields = {}
+            if "relation" in r:
+                fields["relation_id"] = r["relation"]
+            if "target_asset" in r:
+                fields["target_asset_id"] = r["target_asset"]
+            if "start_date" in r:
+                fields["start_date"] = self._rel_date("start_date", r.get("start_date"))
+            if "end_date" in r:
+                fields["end_date"] = self._rel_date("end_date", r.get("end_date"))
+
+            current = existing.get(rel_id) if rel_id else None
+            if current is None and mode == "replace":
+                key = (str(fields.get("relation_id")), str(fields.get("target_asset_id")),
+                       fields.get("start_date"), fields.get("end_date"))
+                candidates = [c for c in by_key.get(key, []) if str(c.pk) not in matched]
+                current = candidates[0] if candidates else None
+
+            if current is not None:
+                matched.add(str(current.pk))
+                diff = {k: v for k, v in fields.items() if str(getattr(current, k)) != str(v)}
+                if diff:
+                    old_edges.append(edge_key(current))
+                    for k, v in diff.items():
+                        setattr(current, k, v)
+                    current.updated_at = now
+                    update_fields.update(diff)
+                    to_update.append(current)
+            elif not rel_id and fields.get("relation_id") and fields.get("target_asset_id"):
+                to_create.append(AssetRelation(source_asset=unit, **fields))
+
+        if mode == "replace":
+            to_delete.extend(pk for pk in existing if pk not in matched)
+
+        if to_delete:
+            AssetRelation.objects.filter(pk__in=to_delete, source_asset=unit).delete()
+        if to_update:
+            AssetRelation.objects.bulk_update(to_update, sorted(update_fields) + ["updated_at"], batch_size=200)
+        if to_create:
+            AssetRelation.objects.bulk_create(to_create, batch_size=200)
+        relations_changed(
+            added=to_update + to_create,
+            removed=old_edges + [edge_key(existing[pk]) for pk in to_delete],
+        )
 
-                add(val)
-                if rows:
-                    AssetAttributeValue.objects.bulk_create(rows, batch_size=500)
 
-        # روابط
-        rels = vd.get("relations", None)
-        mode = vd.get("relations_mode", "patch")
-        if rels is not None:
-            if mode == "replace":
-                AssetRelation.objects.filter(source_asset=unit).delete()
-
-            for r in rels:
-                rel_id = r.get("id")
-                if r.get("_delete"):
-                    if rel_id:
-                        AssetRelation.objects.filter(id=rel_id, source_asset=unit).delete()
+class AssetUnitBulkUpsertSerializer(serializers.Serializer):
+    # هر آیتم همان payload ـِ AssetUnitUpsertSerializer است؛ آیتم‌های دارای id ویرایش می‌شوند
+    # (فیلدهای نیامده دست نمی‌خورند، ولی relations_mode مثل PUT تکی پیش‌فرض replace است)
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=1000)
+
+
+class RelationBatchSerializer(serializers.Serializer):
+    """
+    ویرایش گروهی یال‌ها روی چند یونیت مبدأ در یک درخواست:
+      create: [{source_asset, target_asset, relation | relation_key, start_date?, end_date?, note?}]
+      update: [{id, target_asset?, relation? | relation_key?, start_date?, end_date?, note?}]
+      delete: [id, ...]
+    همه‌ی ارجاع‌ها با سه کوئری IN (یونیت‌ها، روابط، یال‌های موجود) سنجیده می‌شوند و خطاها
+    با اندیس آیتم یک‌جا برگردانده می‌شوند؛ نوشتن با bulk در یک تراکنش کوتاه انجام می‌شود.
+    هر یال در کل درخواست حداکثر یک بار (در update یا delete) می‌آید.
+    """
+    MAX_ITEMS = 5000
+    UPDATABLE = ("relation_id", "target_asset_id", "start_date", "end_date", "note")
+
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+
+    def validate(self, attrs):
+        creates, updates, deletes = attrs["create"], attrs["update"], attrs["delete"]
+        if not (creates or updates or deletes):
+            raise serializers.ValidationError("حداقل یکی از create / update / delete لازم است.")
+        if len(creates) + len(updates) + len(deletes) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f"حداکثر {self.MAX_ITEMS} آیتم در هر درخواست مجاز است.")
+
+        update_ids = [self._canonical_id(u.get("id")) for u in updates]
+        edge_ids = {str(i) for i in deletes} | {pk for pk in update_ids if pk}
+        # شناسه‌ها به شکل استاندارد UUID (حروف کوچک با خط تیره) مقایسه و ذخیره می‌شوند
+        unit_ids = {self._canonical_id(c.get(k)) for c in creates for k in ("source_asset", "target_asset")} \
+            | {self._canonical_id(u.get("target_asset")) for u in updates}
+        unit_ids.discard(None)
+        rel_refs = [item for item in creates + updates if item.get("relation") or item.get("relation_key")]
+
+        known_units = {str(pk) for pk in AssetUnit.objects.filter(pk__in=unit_ids)
+                       .values_list("pk", flat=True)} if unit_ids else set()
+        relation_by_id, relation_by_key = {}, {}
+        if rel_refs:
+            rel_ids = {self._canonical_id(r.get("relation")) for r in rel_refs} - {None}
+            rel_keys = {str(r["relation_key"]) for r in rel_refs if r.get("relation_key")}
+            for pk, key in Relation.objects.filter(Q(pk__in=rel_ids) | Q(key__in=rel_keys)).values_list("pk", "key"):
+                relation_by_id[str(pk)], relation_by_key[key] = str(pk), str(pk)
+        # یال‌های هدف update/delete؛ مبدأشان باید یونیت قابل مشاهده باشد
+        existing = {str(r.pk): r for r in AssetRelation.objects.filter(
+            pk__in=edge_ids, source_asset__pending_deletion=False, source_asset__asset__pending_deletion=False,
+        )} if edge_ids else {}
+
+        errors = {}
+
+        def resolve(section, i, item, current=None):
+            partial = current is not None
+            err, fields = {}, {}
+            if "relation" in item or "relation_key" in item or not partial:
+                rel = relation_by_id.get(self._canonical_id(item.get("relation"))) \
+                    or relation_by_key.get(str(item.get("relation_key")))
+                if rel is None:
+                    err["relation"] = "relation نامعتبر"
+                fields["relation_id"] = rel
+            for key in ("source_asset", "target_asset"):
+                if key == "source_asset" and partial:
                     continue
+                if key in item or not partial:
+                    unit = self._canonical_id(item.get(key))
+                    if unit not in known_units:
+                        err[key] = f"{key} نامعتبر"
+                    fields[f"{key}_id"] = unit
+            for key in ("start_date", "end_date"):
+                if key in item:
+                    try:
+                        fields[key] = parse_date_flex(item[key]) if item[key] else None
+                    except ValueError:
+                        err[key] = "تاریخ نامعتبر"
+            if "note" in item:
+                fields["note"] = item["note"] or None
+            start = fields.get("start_date", getattr(current, "start_date", None))
+            end = fields.get("end_date", getattr(current, "end_date", None))
+            if start and end and end < start:
+                err["end_date"] = "نباید قبل از start_date باشد."
+            if err:
+                errors.setdefault(section, {})[str(i)] = err
+            return fields
+
+        valid_creates = [resolve("create", i, c) for i, c in enumerate(creates)]
+        valid_updates, seen = [], set()
+        for i, (pk, u) in enumerate(zip(update_ids, updates)):
+            current = existing.get(pk)
+            if current is None:
+                errors.setdefault("update", {})[str(i)] = {"id": "رابطه یافت نشد"}
+                continue
+            if pk in seen:
+                errors.setdefault("update", {})[str(i)] = {"id": "شناسه‌ی تکراری در update"}
+                continue
+            seen.add(pk)
+            valid_updates.append((current, resolve("update", i, u, current)))
+        updated, seen = seen, set()
+        for i, pk in enumerate(str(pk) for pk in deletes):
+            if pk not in existing:
+                errors.setdefault("delete", {})[str(i)] = "رابطه یافت نشد"
+            elif pk in seen:
+                errors.setdefault("delete", {})[str(i)] = "شناسه‌ی تکراری در delete"
+            elif pk in updated:
+                errors.setdefault("delete", {})[str(i)] = "این رابطه در update هم آمده است"
+            seen.add(pk)
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        attrs["create"], attrs["update"] = valid_creates, valid_updates
+        attrs["delete"] = [existing[str(pk)] for pk in deletes]
+        return attrs
 
-                fields = {}
-                if "relation" in r:
-                    fields["relation_id"] = r["relation"]
-                if "target_asset" in r:
-                    fields["target_asset_id"] = r["target_asset"]
-                if "start_date" in r:
-                    fields["start_date"] = r.get("start_date")
-                if "end_date" in r:
-                    fields["end_date"] = r.get("end_date")
-
-                if rel_id:
-                    if fields:
-                        AssetRelation.objects.filter(id=rel_id, source_asset=unit).update(**fields)
-                else:
-                    AssetRelation.objects.create(source_asset=unit, **fields)
+    @staticmethod
+    def _canonical_id(value):
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            return None
 
-        return unit
+    @transaction.atomic
+    def create(self, vd):
+        now = timezone.now()
+        owner = self.context.get("owner")
+        removed = [edge_key(r) for r in vd["delete"]]
+        if vd["delete"]:
+            AssetRelation.objects.filter(pk__in=[r.pk for r in vd["delete"]]).delete()
+
+        updated, update_fields = [], set()
+        for current, fields in vd["update"]:
+            diff = {k: v for k, v in fields.items() if getattr(current, k) != v and str(getattr(current, k)) != str(v)}
+            if not diff:
+                continue
+            removed.append(edge_key(current))
+            for k, v in diff.items():
+                setattr(current, k, v)
+            current.updated_at = now
+            update_fields.update(diff)
+            updated.append(current)
+        if updated:
+            AssetRelation.objects.bulk_update(updated, sorted(update_fields) + ["updated_at"], batch_size=500)
+
+        created = [AssetRelation(owner=owner, **fields) for fields in vd["create"]]
+        if created:
+            AssetRelation.objects.bulk_create(created, batch_size=500)
+
+        relations_changed(added=updated + created, removed=removed)
+        return {
+            "created": [str(r.pk) for r in created],
+            "updated": len(updated),
+            "deleted": len(vd["delete"]),
+        }
+
+
+class AttributeOptionQuerySerializer(serializers.Serializer):
+    asset = serializers.UUIDField(required=False)
+    # اگر خالی باشد همه‌ی options خصیصه شمرده می‌شوند
+    option = serializers.ListField(child=serializers.CharField(max_length=150), required=False)
+
+
+class AssetListQuerySerializer(serializers.Serializer):
+    asset_type = serializers.ChoiceField(choices=Asset.AssetType.choices, required=False)
+    # جستجوی پیشوندی روی عنوان (LIKE 'x%' روی ایندکس pattern_ops)
+    title = serializers.CharField(required=False, max_length=250)
+    include_rules = serializers.BooleanField(required=False, default=True)
+    page = serializers.IntegerField(required=False, min_value=1, default=1)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=500, default=50)
+
+
+class AttributeStatsQuerySerializer(serializers.Serializer):
+    asset = serializers.UUIDField(required=False)
+    asset_type = serializers.ChoiceField(choices=Asset.AssetType.choices, required=False)
+    top = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
+    buckets = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
+
+
+class AsOfField(serializers.CharField):
+    """تاریخ شمسی (YYYY-MM-DD یا YYYY/MM/DD، اختیاری با HH:MM) → datetime پایان همان روز/دقیقه"""
+
+    def to_internal_value(self, data):
+        try:
+            return parse_as_of(super().to_internal_value(data))
+        except ValueError:
+            raise serializers.ValidationError("تاریخ باید YYYY/MM/DD (شمسی) باشد")
+
+
+class AsOfQuerySerializer(serializers.Serializer):
+    as_of = AsOfField(required=False)
+
+
+class TraversalQuerySerializer(serializers.Serializer):
+    direction = serializers.ChoiceField(choices=("downstream", "upstream"), required=False, default="downstream")
+    max_depth = serializers.IntegerField(required=False, min_value=1, max_value=10, default=3)
+    # فقط روابطی با این key ها (مثل depends_on)
+    relation = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    active_at = AsOfField(required=False)
+
+
+class GraphQuerySerializer(serializers.Serializer):
+    direction = serializers.ChoiceField(choices=("downstream", "upstream"), required=False, default="downstream")
+    # خالی یعنی بدون محدودیت عمق
+    max_depth = serializers.IntegerField(required=False, min_value=1, max_value=100)
+    relation = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100000, default=10000)
+
+
+class TemporalRelationQuerySerializer(serializers.Serializer):
+    state = serializers.ChoiceField(choices=(ACTIVE, EXPIRING, EXPIRED), required=False, default=ACTIVE)
+    # پیش‌فرض: امروز
+    at = AsOfField(required=False)
+    # پنجره‌ی «رو به انقضا» به روز
+    days = serializers.IntegerField(required=False, min_value=1, max_value=3650, default=30)
+    # فقط برای مسیر یونیت: روابط خروجی، ورودی یا هر دو
+    direction = serializers.ChoiceField(choices=(OUTGOING, INCOMING, BOTH), required=False, default=BOTH)
+    relation = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
+
+    def validate(self, attrs):
+        attrs["at"] = attrs["at"].date() if attrs.get("at") else timezone.localdate()
+        raw = attrs.pop("cursor", "")
+        if raw:
+            try:
+                cursor = decode_cursor(raw)
+                if not isinstance(cursor, list) or len(cursor) != (1 if attrs["state"] == ACTIVE else 2):
+                    raise ValueError
+                if attrs["state"] != ACTIVE:
+                    datetime.strptime(cursor[0], "%Y-%m-%d")
+                # شناسه مستقیم در فیلتر pk می‌رود؛ کرسر دست‌کاری‌شده نباید به خطای ۵۰۰ برسد
+                cursor[-1] = str(uuid.UUID(str(cursor[-1])))
+            except (TypeError, ValueError):
+                raise serializers.ValidationError({"cursor": "کرسر نامعتبر است"})
+            attrs["cursor"] = cursor
+        return attrs
+
+
+class TemporalRelationSerializer(serializers.ModelSerializer):
+    relation = serializers.CharField(source="relation.key")
+    source_label = serializers.CharField(source="source_asset.label")
+    target_label = serializers.CharField(source="target_asset.label")
+
+    class Meta:
+        model = AssetRelation
+        fields = ("id", "relation", "source_asset", "source_label", "target_asset", "target_label",
+                  "start_date", "end_date")
+
+
+class GraphExportQuerySerializer(serializers.Serializer):
+    # «format» را DRF برای انتخاب renderer رزرو کرده است
+    output = serializers.ChoiceField(choices=("graphml", "ndjson"), required=False, default="ndjson")
+    asset_type = serializers.ChoiceField(choices=Asset.AssetType.choices, required=False)
+    relation = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    # فقط روابط فعال در این تاریخ (شمسی)
+    active_at = AsOfField(required=False)
+    # خصیصه‌هایی که به‌عنوان ویژگی گره‌ها خروجی گرفته می‌شوند
+    attribute = serializers.ListField(child=serializers.UUIDField(), required=False, max_length=50)
+
+
+class ClusterListQuerySerializer(serializers.Serializer):
+    # خالی = همه‌ی روابط؛ وگرنه key رابطه
+    scope = serializers.CharField(max_length=100, required=False, allow_blank=True, default="")
+    min_size = serializers.IntegerField(required=False, min_value=2, default=2)
+    page = serializers.IntegerField(required=False, min_value=1, default=1)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
+
+
+class ClusterMembersQuerySerializer(serializers.Serializer):
+    page = serializers.IntegerField(required=False, min_value=1, default=1)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
+
+
+class ClusterComputeSerializer(serializers.Serializer):
+    scope = serializers.CharField(max_length=100, required=False, allow_blank=True, default="")
+
+    def validate_scope(self, value):
+        if value and not Relation.objects.filter(key=value).exists():
+            raise serializers.ValidationError("رابطه‌ای با این key یافت نشد")
+        return value
+
+
+class DependencyClusterSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DependencyCluster
+        fields = ("id", "scope", "size", "dirty", "updated_at")
+
+
+class AssetUnitSearchQuerySerializer(serializers.Serializer):
+    attribute = serializers.UUIDField()
+    # یونیت‌هایی که همه‌ی این گزینه‌ها را دارند (value_list @> option)
+    option = serializers.ListField(child=serializers.CharField(max_length=150), allow_empty=False)
+    asset = serializers.UUIDField(required=False)
+    as_of = AsOfField(required=False)
+    page = serializers.IntegerField(required=False, min_value=1, default=1)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
 
 
 class CsvIssueSerializer(serializers.ModelSerializer):
@@ -0,0 +1,190 @@
+import uuid
+from typing import Dict, List
+
+from django.db import transaction, IntegrityError
+
+from assets.models import (
+    Asset, AssetUnit, AssetAttributeValue, AssetRelation, Relation
+)
+from assets.rules import get_asset_rules_many
+from assets.counters import units_added
+from assets.history import record_value_changes
+from assets.relation_changes import relations_changed
+from assets.serializers import AssetUnitUpsertSerializer
+
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class BulkUnitUpsertService:
+    """
+    ایجاد/ویرایش گروهی یونیت‌ها:
+      - قوانین هر دارایی فقط یک بار لود می‌شود.
+      - target ها و relation های همه‌ی آیتم‌ها با یک کوئری IN بررسی می‌شوند.
+      - یونیت‌های جدید، مقادیر و روابطشان به‌صورت تکه‌ای با bulk_create نوشته می‌شوند.
+      - خطای هر آیتم جداگانه برگردانده می‌شود و بقیه‌ی آیتم‌ها ادامه پیدا می‌کنند.
+    """
+    CHUNK_SIZE = 200
+
+    def __init__(self, items: List[dict], user):
+        self.items = items
+        self.user = user
+        self.results: List[dict] = [None] * len(items)
+
+    def run(self) -> Dict[str, object]:
+        assets, units = self._load_targets()
+        context = {
+            "rules_by_asset": get_asset_rules_many(assets.keys()),
+            **self._load_known_relation_refs(),
+        }
+
+        pending = []  # (index, unit, value_rows, relation_rows)
+        seen_codes = {}
+        for idx, item in enumerate(self.items):
+            unit_id = item.get("id")
+            if unit_id:
+                unit = units.get(_as_uuid(unit_id))
+                if unit is None:
+                    self._fail(idx, {"id": "یونیت یافت نشد"})
+                    continue
+                self._update_one(idx, unit, item, context)
+                continue
+
+            asset = assets.get(_as_uuid(item.get("asset_id")))
+            if asset is None:
+                self._fail(idx, {"asset_id": "دارایی یافت نشد"})
+                continue
+
+            payload = {k: v for k, v in item.items() if k != "asset_id"}
+            s = AssetUnitUpsertSerializer(data=payload, context={**context, "asset": asset})
+            if not s.is_valid():
+                self._fail(idx, s.errors)
+                continue
+
+            unit, rows, rels = s.build_objects({**s.validated_data, "owner": self.user})
+            if unit.code:
+                if unit.code in seen_codes:
+                    self._fail(idx, {"code": f"تکراری با آیتم {seen_codes[unit.code]}"})
+                    continue
+                seen_codes[unit.code] = idx
+            pending.append((idx, unit, rows, rels))
+
+        if seen_codes:
+            # یونیت‌های در انتظار حذف هم هنوز code را در ایندکس یکتا نگه داشته‌اند
+            taken = set(AssetUnit.all_objects.filter(code__in=seen_codes.keys()).values_list("code", flat=True))
+            for code in taken:
+                self._fail(seen_codes[code], {"code": "یونیتی با این code از قبل وجود دارد"})
+            pending = [p for p in pending if p[1].code not in taken]
+
+        for start in range(0, len(pending), self.CHUNK_SIZE):
+            self._write_chunk(pending[start:start + self.CHUNK_SIZE])
+
+        stats = dict(created=0, updated=0, failed=0)
+        for r in self.results:
+            stats[r["status"]] += 1
+        return {**stats, "results": self.results}
+
+    # ===== loading
+    def _load_targets(self):
+        asset_ids, unit_ids = set(), set()
+        for item in self.items:
+            if item.get("id"):
+                pk = _as_uuid(item["id"])
+                if pk:
+                    unit_ids.add(pk)
+            else:
+                pk = _as_uuid(item.get("asset_id"))
+                if pk:
+                    asset_ids.add(pk)
+
+        units = AssetUnit.objects.select_related("asset").in_bulk(unit_ids) if unit_ids else {}
+        assets = Asset.objects.in_bulk(asset_ids) if asset_ids else {}
+        for unit in units.values():
+            assets.setdefault(unit.asset_id, unit.asset)
+        return assets, units
+
+    def _load_known_relation_refs(self):
+        target_ids, relation_ids = set(), set()
+        for item in self.items:
+            for r in item.get("relations") or []:
+                if not isinstance(r, dict):
+                    continue
+                target = _as_uuid(r.get("target_asset"))
+                relation = _as_uuid(r.get("relation"))
+                if target:
+                    target_ids.add(target)
+                if relation:
+                    relation_ids.add(relation)
+
+        known_units = AssetUnit.objects.filter(pk__in=target_ids).values_list("pk", flat=True) \
+            if target_ids else []
+        known_relations = Relation.objects.filter(pk__in=relation_ids).values_list("pk", flat=True) \
+            if relation_ids else []
+        return {
+            "known_unit_ids": {str(pk) for pk in known_units},
+            "known_relation_ids": {str(pk) for pk in known_relations},
+        }
+
+    # ===== writing
+    def _update_one(self, idx, unit, item, context):
+        payload = {k: v for k, v in item.items() if k not in ("id", "asset_id")}
+        # با partial=True پیش‌فرض فیلدها اعمال نمی‌شود؛ relations مثل PUT تکی جایگزین می‌شوند
+        payload.setdefault("relations_mode", "replace")
+        s = AssetUnitUpsertSerializer(instance=unit, data=payload, partial=True, context=context)
+        if not s.is_valid():
+            self._fail(idx, s.errors)
+            return
+        try:
+            with transaction.atomic():
+                s.save()
+        except IntegrityError as e:
+            self._fail(idx, {"non_field_errors": str(e)})
+            return
+        self.results[idx] = {"index": idx, "status": "updated", "id": str(unit.pk)}
+
+    def _write_chunk(self, chunk):
+        units = [u for _, u, _, _ in chunk]
+        # مرتب بر اساس دارایی تا درج‌ها روی جدول پارتیشن‌شده پارتیشن به پارتیشن انجام شوند
+        rows = sorted((r for _, _, item_rows, _ in chunk for r in item_rows), key=lambda r: str(r.asset_id))
+        rels = [r for _, _, _, item_rels in chunk for r in item_rels]
+        try:
+            with transaction.atomic():
+                AssetUnit.objects.bulk_create(units)
+                units_added(units)
+                if rows:
+                    AssetAttributeValue.objects.bulk_create(rows, batch_size=500)
+                    record_value_changes(created=rows)
+                if rels:
+                    AssetRelation.objects.bulk_create(rels, batch_size=500)
+                    relations_changed(added=rels)
+        except IntegrityError:
+            # یک ردیف خراب کل تکه را برگرداند؛ آیتم‌ها را تکی ذخیره کن تا خطا دقیق شود
+            for entry in chunk:
+                self._write_single(*entry)
+            return
+
+        for idx, unit, _, _ in chunk:
+            self.results[idx] = {"index": idx, "status": "created", "id": str(unit.pk)}
+
+    def _write_single(self, idx, unit, rows, rels):
+        try:
+            with transaction.atomic():
+                unit.save(force_insert=True)
+                units_added([unit])
+                if rows:
+                    AssetAttributeValue.objects.bulk_create(rows)
+                    record_value_changes(created=rows)
+                if rels:
+                    AssetRelation.objects.bulk_create(rels)
+                    relations_changed(added=rels)
+        except IntegrityError as e:
+            self._fail(idx, {"non_field_errors": str(e)})
+            return
+        self.results[idx] = {"index": idx, "status": "created", "id": str(unit.pk)}
+
+    def _fail(self, idx, errors):
+        self.results[idx] = {"index": idx, "status": "failed", "errors": errors}
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Asset, Attribute, AttributeCategory, AssetTypeAttribute
+from .rules import bump_rules_version
+from .stats import bump_stats_version
+from .dashboard import bump_inventory_version
+from .dictionary import bump_dictionary_version
+
+
+@receiver([post_save, post_delete], sender=AssetTypeAttribute)
+def invalidate_rules_on_rule_change(sender, instance, **kwargs):
+    bump_rules_version([instance.asset_id])
+
+
+@receiver(post_save, sender=Attribute)
+def invalidate_rules_on_attribute_change(sender, instance, created, **kwargs):
+    if created:
+        return
+    bump_stats_version(instance.pk)
+    bump_rules_version(
+        AssetTypeAttribute.objects.filter(attribute=instance).values_list("asset_id", flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=AttributeCategory)
+def invalidate_rules_on_category_change(sender, instance, created, **kwargs):
+    if created:
+        return
+    bump_rules_version(
+        AssetTypeAttribute.objects.filter(attribute__category=instance)
+        .values_list("asset_id", flat=True).distinct()
+    )
+
+
+@receiver(pre_delete, sender=AttributeCategory)
+def invalidate_rules_on_category_delete(sender, instance, **kwargs):
+    # خصیصه‌ها با SET_NULL و بدون سیگنال آپدیت می‌شوند؛ پس دارایی‌ها را قبل از حذف پیدا کن
+    invalidate_rules_on_category_change(sender, instance, created=False)
+
+
+@receiver([post_save, post_delete], sender=Asset)
+def invalidate_dashboard_on_asset_change(sender, instance, **kwargs):
+    bump_inventory_version()
+
+
+@receiver([post_save, post_delete], sender=Attribute)
+@receiver([post_save, post_delete], sender=AttributeCategory)
+def invalidate_dictionary(sender, instance, **kwargs):
+    bump_dictionary_version()
@@ -0,0 +1,202 @@
+import datetime
+
+import jdatetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core.cache import get_version, bump_version_on_commit
+from assets.models import Asset, AssetUnit, AssetTypeAttribute, AssetAttributeValue, Attribute
+
+STATS_VERSION_KEY = "attribute_stats_version:{attribute_id}"
+STATS_DATA_KEY = "attribute_stats:{attribute_id}:v{version}:{asset}:{asset_type}:{top}:{buckets}"
+STATS_CACHE_TTL = getattr(settings, "ATTRIBUTE_STATS_CACHE_TTL", 60)
+
+PERCENTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
+
+NUMERIC_COLUMNS = {
+    Attribute.PropertyType.INT: "v.value_int",
+    Attribute.PropertyType.FLOAT: "v.value_float",
+    # تاریخ به‌صورت تعداد روز از 1970-01-01 سطل‌بندی می‌شود
+    Attribute.PropertyType.DATE: "(v.value_date - DATE '1970-01-01')",
+}
+CATEGORICAL_COLUMNS = {
+    Attribute.PropertyType.STR: "v.value_str",
+    Attribute.PropertyType.SINGLE_CHOICE: "COALESCE(v.value_str, v.choice)",
+    Attribute.PropertyType.BOOL: "v.value_bool::text",
+}
+LIST_TYPES = (Attribute.PropertyType.MULTI_CHOICE, Attribute.PropertyType.TAGS)
+
+# یونیت‌های دارایی‌هایی که این خصیصه را در قوانینشان دارند (مخرج پوشش)
+_SCOPE_SQL = """
+    scope AS (
+        SELECT u.id
+          FROM {unit} AS u
+          JOIN {asset} AS a ON a.id = u.asset_id
+         WHERE EXISTS (SELECT 1 FROM {rule} AS r WHERE r.asset_id = u.asset_id AND r.attribute_id = %(attribute)s)
+           AND NOT u.pending_deletion
+           AND NOT a.pending_deletion
+           {filters}
+    )
+"""
+
+_VALUES_SQL = """
+    vals AS (
+        SELECT v.unit_id, {expr} AS x
+          FROM {value} AS v
+          {lateral}
+         WHERE v.attribute_id = %(attribute)s
+           AND v.unit_id IN (SELECT id FROM scope)
+           AND {expr} IS NOT NULL
+    )
+"""
+
+_CATEGORICAL_SQL = """
+    WITH {scope}, {vals},
+    grouped AS (SELECT x, COUNT(*) AS c FROM vals GROUP BY x)
+    SELECT (SELECT COUNT(*) FROM scope),
+           (SELECT COUNT(DISTINCT unit_id) FROM vals),
+           (SELECT COUNT(*) FROM vals),
+           (SELECT COUNT(*) FROM grouped),
+           (SELECT COALESCE(json_agg(json_build_array(t.x, t.c)), '[]'::json)
+              FROM (SELECT x, c FROM grouped ORDER BY c DESC, x LIMIT %(top)s) AS t)
+"""
+
+_NUMERIC_SQL = """
+    WITH {scope}, {vals},
+    agg AS (
+        SELECT COUNT(*) AS n, COUNT(DISTINCT unit_id) AS units,
+               MIN(x) AS lo, MAX(x) AS hi, AVG(x) AS mean,
+               percentile_cont(%(percentiles)s::float8[]) WITHIN GROUP (ORDER BY x) AS pct
+          FROM vals
+    ),
+    hist AS (
+        SELECT CASE WHEN agg.lo = agg.hi THEN 1
+                    ELSE LEAST(width_bucket(x::float8, agg.lo::float8, agg.hi::float8, %(buckets)s), %(buckets)s)
+               END AS b,
+               COUNT(*) AS c
+          FROM vals, agg
+         GROUP BY b
+    )
+    SELECT (SELECT COUNT(*) FROM scope), agg.units, agg.n, agg.lo, agg.hi, agg.mean, agg.pct,
+           (SELECT COALESCE(json_agg(json_build_array(b, c) ORDER BY b), '[]'::json) FROM hist)
+      FROM agg
+"""
+
+
+def _tables():
+    return dict(
+        unit=AssetUnit._meta.db_table,
+        asset=Asset._meta.db_table,
+        rule=AssetTypeAttribute._meta.db_table,
+        value=AssetAttributeValue._meta.db_table,
+    )
+
+
+def _scope(asset=None, asset_type=None):
+    filters = []
+    if asset:
+        filters.append("AND u.asset_id = %(asset)s")
+    if asset_type:
+        filters.append("AND a.asset_type = %(asset_type)s")
+    return _SCOPE_SQL.format(filters=" ".join(filters), **_tables())
+
+
+def _coverage(scope_units, units_with_value):
+    return {
+        "units": scope_units,
+        "with_value": units_with_value,
+        "without_value": scope_units - units_with_value,
+        "ratio": round(units_with_value / scope_units, 4) if scope_units else None,
+    }
+
+
+def _to_jalali(days):
+    d = datetime.date(1970, 1, 1) + datetime.timedelta(days=round(days))
+    return jdatetime.date.fromgregorian(date=d).strftime("%Y-%m-%d")
+
+
+def _categorical_stats(attribute, params, scope):
+    if attribute.property_type in LIST_TYPES:
+        expr, lateral = "item", "CROSS JOIN LATERAL unnest(v.value_list) AS item"
+    else:
+        expr, lateral = CATEGORICAL_COLUMNS[attribute.property_type], ""
+    vals = _VALUES_SQL.format(expr=expr, lateral=lateral, **_tables())
+
+    with connection.cursor() as cursor:
+        cursor.execute(_CATEGORICAL_SQL.format(scope=scope, vals=vals), params)
+        scope_units, units_with_value, total, distinct, top = cursor.fetchone()
+
+    return {
+        "kind": "categorical",
+        "coverage": _coverage(scope_units, units_with_value),
+        "values": total,
+        "distinct": distinct,
+        "top": [{"value": value, "count": count} for value, count in top],
+    }
+
+
+def _numeric_stats(attribute, params, scope, buckets):
+    is_date = attribute.property_type == Attribute.PropertyType.DATE
+    vals = _VALUES_SQL.format(expr=NUMERIC_COLUMNS[attribute.property_type], lateral="", **_tables())
+
+    with connection.cursor() as cursor:
+        cursor.execute(_NUMERIC_SQL.format(scope=scope, vals=vals),
+                       {**params, "percentiles": list(PERCENTILES), "buckets": buckets})
+        scope_units, units_with_value, total, lo, hi, mean, pct, hist = cursor.fetchone()
+
+    fmt = _to_jalali if is_date else float
+    result = {
+        "kind": "date" if is_date else "numeric",
+        "coverage": _coverage(scope_units, units_with_value),
+        "values": total,
+        "min": None, "max": None, "avg": None, "percentiles": {}, "histogram": [],
+    }
+    if not total:
+        return result
+
+    lo, hi = float(lo), float(hi)
+    width = (hi - lo) / buckets if hi > lo else 0
+    result.update({
+        "min": fmt(lo),
+        "max": fmt(hi),
+        "avg": fmt(float(mean)),
+        "percentiles": {f"p{int(p * 100)}": fmt(v) for p, v in zip(PERCENTILES, pct)},
+        "histogram": [
+            {"from": fmt(lo + (b - 1) * width), "to": fmt(lo + b * width) if width else fmt(hi), "count": c}
+            for b, c in hist
+        ],
+    })
+    return result
+
+
+def compute_attribute_stats(attribute, asset=None, asset_type=None, top=10, buckets=10):
+    """آمار مقادیر یک خصیصه؛ هر نتیجه با یک کوئری گروه‌بندی‌شده محاسبه می‌شود"""
+    params = {"attribute": attribute.pk, "asset": asset, "asset_type": asset_type, "top": top}
+    scope = _scope(asset, asset_type)
+    if attribute.property_type in NUMERIC_COLUMNS:
+        data = _numeric_stats(attribute, params, scope, buckets)
+    else:
+        data = _categorical_stats(attribute, params, scope)
+    return {"attribute": str(attribute.pk), "property_type": attribute.property_type, **data}
+
+
+def get_attribute_stats(attribute, asset=None, asset_type=None, top=10, buckets=10):
+    """
+    نسخه‌ی کش‌شده‌ی compute_attribute_stats؛ هر ترکیب (خصیصه، فیلتر دارایی) کلید جدا دارد
+    و با TTL کوتاه منقضی می‌شود. تغییر خود خصیصه نسخه را بالا می‌برد.
+    """
+    version = get_version(STATS_VERSION_KEY.format(attribute_id=attribute.pk))
+    key = STATS_DATA_KEY.format(
+        attribute_id=attribute.pk, version=version,
+        asset=asset or "-", asset_type=asset_type or "-", top=top, buckets=buckets,
+    )
+    data = cache.get(key)
+    if data is None:
+        data = compute_attribute_stats(attribute, asset, asset_type, top, buckets)
+        cache.set(key, data, timeout=STATS_CACHE_TTL)
+    return data
+
+
+def bump_stats_version(attribute_id):
+    bump_version_on_commit(STATS_VERSION_KEY.format(attribute_id=attribute_id))
@@ -0,0 +1,83 @@
+"""
+کوئری‌های زمانی روی روابط: فعال در یک تاریخ، رو به انقضا و منقضی‌شده.
+
+«فعال» با عبارت ActiveRange (همان عبارت ایندکس‌های GiST) سنجیده می‌شود و انقضا روی end_date
+با ایندکس (end_date, id). همه‌ی نتایج keyset صفحه‌بندی می‌شوند: کرسر کلید مرتب‌سازی آخرین ردیف
+صفحه است و صفحه‌ی بعد با یک شرط «بعد از کرسر» روی همان ایندکس شروع می‌شود (بدون OFFSET).
+"""
+import datetime
+
+from django.db.models import Q
+
+from assets.models import AssetRelation, ActiveRange
+
+ACTIVE = "active"
+EXPIRING = "expiring"
+EXPIRED = "expired"
+
+OUTGOING = "out"
+INCOMING = "in"
+BOTH = "both"
+
+
+def _visible(qs):
+    return qs.filter(
+        source_asset__pending_deletion=False, source_asset__asset__pending_deletion=False,
+        target_asset__pending_deletion=False, target_asset__asset__pending_deletion=False,
+    )
+
+
+def _for_unit(qs, unit_id, direction):
+    if direction == OUTGOING:
+        return qs.filter(source_asset_id=unit_id)
+    if direction == INCOMING:
+        return qs.filter(target_asset_id=unit_id)
+    return qs.filter(Q(source_asset_id=unit_id) | Q(target_asset_id=unit_id))
+
+
+def temporal_relations(state, day, days=30, unit_id=None, direction=BOTH, relation_keys=None):
+    """
+    queryset مرتب‌شده‌ی روابط برای state در تاریخ day (میلادی):
+      - active: بازه‌ی [start_date, end_date] شامل day؛ مرتب بر اساس id
+      - expiring: فعال در day و end_date تا day + days؛ زودترین انقضا اول
+      - expired: end_date پیش از day؛ تازه‌ترین انقضا اول
+    """
+    qs = _visible(AssetRelation.objects.select_related("relation", "source_asset", "target_asset"))
+    if unit_id is not None:
+        qs = _for_unit(qs, unit_id, direction)
+    if relation_keys:
+        qs = qs.filter(relation__key__in=relation_keys)
+
+    if state == ACTIVE:
+        return qs.alias(active=ActiveRange()).filter(active__contains=day).order_by("id")
+    if state == EXPIRING:
+        return qs.alias(active=ActiveRange()).filter(
+            active__contains=day, end_date__lte=day + datetime.timedelta(days=days),
+        ).order_by("end_date", "id")
+    return qs.filter(end_date__lt=day).order_by("-end_date", "-id")
+
+
+def _cursor_key(state, relation):
+    if state == ACTIVE:
+        return [str(relation.pk)]
+    return [relation.end_date.togregorian().isoformat(), str(relation.pk)]
+
+
+def _after(qs, state, cursor):
+    if state == ACTIVE:
+        return qs.filter(id__gt=cursor[0])
+    end_date, pk = datetime.date.fromisoformat(cursor[0]), cursor[1]
+    if state == EXPIRING:
+        return qs.filter(Q(end_date__gt=end_date) | Q(end_date=end_date, id__gt=pk))
+    return qs.filter(Q(end_date__lt=end_date) | Q(end_date=end_date, id__lt=pk))
+
+
+def keyset_page(qs, state, cursor=None, page_size=100):
+    """(ردیف‌های صفحه، کلید کرسر صفحه‌ی بعد یا None)"""
+    if cursor:
+        qs = _after(qs, state, cursor)
+    rows = list(qs[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, _cursor_key(state, rows[-1])
@@ -1,3 +1,415 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from array import array
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+import jdatetime
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.utils import encode_cursor
+from .csv_import.relations import RelationImportService
+from .export import GraphExport, GRAPHML, NDJSON, CONTENT_TYPES
+from .graph_index import GraphIndex
+from .models import Asset, AssetUnit, Attribute, AssetTypeAttribute, AssetAttributeValue, Relation, AssetRelation, \
+    ImportSession, ImportIssue
+from .relation_changes import relations_changed
+from .serializers import RelationBatchSerializer, TemporalRelationQuerySerializer
+from .stats import compute_attribute_stats
+
+User = get_user_model()
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class InventoryFixtureMixin:
+    """دو دارایی (سرور با سه یونیت، سوییچ با یک یونیت) و دو نوع رابطه"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="admin", is_superuser=True)
+        cls.server = Asset.objects.create(asset_type=Asset.AssetType.IT, title="Server", code="SRV")
+        cls.switch = Asset.objects.create(asset_type=Asset.AssetType.IT, title="Switch", code="SW")
+        cls.s1, cls.s2, cls.s3 = (
+            AssetUnit.objects.create(asset=cls.server, label=f"SRV-{i}", code=f"srv-{i}") for i in range(1, 4)
+        )
+        cls.sw1 = AssetUnit.objects.create(asset=cls.switch, label="SW-1", code="sw-1")
+        cls.depends_on = Relation.objects.create(key="depends_on", name="وابسته به")
+        cls.connected_to = Relation.objects.create(key="connected_to", name="متصل به")
+
+    def edge(self, source, target, relation=None, **extra):
+        return AssetRelation.objects.create(
+            source_asset=source, target_asset=target, relation=relation or self.depends_on, **extra,
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RelationBatchTests(InventoryFixtureMixin, TestCase):
+    def batch(self, **data):
+        return RelationBatchSerializer(data=data, context={"owner": self.user})
+
+    def test_ids_in_any_uuid_spelling_are_accepted_and_stored_canonically(self):
+        existing = self.edge(self.s1, self.sw1)
+        serializer = self.batch(
+            create=[{
+                "source_asset": str(self.s2.pk).upper(),
+                "target_asset": self.sw1.pk.hex,
+                "relation": str(self.connected_to.pk).upper(),
+            }],
+            update=[{"id": existing.pk.hex.upper(), "target_asset": str(self.s3.pk).upper()}],
+        )
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        fields = serializer.validated_data["create"][0]
+        self.assertEqual(
+            (fields["source_asset_id"], fields["target_asset_id"], fields["relation_id"]),
+            (str(self.s2.pk), str(self.sw1.pk), str(self.connected_to.pk)),
+        )
+        serializer.save()
+        self.assertTrue(AssetRelation.objects.filter(
+            source_asset=self.s2, target_asset=self.sw1, relation=self.connected_to,
+        ).exists())
+        self.assertEqual(AssetRelation.objects.get(pk=existing.pk).target_asset_id, self.s3.pk)
+
+    def test_unknown_or_malformed_ids_are_reported_per_item(self):
+        serializer = self.batch(create=[
+            {"source_asset": str(self.s1.pk), "target_asset": "not-a-uuid", "relation_key": "depends_on"},
+            {"source_asset": str(self.s1.pk), "target_asset": str(self.sw1.pk), "relation": "x"},
+        ])
+
+        self.assertFalse(serializer.is_valid())
+        errors = serializer.errors["create"]
+        self.assertEqual(set(errors["0"]), {"target_asset"})
+        self.assertEqual(set(errors["1"]), {"relation"})
+
+    def test_repeated_edge_ids_are_rejected(self):
+        a, b = self.edge(self.s1, self.sw1), self.edge(self.s2, self.sw1)
+        serializer = self.batch(
+            update=[{"id": str(a.pk), "note": "x"}, {"id": str(a.pk).upper(), "note": "y"}],
+            delete=[str(b.pk), str(b.pk), str(a.pk)],
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(set(serializer.errors["update"]), {"1"})
+        self.assertEqual(set(serializer.errors["delete"]), {"1", "2"})
+
+
+class TemporalCursorTests(SimpleTestCase):
+    def query(self, state, cursor):
+        return TemporalRelationQuerySerializer(data={"state": state, "cursor": encode_cursor(cursor)})
+
+    def test_valid_cursor_is_decoded(self):
+        pk = "1b4e28ba-2fa1-11d2-883f-0016d3cca427"
+        serializer = self.query("expired", ["2024-01-01", pk.upper()])
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data["cursor"], ["2024-01-01", pk])
+
+    def test_tampered_cursor_is_rejected(self):
+        for state, cursor in (("expired", ["2024-01-01", "x"]), ("active", [5]), ("expiring", ["x", "y"])):
+            with self.subTest(state=state, cursor=cursor):
+                serializer = self.query(state, cursor)
+                self.assertFalse(serializer.is_valid())
+                self.assertIn("cursor", serializer.errors)
+
+
+class RelationChangesTests(SimpleTestCase):
+    edited = ("s1", "t1", "r1")
+    added = ("s2", "t2", "r1")
+
+    def notify(self, added, removed):
+        with mock.patch("assets.relation_changes.record_edge_changes") as record, \
+                mock.patch("assets.relation_changes.clusters_edges_changed") as clusters:
+            relations_changed(added=added, removed=removed)
+        return record, clusters
+
+    def test_edited_edges_cancel_out(self):
+        record, clusters = self.notify([self.edited, self.added], [self.edited])
+        record.assert_called_once_with([self.added], [])
+        clusters.assert_called_once_with([self.added], [])
+
+    def test_only_edited_edges_notify_nothing(self):
+        record, clusters = self.notify([self.edited], [self.edited])
+        record.assert_not_called()
+        clusters.assert_not_called()
+
+    def test_duplicate_edges_cancel_one_for_one(self):
+        record, clusters = self.notify([self.edited], [self.edited, self.edited])
+        clusters.assert_called_once_with([], [self.edited])
+
+
+class GraphIndexBfsTests(SimpleTestCase):
+    def setUp(self):
+        empty = GraphIndex(1)
+        empty.relation_index, empty.relation_keys = {"r": 0}, ["depends_on"]
+        empty.out = empty.inc = GraphIndex._csr(0, array("i"), array("i"), array("i"))
+        # a → b, a → c, b → d
+        self.index = empty.with_changes([[("+", "a", "b", "r"), ("+", "a", "c", "r"), ("+", "b", "d", "r")]], 2)
+        self.root = self.index.node_index["a"]
+
+    def reached(self, **kwargs):
+        seen = self.index.bfs(self.root, **kwargs)
+        return {self.index.node_ids[n] for n in seen if n != self.root}
+
+    def test_limit_equal_to_reachable_nodes_is_not_truncated(self):
+        seen = self.index.bfs(self.root, limit=3)
+        # فقط وقتی limit + 1 گره (بدون ریشه) پیدا شود یعنی بریده شده است
+        self.assertEqual(len(seen) - 1, 3)
+        self.assertEqual(self.reached(limit=3), {"b", "c", "d"})
+
+    def test_limit_below_reachable_nodes_stops_one_past_limit(self):
+        seen = self.index.bfs(self.root, limit=1)
+        self.assertEqual(len(seen) - 1, 2)
+
+    def test_max_depth_and_upstream(self):
+        self.assertEqual(self.reached(max_depth=1), {"b", "c"})
+        d = self.index.node_index["d"]
+        seen = self.index.bfs(d, upstream=True)
+        self.assertEqual({self.index.node_ids[n] for n in seen if n != d}, {"a", "b"})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AttributeStatsTests(InventoryFixtureMixin, TestCase):
+    def attribute(self, property_type, values, extra_values=()):
+        """values: {unit: مقدار} روی سرور (که قانون خصیصه را دارد)؛ extra_values روی یونیت‌های بیرون از scope"""
+        attribute = Attribute.objects.create(title=property_type, title_en=property_type, property_type=property_type)
+        AssetTypeAttribute.objects.create(asset=self.server, attribute=attribute)
+        column = {
+            Attribute.PropertyType.INT: "value_int",
+            Attribute.PropertyType.STR: "value_str",
+            Attribute.PropertyType.TAGS: "value_list",
+        }[property_type]
+        for unit, value in [*values.items(), *extra_values]:
+            AssetAttributeValue.objects.create(asset=unit.asset, unit=unit, attribute=attribute, **{column: value})
+        return attribute
+
+    def test_categorical_top_values_and_coverage(self):
+        attribute = self.attribute(
+            Attribute.PropertyType.STR, {self.s1: "linux", self.s2: "linux"},
+            # سوییچ این خصیصه را در قوانینش ندارد
+            extra_values=[(self.sw1, "bsd")],
+        )
+
+        data = compute_attribute_stats(attribute)
+
+        self.assertEqual(data["kind"], "categorical")
+        self.assertEqual(data["coverage"], {"units": 3, "with_value": 2, "without_value": 1, "ratio": 0.6667})
+        self.assertEqual((data["values"], data["distinct"]), (2, 1))
+        self.assertEqual(data["top"], [{"value": "linux", "count": 2}])
+
+    def test_list_values_are_counted_per_item(self):
+        attribute = self.attribute(Attribute.PropertyType.TAGS, {self.s1: ["db", "web"], self.s2: ["web"]})
+
+        data = compute_attribute_stats(attribute, top=1)
+
+        self.assertEqual((data["values"], data["distinct"]), (3, 2))
+        self.assertEqual(data["top"], [{"value": "web", "count": 2}])
+
+    def test_numeric_summary_and_histogram(self):
+        attribute = self.attribute(Attribute.PropertyType.INT, {self.s1: 10, self.s2: 20, self.s3: 30})
+
+        data = compute_attribute_stats(attribute, buckets=2)
+
+        self.assertEqual(data["kind"], "numeric")
+        self.assertEqual(data["coverage"]["ratio"], 1.0)
+        self.assertEqual((data["min"], data["max"], data["avg"]), (10.0, 30.0, 20.0))
+        self.assertEqual(data["percentiles"]["p50"], 20.0)
+        # بیشینه در سطل آخر می‌افتد، نه در سطل اضافه
+        self.assertEqual(data["histogram"], [
+            {"from": 10.0, "to": 20.0, "count": 1},
+            {"from": 20.0, "to": 30.0, "count": 2},
+        ])
+
+    def test_filters_and_pending_deletion_narrow_the_scope(self):
+        attribute = self.attribute(Attribute.PropertyType.INT, {self.s1: 10, self.s2: 20, self.s3: 30})
+        AssetUnit.all_objects.filter(pk=self.s3.pk).update(pending_deletion=True)
+
+        data = compute_attribute_stats(attribute, asset=self.server.pk)
+        self.assertEqual((data["coverage"]["units"], data["values"], data["max"]), (2, 2, 20.0))
+
+        empty = compute_attribute_stats(attribute, asset_type=Asset.AssetType.NON_IT)
+        self.assertEqual(empty["coverage"], {"units": 0, "with_value": 0, "without_value": 0, "ratio": None})
+        self.assertEqual((empty["values"], empty["histogram"]), (0, []))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RelationCsvImportTests(InventoryFixtureMixin, TestCase):
+    HEADER = "src_code,src_label,src_asset,dst_code,dst_label,dst_asset,rel,start,end\n"
+    COLUMNS = {
+        "source_code": "src_code", "source_label": "src_label", "source_asset": "src_asset",
+        "target_code": "dst_code", "target_label": "dst_label", "target_asset": "dst_asset",
+        "relation": "rel", "start_date": "start", "end_date": "end",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # هم‌نام با SRV-1 ولی زیر دارایی دیگر: label بدون عنوان دارایی مبهم است
+        cls.twin = AssetUnit.objects.create(asset=cls.switch, label="SRV-1", code="sw-twin")
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def session(self, rows):
+        return ImportSession.objects.create(
+            file=ContentFile((self.HEADER + "".join(r + "\n" for r in rows)).encode(), name="relations.csv"),
+            filename="relations.csv", kind=ImportSession.Kind.RELATIONS, column_map=self.COLUMNS,
+            state=ImportSession.State.MAPPED, created_by=self.user,
+        )
+
+    def issues(self, session):
+        return dict(ImportIssue.objects.filter(session=session).values_list("row_index", "code"))
+
+    def test_resolution_duplicates_and_issues(self):
+        self.edge(self.s3, self.sw1)
+        session = self.session([
+            "srv-1,,,sw-1,,,depends_on,,",                 # 1: code → code
+            ",SRV-2,,,SW-1,,connected_to,1403-01-01,",     # 2: label یکتا
+            ",SRV-1,,sw-1,,,depends_on,,",                 # 3: label مبهم
+            ",SRV-1,Server,sw-1,,,depends_on,,",           # 4: label + دارایی → همان سطر ۱
+            "nope,,,sw-1,,,depends_on,,",                  # 5: code ناموجود
+            "srv-2,,,sw-1,,,unknown,,",                    # 6: رابطه‌ی ناموجود
+            "srv-3,,,sw-1,,,depends_on,,",                 # 7: یال موجود
+            "srv-2,,,sw-1,,,depends_on,1403-05-01,1403-01-01",  # 8: تاریخ وارونه
+        ])
+
+        stats = RelationImportService(session, user=self.user).run()
+
+        self.assertEqual(stats, {"relations_created": 2, "rows_skipped": 2, "errors": 4, "warnings": 2})
+        self.assertEqual(self.issues(session), {
+            3: "SOURCE_AMBIGUOUS",
+            4: "DUPLICATE_ROW_SKIPPED",
+            5: "SOURCE_NOT_FOUND",
+            6: "RELATION_NOT_FOUND",
+            7: "RELATION_EXISTS_SKIPPED",
+            8: "DATE_RANGE_INVALID",
+        })
+        self.assertTrue(AssetRelation.objects.filter(
+            source_asset=self.s1, target_asset=self.sw1, relation=self.depends_on).exists())
+        self.assertTrue(AssetRelation.objects.filter(
+            source_asset=self.s2, target_asset=self.sw1, relation=self.connected_to).exists())
+        session.refresh_from_db()
+        self.assertEqual(session.state, ImportSession.State.COMMITTED)
+
+    def test_failure_writes_nothing_and_can_be_retried(self):
+        session = self.session([
+            "srv-1,,,sw-1,,,depends_on,,",
+            "srv-2,,,sw-1,,,depends_on,,",
+            "nope,,,sw-1,,,depends_on,,",
+        ])
+
+        # دسته‌ی اول نوشته می‌شود و دسته‌ی دوم شکست می‌خورد
+        with mock.patch("assets.csv_import.relations.WRITE_BATCH", 1), \
+                mock.patch("assets.csv_import.relations.relations_changed", side_effect=[None, RuntimeError("boom")]):
+            with self.assertRaises(RuntimeError):
+                RelationImportService(session, user=self.user).run()
+
+        self.assertFalse(AssetRelation.objects.exists())
+        session.refresh_from_db()
+        self.assertEqual(session.state, ImportSession.State.FAILED)
+        # خطاهای سطری حتی با شکست کار ثبت می‌شوند
+        self.assertEqual(self.issues(session), {3: "SOURCE_NOT_FOUND"})
+
+        stats = RelationImportService(session, user=self.user).run()
+        self.assertEqual(stats["relations_created"], 2)
+        self.assertEqual(self.issues(session), {3: "SOURCE_NOT_FOUND"})
+        session.refresh_from_db()
+        self.assertEqual(session.state, ImportSession.State.COMMITTED)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GraphExportTests(InventoryFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.room = Asset.objects.create(asset_type=Asset.AssetType.NON_IT, title="Room", code="RM")
+        cls.r1 = AssetUnit.objects.create(asset=cls.room, label="RM-1", code="rm-1")
+        cls.os = Attribute.objects.create(title="OS", title_en="OS", property_type=Attribute.PropertyType.STR)
+        AssetAttributeValue.objects.create(asset=cls.server, unit=cls.s1, attribute=cls.os, value_str="linux")
+
+    def setUp(self):
+        self.current = self.edge(self.s1, self.sw1, start_date=jdatetime.date(1402, 1, 1))
+        self.linked = self.edge(self.s2, self.s3, self.connected_to)
+        self.expired = self.edge(self.s3, self.sw1, start_date=jdatetime.date(1400, 1, 1),
+                                 end_date=jdatetime.date(1401, 1, 1))
+        self.cross_type = self.edge(self.s1, self.r1)
+
+    def ndjson(self, **filters):
+        rows = [json.loads(line) for line in "".join(GraphExport(**filters).stream(NDJSON)).splitlines()]
+        nodes = {row["id"]: row for row in rows if row["type"] == "node"}
+        edges = {row["id"]: row for row in rows if row["type"] == "edge"}
+        return nodes, edges
+
+    def test_ndjson_lists_nodes_then_edges(self):
+        nodes, edges = self.ndjson()
+
+        self.assertEqual(set(nodes), {str(u.pk) for u in (self.s1, self.s2, self.s3, self.sw1, self.r1)})
+        self.assertEqual(nodes[str(self.s1.pk)], {
+            "type": "node", "id": str(self.s1.pk), "label": "SRV-1", "code": "srv-1",
+            "asset": "Server", "asset_type": "it", "is_registered": self.s1.is_registered,
+        })
+        self.assertEqual(set(edges), {str(e.pk) for e in (self.current, self.linked, self.expired, self.cross_type)})
+        self.assertEqual(edges[str(self.expired.pk)], {
+            "type": "edge", "id": str(self.expired.pk), "source": str(self.s3.pk), "target": str(self.sw1.pk),
+            "relation": "depends_on", "start_date": "1400-01-01", "end_date": "1401-01-01",
+        })
+
+    def test_filters_narrow_nodes_and_edges(self):
+        nodes, edges = self.ndjson(asset_type=Asset.AssetType.IT)
+        self.assertNotIn(str(self.r1.pk), nodes)
+        # یالی که یک سرش بیرون از نوع انتخابی است حذف می‌شود
+        self.assertNotIn(str(self.cross_type.pk), edges)
+
+        _, edges = self.ndjson(relation_keys=["connected_to"])
+        self.assertEqual(set(edges), {str(self.linked.pk)})
+
+        _, edges = self.ndjson(active_at=jdatetime.date(1403, 1, 1).togregorian())
+        self.assertEqual(set(edges), {str(self.current.pk), str(self.linked.pk), str(self.cross_type.pk)})
+
+    def test_pending_deletion_endpoints_drop_their_edges(self):
+        AssetUnit.all_objects.filter(pk=self.r1.pk).update(pending_deletion=True)
+
+        _, edges = self.ndjson()
+        self.assertNotIn(str(self.cross_type.pk), edges)
+
+    def test_selected_attributes_become_node_columns(self):
+        nodes, _ = self.ndjson(attribute_ids=[self.os.pk])
+
+        self.assertEqual(nodes[str(self.s1.pk)]["attr:OS"], "linux")
+        self.assertIsNone(nodes[str(self.s2.pk)]["attr:OS"])
+
+    def test_graphml_is_well_formed(self):
+        ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+        root = ElementTree.fromstring("".join(
+            GraphExport(relation_keys=["connected_to"], attribute_ids=[self.os.pk]).stream(GRAPHML)
+        ))
+
+        keys = {(key.get("for"), key.get("attr.name")): key.get("id") for key in root.findall("g:key", ns)}
+        self.assertIn(("node", "attr:OS"), keys)
+        self.assertIn(("edge", "relation"), keys)
+        graph = root.find("g:graph", ns)
+        self.assertEqual(len(graph.findall("g:node", ns)), 5)
+        [edge] = graph.findall("g:edge", ns)
+        self.assertEqual((edge.get("source"), edge.get("target")), (str(self.s2.pk), str(self.s3.pk)))
+        s1 = graph.find(f"g:node[@id='{self.s1.pk}']", ns)
+        self.assertEqual(s1.find(f"g:data[@key='{keys[('node', 'attr:OS')]}']", ns).text, "linux")
+
+    def test_view_streams_requested_format(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get("/assets/relation/export/", {"output": "graphml", "relation": "connected_to"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPES[GRAPHML])
+        self.assertIn(str(self.linked.pk), b"".join(response.streaming_content).decode())
+
+        response = client.get("/assets/relation/export/", {"active_at": "not-a-date"})
+        self.assertEqual(response.status_code, 400)
@@ -7,25 +7,41 @@ urlpatterns = [
     path('attribute/category/<uuid:pk>/', AttributeCategoryDetailView.as_view(), name='attribute_category_detail'),
 
     path('attribute/', AttributeListCreateView.as_view(), name='attribute_list_create'),
+    path('attribute/dictionary/', AttributeDictionaryView.as_view(), name='attribute_dictionary'),
     path('attribute/<uuid:pk>/', AttributeDetailView.as_view(), name='attribute_detail'),
+    path('attribute/<uuid:pk>/options/count/', AttributeOptionCountView.as_view(), name='attribute_option_count'),
+    path('attribute/<uuid:pk>/stats/', AttributeStatsView.as_view(), name='attribute_stats'),
 
     path('', AssetListCreateView.as_view(), name='asset_list_create'),
     path('<uuid:pk>/', AssetDetailView.as_view(), name='asset_detail'),
 
     path('attribute/list/', AssetAttributesListView.as_view(), name='asset_attribute_list_create'),
+    path('rules-cache/stats/', AssetRulesCacheStatsView.as_view(), name='asset_rules_cache_stats'),
 
     path('relation/', RelationListCreateView.as_view(), name='relation_list_create'),
+    path('cluster/', DependencyClusterListAPIView.as_view()),  # GET → خوشه‌ها / POST → بازمحاسبه
+    path('cluster/<uuid:pk>/units/', DependencyClusterMembersAPIView.as_view()),  # GET → اعضای خوشه
+    path('relation/batch/', RelationBatchAPIView.as_view()),  # POST → افزودن/ویرایش/حذف گروهی یال‌ها
+    path('relation/graph-index/stats/', GraphIndexStatsView.as_view(), name='relation_graph_index_stats'),
+    path('relation/export/', GraphExportAPIView.as_view()),  # GET → خروجی GraphML / NDJSON گراف
+    path('relation/temporal/', TemporalRelationAPIView.as_view()),  # GET → روابط فعال/رو به انقضا/منقضی (سراسری)
     path('relation/<uuid:pk>/', RelationDetailView.as_view(), name='relation_detail'),
 
     path('attribute/value/<uuid:unit_id>/', AssetAttributeValueView.as_view(), name='asset_attribute_value_list_create'),
 
     path('units/', AssetUnitCreateAPIView.as_view()),  # POST → ساخت یک نمونه + EAV
+    path('units/bulk/', AssetUnitBulkUpsertAPIView.as_view()),  # POST → ساخت/ویرایش گروهی نمونه‌ها
+    path('units/search/', AssetUnitSearchAPIView.as_view()),  # GET → جستجوی نمونه‌ها بر اساس گزینه/تگ
 
     path('<uuid:asset_id>/units/', AssetUnitCreateAPIView.as_view()),  # POST → ساخت یک نمونه + EAV
 
     path('list-unit-count/', AssetListWithUnitCountAPIView.as_view()),
 
     path('unit/<uuid:unit_id>/', AssetUnitUpdateAPIView.as_view()),
+    path('unit/<uuid:unit_id>/traverse/', UnitTraversalAPIView.as_view()),  # GET → وابستگی‌های چندمرحله‌ای
+    path('unit/<uuid:unit_id>/relations/temporal/', TemporalRelationAPIView.as_view()),  # GET → روابط فعال/رو به انقضا/منقضی
+    path('unit/<uuid:unit_id>/graph/reach/', UnitBlastRadiusAPIView.as_view()),  # GET → شعاع اثر (ایندکس درون‌حافظه‌ای)
+    path('unit/<uuid:unit_id>/graph/path/<uuid:target_id>/', UnitPathAPIView.as_view()),  # GET → کوتاه‌ترین مسیر
 
 
     path('csv/rows/all/', CsvRowsView.as_view()),
@@ -35,6 +51,9 @@ urlpatterns = [
     # path('csv/commit/', CsvCommitView.as_view(), name='csv_commit'),
     path('csv/commit/', CommitImportAPIView.as_view(), name='csv_commit'),
     path('csv/issues/<uuid:pk>/', CsvImportIssuesAPIView.as_view()),
+    path('csv/sessions/<uuid:pk>/issues/', CsvSessionIssuesView.as_view()),
+    path('csv/relations/mapping/', RelationCsvMappingView.as_view(), name='csv_relation_mapping'),
+    path('csv/relations/commit/', RelationCsvCommitView.as_view(), name='csv_relation_commit'),
 
     path('generate-csv/', GenerateTemplateCSVAPIView.as_view()),
     # path('commit/', CommitImportAPIView.as_view()),
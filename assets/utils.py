@@ -109,7 +109,8 @@ def coerce_value_for_attribute(attribute: Attribute, raw):
 def validate_rules_for_asset(asset: Asset, incoming_items: list, replace_all: bool):
     # نسخه کوتاه‌شده‌ی همون متد که قبلاً توضیح دادی
     from collections import defaultdict
-    rules = {r.attribute_id: r for r in asset.type_rules.select_related("attribute")}
+    from .rules import get_asset_rules
+    rules = get_asset_rules(asset.pk)
     incoming_by_attr = defaultdict(list)
     for item in incoming_items:
         incoming_by_attr[item["attribute"].id].append(item)
@@ -127,14 +128,14 @@ def validate_rules_for_asset(asset: Asset, incoming_items: list, replace_all: bo
             final_count = existing_count + incoming_count
 
         if not rule.is_multi and final_count > 1:
-            raise serializers.ValidationError(f"{rule.attribute.title} تک‌مقداری است.")
+            raise serializers.ValidationError(f"{rule.title} تک‌مقداری است.")
 
         min_needed = max(1, rule.min_count) if rule.is_required else (rule.min_count or 0)
         if final_count < min_needed:
-            raise serializers.ValidationError(f"حداقل {min_needed} مقدار برای {rule.attribute.title} لازم است.")
+            raise serializers.ValidationError(f"حداقل {min_needed} مقدار برای {rule.title} لازم است.")
 
         if rule.max_count is not None and final_count > rule.max_count:
-            raise serializers.ValidationError(f"حداکثر {rule.max_count} مقدار برای {rule.attribute.title} مجاز است.")
+            raise serializers.ValidationError(f"حداکثر {rule.max_count} مقدار برای {rule.title} مجاز است.")
 
 
 def parse_header(header: str):
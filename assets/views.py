@@ -1,11 +1,8 @@
 import csv
 from io import StringIO
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
-from django.forms.models import model_to_dict
-from django.db.models import Count, F, Q, Value, JSONField
-from django.db.models.functions import JSONObject, Coalesce
-from django.contrib.postgres.aggregates import JSONBAgg
+from django.db.models import Count, Q, Exists, OuterRef, Prefetch
 
 from drf_spectacular.utils import extend_schema
 from rest_framework.permissions import AllowAny
@@ -13,12 +10,26 @@ from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework import status
 
-from core.utils import CustomResponse
+from core.utils import CustomResponse, etag_matches, not_modified, with_etag, encode_cursor
+from core.cache import get_version
 from core.persian_response import *
 from .serializers import *
 from .models import *
 from .csv_import.utils import coerce_value_for_attribute
 from .utils import detect_asset_from_row, get_attribute_from_column
+from .services import BulkUnitUpsertService
+from .rules import get_asset_rules, get_asset_rules_many, rules_cache_stats
+from .stats import get_attribute_stats
+from .counters import UnitCounterDeltas
+from .deletion import schedule_asset_deletion, schedule_unit_deletion
+from .graph import traverse
+from .graph_index import get_graph_index, graph_index_stats
+from .temporal import temporal_relations, keyset_page
+from .export import GraphExport, CONTENT_TYPES
+from .clusters import schedule_cluster_compute
+from .dashboard import INVENTORY_VERSION_KEY, inventory_etag, get_dashboard
+from .dictionary import get_cached_dictionary, get_dictionary
+from .history import record_value_changes, unit_values_as_of, values_as_of
 
 
 class AttributeCategoryListCreateView(APIView):
@@ -77,7 +88,7 @@ class AttributeListCreateView(APIView):
 
     @extend_schema(responses=AttributeSerializer)
     def get(self, request):
-        attributes = Attribute.objects.all()
+        attributes = Attribute.objects.select_related("category")
         serializer = AttributeSerializer(attributes, many=True)
         return CustomResponse.success(message=get_all_data(), data=serializer.data)
 
@@ -90,6 +101,22 @@ class AttributeListCreateView(APIView):
         return CustomResponse.error(message="ناموفق", errors=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AttributeDictionaryView(APIView):
+    """
+        snapshot کامل دیکشنری خصیصه‌ها (دسته‌ها + خصیصه‌ها + گزینه‌ها) در یک پاسخ؛
+        با If-None-Match در حالت عادی 304 و بدون هیچ کوئری دیتابیس برمی‌گردد
+    """
+    queryset = Attribute.objects.all()
+
+    def get(self, request):
+        _, snapshot = get_cached_dictionary()
+        if snapshot is not None and etag_matches(request, snapshot["etag"]):
+            return not_modified(snapshot["etag"])
+
+        snapshot = get_dictionary()
+        return with_etag(CustomResponse.success(get_all_data(), data=snapshot["data"]), snapshot["etag"])
+
+
 class AttributeDetailView(APIView):
     queryset = Attribute.objects.all()
 
@@ -126,18 +153,39 @@ class AttributeDetailView(APIView):
 class AssetListCreateView(APIView):
     queryset = Asset.objects.all()
 
-    @extend_schema(responses=AssetReadSerializer)
+    @extend_schema(parameters=[AssetListQuerySerializer], responses=AssetReadSerializer)
     def get(self, request):
-        asset_type = request.query_params.get("type")
-        title = request.query_params.get("title")
-        if asset_type:
-            assets = Asset.objects.filter(type=asset_type)
-        elif title:
-            assets = Asset.objects.filter(title=title)
-        else:
-            assets = Asset.objects.all()
-        serializer = AssetReadSerializer(assets, many=True)
-        return CustomResponse.success(message=get_all_data(), data=serializer.data)
+        params = request.query_params.copy()
+        if "type" in params and "asset_type" not in params:  # نام قدیمی پارامتر
+            params["asset_type"] = params["type"]
+        ser = AssetListQuerySerializer(data=params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        assets = Asset.objects.order_by("title", "id")
+        if vd.get("asset_type"):
+            assets = assets.filter(asset_type=vd["asset_type"])
+        if vd.get("title"):
+            assets = assets.filter(title__startswith=vd["title"])
+        if vd["include_rules"]:
+            assets = assets.prefetch_related(Prefetch(
+                "type_rules",
+                queryset=AssetTypeAttribute.objects.select_related("attribute__category").order_by("created_at"),
+            ))
+
+        page, page_size = vd["page"], vd["page_size"]
+        start = (page - 1) * page_size
+        total = assets.count()
+        serializer = AssetReadSerializer(
+            assets[start:start + page_size], many=True, context={"include_rules": vd["include_rules"]}
+        )
+        return CustomResponse.success(message=get_all_data(), data={
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "items": serializer.data,
+        })
 
     @extend_schema(responses=AssetReadSerializer, request=AssetCreateUpdateSerializer)
     def post(self, request):
@@ -169,9 +217,12 @@ class AssetDetailView(APIView):
             return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
         serializer = AssetCreateUpdateSerializer(asset, data=request.data)
         if serializer.is_valid():
-            serializer = serializer.save(owner=request.user)
-            output_serializer = AssetReadSerializer(serializer)
-            return CustomResponse.success(message=update_data(), data=output_serializer.data)
+            asset = serializer.save(owner=request.user)
+            data = AssetReadSerializer(asset).data
+            job = getattr(serializer, "registration_job", None)
+            if job is not None:
+                data["registration_job"] = str(job.pk)
+            return CustomResponse.success(message=update_data(), data=data)
         return CustomResponse.error(message="ناموفق", errors=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
@@ -179,8 +230,10 @@ class AssetDetailView(APIView):
             asset = Asset.objects.get(pk=pk)
         except Asset.DoesNotExist:
             return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
-        asset.delete()
-        return CustomResponse.success(message=delete_data(), status=status.HTTP_204_NO_CONTENT)
+        # دارایی فوراً پنهان و فرزندانش در پس‌زمینه تکه‌تکه حذف می‌شوند؛ وضعیت از jobs/<job>/
+        job = schedule_asset_deletion(asset, owner=request.user)
+        return CustomResponse.success(message=delete_data(), data={"job": str(job.pk)},
+                                      status=status.HTTP_202_ACCEPTED)
 
 
 class AssetAttributesListView(APIView):
@@ -201,21 +254,40 @@ class AssetAttributesListView(APIView):
         if not asset:
             return CustomResponse.error('دارایی پیدا نشد')
 
-        asset_type_attr = asset.type_rules.select_related('attribute__category')
         result = {}
 
-        for type_rule in asset_type_attr:
-            category = type_rule.attribute.category
-            attr_data = {**model_to_dict(type_rule.attribute),
-                         'is_required': type_rule.is_required,
-                         'is_multi': type_rule.is_multi,
-                         'id': type_rule.attribute.id}
-            cat_label = category.name if category else "uncategorized"
+        for rule in get_asset_rules(asset.pk):
+            attr_data = {'id': rule.attribute_id,
+                         'title': rule.title,
+                         'title_en': rule.title_en,
+                         'property_type': rule.property_type,
+                         'category': rule.category_id,
+                         'options': list(rule.options),
+                         'owner': rule.owner_id,
+                         'is_required': rule.is_required,
+                         'is_multi': rule.is_multi}
+            cat_label = rule.category_name or "uncategorized"
             result.setdefault(cat_label, []).append(attr_data)
 
         return CustomResponse.success(message=get_all_data(), data=result)
 
 
+class AssetRulesCacheStatsView(APIView):
+    # آمار کش قوانین همین worker
+    queryset = AssetTypeAttribute.objects.all()
+
+    def get(self, request):
+        return CustomResponse.success(get_all_data(), data=rules_cache_stats())
+
+
+class GraphIndexStatsView(APIView):
+    # وضعیت ایندکس درون‌حافظه‌ای گراف روابط در همین worker
+    queryset = AssetRelation.objects.all()
+
+    def get(self, request):
+        return CustomResponse.success(get_all_data(), data=graph_index_stats())
+
+
 class AssetAttributeValueView(APIView):
     queryset = AssetAttributeValue.objects.all()
 
@@ -227,7 +299,7 @@ class AssetAttributeValueView(APIView):
 
         values_qs = (
             AssetAttributeValue.objects
-            .filter(unit=unit)
+            .for_unit(unit)
             .select_related("attribute", "attribute__category")
             .order_by("attribute__category__name", "attribute__title")
         )
@@ -319,18 +391,53 @@ class AssetUnitCreateAPIView(APIView):
         return CustomResponse.success(get_all_data(), data=s.data)
 
 
+class AssetUnitBulkUpsertAPIView(APIView):
+    queryset = AssetUnit.objects.all()
+
+    @extend_schema(request=AssetUnitBulkUpsertSerializer)
+    def post(self, request):
+        ser = AssetUnitBulkUpsertSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        result = BulkUnitUpsertService(ser.validated_data["items"], request.user).run()
+        return CustomResponse.success(
+            create_data(), data=result,
+            status=status.HTTP_207_MULTI_STATUS if result["failed"] else status.HTTP_200_OK
+        )
+
+
+class RelationBatchAPIView(APIView):
+    """
+        افزودن / ویرایش / حذف گروهی یال‌ها روی چند یونیت مبدأ در یک تراکنش
+    """
+    queryset = AssetRelation.objects.all()
+
+    @extend_schema(request=RelationBatchSerializer)
+    def post(self, request):
+        ser = RelationBatchSerializer(data=request.data, context={"owner": request.user})
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        result = ser.save()
+        return CustomResponse.success(update_data(), data=result)
+
+
 class AssetUnitUpdateAPIView(APIView):
     queryset = AssetUnit.objects.all()
 
+    @extend_schema(parameters=[AsOfQuerySerializer])
     def get(self, request, unit_id: str):
         try:
             unit = AssetUnit.objects.get(pk=unit_id)
         except AssetUnit.DoesNotExist:
             return CustomResponse.error('نمونه پیدا نشد', status=status.HTTP_404_NOT_FOUND)
 
+        ser = AsOfQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        as_of = ser.validated_data.get("as_of")
+
+        # با as_of مقادیر از تاریخچه خوانده می‌شوند (یک probe روی ایندکس GiST)
         values_qs = (
-            AssetAttributeValue.objects
-            .filter(unit=unit)
+            (unit_values_as_of(unit, as_of) if as_of else AssetAttributeValue.objects.for_unit(unit))
             .select_related("attribute", "attribute__category")
             .order_by("attribute__category__name", "attribute__title")
         )
@@ -341,6 +448,12 @@ class AssetUnitUpdateAPIView(APIView):
             .select_related("relation", "target_asset")
             .order_by("relation__key", "target_asset__label")
         )
+        if as_of:
+            day = as_of.date()
+            relations_qs = relations_qs.filter(
+                Q(start_date__isnull=True) | Q(start_date__lte=day),
+                Q(end_date__isnull=True) | Q(end_date__gte=day),
+            )
 
         serializer = AssetUnitDetailSerializer(
             instance=unit,
@@ -378,11 +491,8 @@ class AssetUnitUpdateAPIView(APIView):
             unit = AssetUnit.objects.get(pk=unit_id)
         except AssetUnit.DoesNotExist:
             return CustomResponse.error('داده مورد نظر یافت نشد')
-        aav = AssetAttributeValue.objects.filter(unit=unit)
-        with transaction.atomic():
-            aav.delete()
-            unit.delete()
-        return CustomResponse.success(delete_data(), status=status.HTTP_204_NO_CONTENT)
+        job = schedule_unit_deletion(unit, owner=request.user)
+        return CustomResponse.success(delete_data(), data={"job": str(job.pk)}, status=status.HTTP_202_ACCEPTED)
 
 
 class AssetListWithUnitCountAPIView(APIView):
@@ -390,33 +500,342 @@ class AssetListWithUnitCountAPIView(APIView):
     queryset = Asset.objects.all()
 
     def get(self, request):
-        qs = (
-            Asset.objects
-            .annotate(
-                unit_count=Count("units", distinct=True),
-                unit_items=Coalesce(
-                    JSONBAgg(
-                        JSONObject(id=F('units__id'), label=F('units__label')),
-                        filter=Q(units__isnull=False),
-                        # order_by=('units__label',)  # اگر مرتب‌سازی یونیت‌ها خواستی
-                    ),
-                    Value([], output_field=JSONField())
-                )
+        # شمارنده‌ها روی خود Asset نگه‌داری می‌شوند؛ لیست یونیت‌ها جداگانه از <asset_id>/units/ گرفته می‌شود.
+        # payload تا تغییر بعدی دارایی/یونیت ثابت است: با If-None-Match فقط نسخه از Redis خوانده می‌شود.
+        version = get_version(INVENTORY_VERSION_KEY)
+        etag = inventory_etag(version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        _, grouped = get_dashboard(version)
+        return with_etag(CustomResponse.success(get_all_data(), data=grouped), etag)
+
+
+class AttributeOptionCountView(APIView):
+    """
+        تعداد یونیت‌ها به تفکیک گزینه برای خصیصه‌های multi_choice / tags
+    """
+    queryset = AssetAttributeValue.objects.all()
+
+    @extend_schema(parameters=[AttributeOptionQuerySerializer])
+    def get(self, request, pk):
+        attribute = Attribute.objects.filter(pk=pk).first()
+        if not attribute:
+            return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
+        if attribute.property_type not in (Attribute.PropertyType.MULTI_CHOICE, Attribute.PropertyType.TAGS):
+            return CustomResponse.error("این خصیصه از نوع چندانتخابی یا تگ نیست")
+
+        ser = AttributeOptionQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        options = ser.validated_data.get("option") or list(attribute.options)
+        if not options:
+            return CustomResponse.error("option الزامی است")
+
+        # && روی ایندکس GIN ردیف‌ها را محدود می‌کند و هر گزینه با @> شمرده می‌شود
+        qs = AssetAttributeValue.objects.filter(attribute=attribute, value_list__overlap=options)
+        if ser.validated_data.get("asset"):
+            qs = qs.filter(asset_id=ser.validated_data["asset"])
+        counts = qs.aggregate(**{
+            f"o{i}": Count("unit", distinct=True, filter=Q(value_list__contains=[opt]))
+            for i, opt in enumerate(options)
+        })
+
+        data = [{"option": opt, "count": counts[f"o{i}"]} for i, opt in enumerate(options)]
+        return CustomResponse.success(get_all_data(), data=data)
+
+
+class AttributeStatsView(APIView):
+    """
+        آمار مقادیر یک خصیصه: پرتکرارترین مقادیر برای رشته/گزینه،
+        min/max/avg/صدک‌ها و هیستوگرام برای عدد و تاریخ، و پوشش مقدار در یونیت‌ها
+    """
+    queryset = AssetAttributeValue.objects.all()
+
+    @extend_schema(parameters=[AttributeStatsQuerySerializer])
+    def get(self, request, pk):
+        attribute = Attribute.objects.filter(pk=pk).first()
+        if not attribute:
+            return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
+
+        ser = AttributeStatsQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = get_attribute_stats(attribute, **ser.validated_data)
+        return CustomResponse.success(get_all_data(), data=data)
+
+
+class AssetUnitSearchAPIView(APIView):
+    """
+        یونیت‌هایی که مقدار خصیصه‌ی چندانتخابی/تگ آن‌ها شامل همه‌ی گزینه‌های داده‌شده است
+    """
+    queryset = AssetUnit.objects.all()
+
+    @extend_schema(parameters=[AssetUnitSearchQuerySerializer], responses=AssetUnitSerializer)
+    def get(self, request):
+        ser = AssetUnitSearchQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        values = values_as_of(vd["as_of"]) if vd.get("as_of") else AssetAttributeValue.objects
+        matches = values.filter(
+            asset_id=OuterRef("asset_id"),
+            unit=OuterRef("pk"),
+            attribute_id=vd["attribute"],
+            value_list__contains=vd["option"],
+        )
+        qs = AssetUnit.objects.filter(Exists(matches)).select_related("asset", "owner").order_by("label", "id")
+        if vd.get("asset"):
+            qs = qs.filter(asset_id=vd["asset"])
+
+        page, page_size = vd["page"], vd["page_size"]
+        start = (page - 1) * page_size
+        total = qs.count()
+        items = AssetUnitSerializer(qs[start:start + page_size], many=True).data
+
+        return CustomResponse.success(get_all_data(), data={
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "items": items,
+        })
+
+
+class UnitTraversalAPIView(APIView):
+    """
+        پیمایش چندمرحله‌ای وابستگی‌ها (upstream/downstream) از یک یونیت برای تحلیل اثر
+    """
+    queryset = AssetRelation.objects.all()
+
+    @extend_schema(parameters=[TraversalQuerySerializer])
+    def get(self, request, unit_id):
+        if not AssetUnit.objects.filter(pk=unit_id).exists():
+            return CustomResponse.error('نمونه پیدا نشد', status=status.HTTP_404_NOT_FOUND)
+
+        ser = TraversalQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        data = traverse(
+            unit_id,
+            direction=vd["direction"],
+            max_depth=vd["max_depth"],
+            relation_keys=vd.get("relation"),
+            active_at=vd["active_at"].date() if vd.get("active_at") else None,
+        )
+        return CustomResponse.success(get_all_data(), data=data)
+
+
+class UnitBlastRadiusAPIView(APIView):
+    """
+        همه‌ی یونیت‌های قابل دسترس از یک یونیت (شعاع اثر) از روی ایندکس درون‌حافظه‌ای گراف، بدون کوئری
+    """
+    queryset = AssetRelation.objects.all()
+
+    @extend_schema(parameters=[GraphQuerySerializer])
+    def get(self, request, unit_id):
+        ser = GraphQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        index = get_graph_index()
+        start = index.node_index.get(str(unit_id))
+        seen = {} if start is None else index.bfs(
+            start,
+            upstream=vd["direction"] == "upstream",
+            relations=index.relation_filter(vd.get("relation")),
+            max_depth=vd.get("max_depth"),
+            limit=vd["limit"],
+        )
+        nodes = [
+            {
+                "id": index.node_ids[node],
+                "depth": depth,
+                "parent": index.node_ids[parent],
+                "relation": index.relation_keys[rel],
+            }
+            for node, (depth, parent, rel) in seen.items() if node != start
+        ][:vd["limit"]]
+
+        return CustomResponse.success(get_all_data(), data={
+            "root": str(unit_id),
+            "direction": vd["direction"],
+            "graph_version": index.version,
+            "total": len(nodes),
+            # seen خود یونیت ریشه را هم دارد
+            "truncated": len(seen) - 1 > vd["limit"],
+            "nodes": nodes,
+        })
+
+
+class UnitPathAPIView(APIView):
+    """
+        دسترسی‌پذیری و کوتاه‌ترین مسیر بین دو یونیت از روی ایندکس درون‌حافظه‌ای گراف
+    """
+    queryset = AssetRelation.objects.all()
+
+    @extend_schema(parameters=[GraphQuerySerializer])
+    def get(self, request, unit_id, target_id):
+        ser = GraphQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        index = get_graph_index()
+        start, goal = index.node_index.get(str(unit_id)), index.node_index.get(str(target_id))
+        path = None
+        if start is not None and goal is not None:
+            path = index.shortest_path(
+                start, goal,
+                upstream=vd["direction"] == "upstream",
+                relations=index.relation_filter(vd.get("relation")),
+                max_depth=vd.get("max_depth"),
             )
-            .values("id", "title", "asset_type", "unit_count", "unit_items")
-            .order_by("asset_type", "title")
+        elif str(unit_id) == str(target_id):
+            path = []
+
+        return CustomResponse.success(get_single_data(), data={
+            "source": str(unit_id),
+            "target": str(target_id),
+            "direction": vd["direction"],
+            "graph_version": index.version,
+            "reachable": path is not None,
+            "length": len(path) - 1 if path else 0,
+            "path": [
+                {"id": index.node_ids[node], "relation": index.relation_keys[rel] if rel is not None else None}
+                for node, rel in (path or [])
+            ],
+        })
+
+
+class TemporalRelationAPIView(APIView):
+    """
+        روابط فعال / رو به انقضا / منقضی در یک تاریخ، سراسری یا برای یک یونیت، با صفحه‌بندی keyset
+    """
+    queryset = AssetRelation.objects.all()
+
+    @extend_schema(parameters=[TemporalRelationQuerySerializer], responses=TemporalRelationSerializer(many=True))
+    def get(self, request, unit_id=None):
+        if unit_id is not None and not AssetUnit.objects.filter(pk=unit_id).exists():
+            return CustomResponse.error('نمونه پیدا نشد', status=status.HTTP_404_NOT_FOUND)
+
+        ser = TemporalRelationQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        qs = temporal_relations(
+            vd["state"], vd["at"],
+            days=vd["days"],
+            unit_id=unit_id,
+            direction=vd["direction"],
+            relation_keys=vd.get("relation"),
+        )
+        rows, next_key = keyset_page(qs, vd["state"], vd.get("cursor"), vd["page_size"])
+
+        return CustomResponse.success(get_all_data(), data={
+            "state": vd["state"],
+            "page_size": vd["page_size"],
+            "next_cursor": encode_cursor(next_key) if next_key else None,
+            "items": TemporalRelationSerializer(rows, many=True).data,
+        })
+
+
+class GraphExportAPIView(APIView):
+    """
+        خروجی جریانی گراف یونیت‌ها و روابط به GraphML یا NDJSON (حافظه‌ی ثابت برای هر اندازه‌ی گراف)
+    """
+    queryset = AssetRelation.objects.all()
+
+    @extend_schema(parameters=[GraphExportQuerySerializer], responses=None)
+    def get(self, request):
+        ser = GraphExportQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+
+        export = GraphExport(
+            asset_type=vd.get("asset_type"),
+            relation_keys=vd.get("relation"),
+            active_at=vd["active_at"].date() if vd.get("active_at") else None,
+            attribute_ids=vd.get("attribute"),
         )
+        fmt = vd["output"]
+        response = StreamingHttpResponse(export.stream(fmt), content_type=CONTENT_TYPES[fmt])
+        response["Content-Disposition"] = f'attachment; filename="assets-graph.{fmt}"'
+        return response
+
+
+class DependencyClusterListAPIView(APIView):
+    """
+        خوشه‌های وابستگی (مؤلفه‌های همبند) به ترتیب اندازه؛ POST بازمحاسبه‌ی کامل یک scope در پس‌زمینه
+    """
+    queryset = DependencyCluster.objects.all()
+
+    @extend_schema(parameters=[ClusterListQuerySerializer], responses=DependencyClusterSerializer(many=True))
+    def get(self, request):
+        ser = ClusterListQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        vd = ser.validated_data
+        page, page_size = vd["page"], vd["page_size"]
+
+        qs = DependencyCluster.objects.filter(scope=vd["scope"], size__gte=vd["min_size"]).order_by("-size", "id")
+        total = qs.count()
+        start = (page - 1) * page_size
+        items = DependencyClusterSerializer(qs[start:start + page_size], many=True).data
+
+        return CustomResponse.success(get_all_data(), data={
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "items": items,
+        })
+
+    @extend_schema(request=ClusterComputeSerializer)
+    def post(self, request):
+        ser = ClusterComputeSerializer(data=request.data)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            job = schedule_cluster_compute(ser.validated_data["scope"], owner=request.user)
+        return CustomResponse.success("محاسبه‌ی خوشه‌ها در صف اجرا قرار گرفت", data={"job": str(job.pk)},
+                                      status=status.HTTP_202_ACCEPTED)
+
+
+class DependencyClusterMembersAPIView(APIView):
+    """
+        یونیت‌های عضو یک خوشه‌ی وابستگی
+    """
+    queryset = DependencyCluster.objects.all()
 
-        grouped = {}
-        for row in qs:
-            grouped.setdefault(row["asset_type"], []).append({
-                "id": row["id"],
-                "title": row["title"],
-                "unit_count": row["unit_count"],
-                "units": row["unit_items"],  # ← اینجا دیگه تداخلی نیست
-            })
+    @extend_schema(parameters=[ClusterMembersQuerySerializer], responses=AssetUnitSerializer(many=True))
+    def get(self, request, pk):
+        cluster = DependencyCluster.objects.filter(pk=pk).first()
+        if cluster is None:
+            return CustomResponse.error('داده مورد نظر یافت نشد', status=status.HTTP_404_NOT_FOUND)
+
+        ser = ClusterMembersQuerySerializer(data=request.query_params)
+        if not ser.is_valid():
+            return CustomResponse.error("ناموفق", ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        page, page_size = ser.validated_data["page"], ser.validated_data["page_size"]
 
-        return CustomResponse.success(get_all_data(), data=grouped)
+        qs = AssetUnit.objects.filter(clusters__cluster=cluster).select_related("asset", "owner").order_by("id")
+        start = (page - 1) * page_size
+        items = AssetUnitSerializer(qs[start:start + page_size], many=True).data
+
+        return CustomResponse.success(get_all_data(), data={
+            "cluster": DependencyClusterSerializer(cluster).data,
+            "page": page,
+            "page_size": page_size,
+            "total": cluster.size,
+            "items": items,
+        })
 
 
 class CsvImportIssuesAPIView(APIView):
@@ -444,12 +863,12 @@ class GenerateTemplateCSVAPIView(APIView):
 
         headers = ["unit_label"]
 
-        assets = Asset.objects.filter(id__in=asset_ids)
+        assets = list(Asset.objects.filter(id__in=asset_ids))
+        rules_by_asset = get_asset_rules_many(a.pk for a in assets)
         for asset in assets:
-            rules = AssetTypeAttribute.objects.filter(asset=asset).select_related("attribute")
-            for rule in rules:
+            for rule in rules_by_asset[str(asset.pk)]:
                 safe_asset = asset.title.strip().replace(" ", "_").replace("-", "_")
-                safe_attr  = rule.attribute.title.strip().replace(" ", "_").replace("-", "_")
+                safe_attr  = rule.title.strip().replace(" ", "_").replace("-", "_")
 
                 col_name = f"{safe_asset}ـ{safe_attr}"
                 if rule.is_required:   # اگر الزامی بود
@@ -501,6 +920,8 @@ class CommitImportAPIView(APIView):
         file_path = session.file.path
         created_values = 0
         issues = []
+        counters = UnitCounterDeltas()
+        created_rows = []
 
         # --- پردازش فایل CSV ---
         with open(file_path, newline="", encoding="utf-8") as csvfile:
@@ -526,9 +947,7 @@ class CommitImportAPIView(APIView):
                 created_values += 1
 
                 # قوانین این دارایی
-                available_attrs = asset.type_rules.all().values_list(
-                    "attribute__id", flat=True
-                )
+                rules = get_asset_rules(asset.pk)
 
                 # پردازش attribute ها
                 for col_name, value in row.items():
@@ -539,11 +958,12 @@ class CommitImportAPIView(APIView):
                     if not attribute:
                         continue
 
-                    if attribute.id not in available_attrs:
+                    rule = rules.get(attribute.id)
+                    if rule is None:
                         continue  # این خصیصه برای این دارایی مجاز نیست
 
                     # اگر اجباری ولی خالی
-                    if getattr(attribute, "is_required", False) and not value:
+                    if rule.is_required and not value:
                         issues.append(
                             f"ردیف {row_index}: خصیصه {attribute.title} اجباری است"
                         )
@@ -562,12 +982,17 @@ class CommitImportAPIView(APIView):
                         )
                         continue
 
-                    AssetAttributeValue.objects.create(
+                    created_rows.append(AssetAttributeValue.objects.create(
                         asset=asset,
                         unit=unit,
                         attribute=attribute,
                         **casted,
-                    )
+                    ))
+
+                counters.add(unit)
+
+        counters.apply()
+        record_value_changes(created=created_rows)
 
         # بروزرسانی سشن
         session.state = ImportSession.State.COMMITTED
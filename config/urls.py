@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
-from core.views import SettingsAPIView
+from core.views import SettingsAPIView, BackgroundJobDetailView
 urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     # Optional UI:
@@ -28,4 +28,5 @@ urlpatterns = [
     path('logs/', include('logs.urls')),
     path('assets/', include('assets.urls')),
     path('settings/', SettingsAPIView.as_view(), name='settings'),
+    path('jobs/<uuid:pk>/', BackgroundJobDetailView.as_view(), name='background-job'),
 ]
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_version(key):
+    """شماره نسخه‌ی فعلی یک کلید (اگر وجود نداشته باشد از ۱ شروع می‌شود)"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_versions(keys):
+    """نسخه‌ی چند کلید با یک رفت‌وبرگشت به Redis"""
+    keys = list(keys)
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, 1, timeout=None)
+            found[key] = 1
+    return found
+
+
+def bump_version(key):
+    """افزایش نسخه؛ هر کش‌ای که با نسخه‌ی قبلی کلید خورده بود عملاً باطل می‌شود"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+        return cache.incr(key)
+
+
+def bump_version_on_commit(key):
+    """
+    نسخه را بعد از commit تراکنش جاری بالا می‌برد تا خواننده‌ی هم‌زمان
+    داده‌ی قدیمی را زیر نسخه‌ی جدید کش نکند.
+    """
+    transaction.on_commit(lambda: bump_version(key))
@@ -0,0 +1,73 @@
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# کاری که این مدت نه شروع شده و نه پیشرفتی گزارش کرده، رهاشده حساب می‌شود
+STALE_JOB_AFTER = getattr(settings, 'BACKGROUND_JOB_STALE_AFTER', datetime.timedelta(hours=1))
+
+
+def start_job(kind, func, params=None, owner=None) -> BackgroundJob:
+    """
+    یک BackgroundJob می‌سازد و func(job, **params) را بعد از commit تراکنش جاری
+    در یک thread جدا اجرا می‌کند؛ تا قبل از commit داده‌ی جدید برای کار قابل دیدن نیست.
+    با BACKGROUND_JOBS_SYNC=True کار همان‌جا (بعد از commit) اجرا می‌شود.
+    """
+    params = params or {}
+    job = BackgroundJob.objects.create(kind=kind, params=params, owner=owner)
+
+    def _start():
+        if getattr(settings, 'BACKGROUND_JOBS_SYNC', False):
+            run_job(job.pk, func)
+        else:
+            threading.Thread(target=_run_in_thread, args=(job.pk, func), daemon=True).start()
+
+    transaction.on_commit(_start)
+    return job
+
+
+def run_job(job_id, func):
+    job = BackgroundJob.objects.get(pk=job_id)
+    job.state = BackgroundJob.State.RUNNING
+    job.save(update_fields=['state', 'updated_at'])
+    try:
+        result = func(job, **job.params)
+    except Exception as e:
+        logger.exception("background job %s (%s) failed", job.pk, job.kind)
+        job.state = BackgroundJob.State.FAILED
+        job.error = str(e)
+        job.save(update_fields=['state', 'error', 'updated_at'])
+        return job
+
+    job.state = BackgroundJob.State.DONE
+    if result:
+        job.result = {**job.result, **result}
+    job.save(update_fields=['state', 'result', 'updated_at'])
+    return job
+
+
+def _run_in_thread(job_id, func):
+    try:
+        run_job(job_id, func)
+    finally:
+        # اتصال دیتابیس این thread به‌صورت خودکار بسته نمی‌شود
+        connection.close()
+
+
+def reap_stale_jobs(stale_after=None):
+    """
+    کارها در thread های daemon اجرا می‌شوند و با ری‌استارت/deploy سرویس از بین می‌روند.
+    کارهای PENDING/RUNNING که updated_at آن‌ها (با هر report جلو می‌رود) قدیمی‌تر از stale_after است
+    FAILED می‌شوند تا کاربر بتواند دوباره اجرا کند. خروجی: تعداد کارهای علامت‌خورده.
+    """
+    cutoff = timezone.now() - (stale_after or STALE_JOB_AFTER)
+    return BackgroundJob.objects.filter(
+        state__in=[BackgroundJob.State.PENDING, BackgroundJob.State.RUNNING], updated_at__lt=cutoff,
+    ).update(state=BackgroundJob.State.FAILED, error="کار با توقف سرویس نیمه‌کاره ماند", updated_at=timezone.now())
@@ -0,0 +1,18 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import reap_stale_jobs, STALE_JOB_AFTER
+
+
+class Command(BaseCommand):
+    help = ("کارهای پس‌زمینه‌ای که با ری‌استارت سرویس در PENDING/RUNNING مانده‌اند را FAILED می‌کند "
+            "(بعد از هر deploy یا به‌صورت دوره‌ای اجرا شود)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=int(STALE_JOB_AFTER.total_seconds() // 60),
+                            help="کارهایی که این مدت پیشرفتی گزارش نکرده‌اند")
+
+    def handle(self, *args, **options):
+        count = reap_stale_jobs(datetime.timedelta(minutes=options["minutes"]))
+        self.stdout.write(f"failed={count}")
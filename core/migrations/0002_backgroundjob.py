@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:19
+
+import django.db.models.deletion
+import django_jalali.db.models
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', django_jalali.db.models.jDateTimeField(auto_now_add=True)),
+                ('updated_at', django_jalali.db.models.jDateTimeField(auto_now=True)),
+                ('kind', models.CharField(db_index=True, max_length=64)),
+                ('state', models.CharField(choices=[('pending', 'در صف'), ('running', 'در حال اجرا'), ('done', 'انجام شد'), ('failed', 'ناموفق')], db_index=True, default='pending', max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 import django_jalali.db.models as jmodels
+from django.conf import settings
 from django.db import models
 import uuid
 
@@ -32,4 +33,41 @@ class Settings(BaseModel):
     def get_all_settings(cls):
         """دریافت تمامی تنظیمات ذخیره شده"""
         settings, created = cls.objects.get_or_create(id=1)
-        return settings.config
\ No newline at end of file
+        return settings.config
+
+
+class BackgroundJob(BaseModel):
+    """کارهای طولانی که بعد از پاسخ درخواست در پس‌زمینه اجرا می‌شوند"""
+
+    class State(models.TextChoices):
+        PENDING = 'pending', 'در صف'
+        RUNNING = 'running', 'در حال اجرا'
+        DONE = 'done', 'انجام شد'
+        FAILED = 'failed', 'ناموفق'
+
+    kind = models.CharField(max_length=64, db_index=True)
+    state = models.CharField(max_length=16, choices=State.choices, default=State.PENDING, db_index=True)
+    params = models.JSONField(default=dict, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(null=True, blank=True)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='background_jobs')
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def report(self, processed=None, total=None, **result):
+        """ذخیره‌ی پیشرفت؛ فقط ستون‌های تغییر کرده نوشته می‌شوند"""
+        fields = ['updated_at']
+        if processed is not None:
+            self.processed = processed
+            fields.append('processed')
+        if total is not None:
+            self.total = total
+            fields.append('total')
+        if result:
+            self.result = {**self.result, **result}
+            fields.append('result')
+        self.save(update_fields=fields)
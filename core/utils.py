@@ -1,3 +1,6 @@
+import base64
+import json
+
 from rest_framework.response import Response
 from django.utils.timezone import now
 from rest_framework import status as http_status
@@ -31,6 +34,40 @@ def get_anonymous_cache_key(request, prefix='anon_cache'):
     return key
 
 
+def etag_matches(request, etag):
+    """آیا If-None-Match درخواست با ETag فعلی یکی است (پاسخ 304 کافی است)"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+def with_etag(response, etag):
+    response['ETag'] = etag
+    # مرورگر هر بار با If-None-Match اعتبارسنجی کند
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=http_status.HTTP_304_NOT_MODIFIED), etag)
+
+
+def encode_cursor(values):
+    """کرسر صفحه‌بندی keyset: مقادیر کلید مرتب‌سازی آخرین ردیف → رشته‌ی امن برای URL"""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ValueError برای کرسر نامعتبر"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
 # def set_new_password(user, new_password):
 #     user.set_password(new_password)  # تغییر پسورد
 #     user.password_changed_at = now()  # ثبت زمان جدید
@@ -1,10 +1,11 @@
 from rest_framework.views import APIView
+from rest_framework import status
 from .utils import CustomResponse
 from .persian_response import *
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
-from .models import Settings
+from .models import Settings, BackgroundJob
 from rest_framework import serializers
 
 
@@ -53,4 +54,22 @@ class SettingsAPIView(APIView):
         return CustomResponse.success(message=update_data(), data=settings.config)
 
 
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BackgroundJob
+        fields = ('id', 'created_at', 'updated_at', 'kind', 'state', 'params',
+                  'total', 'processed', 'result', 'error')
+
+
+class BackgroundJobDetailView(APIView):
+    queryset = BackgroundJob.objects.all()
+
+    @extend_schema(responses=BackgroundJobSerializer)
+    def get(self, request, pk):
+        job = BackgroundJob.objects.filter(pk=pk).first()
+        if not job:
+            return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
+        return CustomResponse.success(message=get_single_data(), data=BackgroundJobSerializer(job).data)
+
+
 # config = {"PASSWORD_HISTORY_LIMIT": 5 ,"MAX_FAILED_LOGIN_ATTEMPTS": 5 ,"ACCOUNT_LOCKOUT_MINUTES": 30 ,"PASSWORD_EXPIRATION_DAYS": 90}
@@ -0,0 +1,86 @@
+"""
+نوشتن گروهی پاسخ‌های یک ارزیابی و مراجع آن‌ها با diff (مشترک بین AssessmentSerializer و autosave).
+"""
+from django.utils import timezone
+from .models import Answer, AnswerReference
+
+
+def apply_answers(assessment, answers_data, user, existing=None):
+    """
+    پاسخ‌ها با diff نوشته می‌شوند: پاسخ‌های موجود یک بار خوانده می‌شوند، تغییرکرده‌ها با
+    bulk_update و جدیدها با bulk_create. مراجع هم با diff: با id نگه/به‌روز، بدون id ساخته،
+    و مراجعی که در لیست نیامده‌اند حذف می‌شوند. خروجی: سوال‌هایی که مقدار answer آن‌ها عوض شد.
+    """
+    if existing is None:
+        existing = {a.question_id: a for a in assessment.responses.all()}
+
+    now = timezone.now()
+    to_create, to_update, changed = [], [], []
+    update_fields = set()
+    references = {}  # answer → لیست ارسالی (فقط پاسخ‌هایی که references داشته‌اند)
+    for ans in answers_data:
+        ans = dict(ans)
+        references_data = ans.pop('references', None)
+        a_obj = existing.get(ans['question_id'])
+        if a_obj is None:
+            a_obj = Answer(assessment=assessment, owner=user, **ans)
+            to_create.append(a_obj)
+            changed.append(a_obj.question_id)
+        else:
+            diff = {k: v for k, v in ans.items() if getattr(a_obj, k) != v}
+            if a_obj.owner_id != user.pk:
+                diff['owner_id'] = user.pk
+            if diff:
+                if 'answer' in diff:
+                    changed.append(a_obj.question_id)
+                for k, v in diff.items():
+                    setattr(a_obj, k, v)
+                a_obj.updated_at = now  # bulk_update فیلد auto_now را خودش پر نمی‌کند
+                update_fields.update('owner' if k == 'owner_id' else k for k in diff)
+                to_update.append(a_obj)
+        if references_data is not None:
+            references[a_obj] = references_data
+
+    if to_update:
+        Answer.objects.bulk_update(to_update, sorted(update_fields) + ['updated_at'], batch_size=500)
+    if to_create:
+        Answer.objects.bulk_create(to_create, batch_size=500)
+    if references:
+        apply_references(references, now)
+    return changed
+
+
+def apply_references(references, now):
+    current = {}
+    for ref in AnswerReference.objects.filter(answer__in=list(references)):
+        current.setdefault(ref.answer_id, {})[ref.id] = ref
+
+    to_create, to_update, to_delete = [], [], []
+    for answer, refs_data in references.items():
+        own = current.get(answer.pk, {})
+        kept = set()
+        for ref_data in refs_data:
+            ref_id = ref_data.get('id')
+            if ref_id is None:
+                to_create.append(AnswerReference(answer=answer, title=ref_data['title'], file=ref_data['file']))
+                continue
+            ref = own.get(ref_id)
+            if ref is None:
+                # مالکیت مراجع در validate_responses سنجیده شده؛ این یکی در این فاصله حذف شده است
+                continue
+            kept.add(ref_id)
+            if ref_data.get('file'):
+                # فایل جدید با bulk_update در storage ذخیره نمی‌شود؛ جایگزینی = حذف + ایجاد
+                to_delete.append(ref_id)
+                to_create.append(AnswerReference(answer=answer, title=ref_data['title'], file=ref_data['file']))
+            elif ref.title != ref_data['title']:
+                ref.title, ref.updated_at = ref_data['title'], now
+                to_update.append(ref)
+        to_delete.extend(pk for pk in own if pk not in kept)
+
+    if to_delete:
+        AnswerReference.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        AnswerReference.objects.bulk_update(to_update, ['title', 'updated_at'], batch_size=500)
+    if to_create:
+        AnswerReference.objects.bulk_create(to_create, batch_size=500)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MerdasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'merdas'
+
+    def ready(self):
+        import merdas.signals
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:42
+
+import django.db.models.deletion
+import django_jalali.db.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merdas', '0008_alter_assessment_standard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceScore',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', django_jalali.db.models.jDateTimeField(auto_now_add=True)),
+                ('updated_at', django_jalali.db.models.jDateTimeField(auto_now=True)),
+                ('level', models.CharField(choices=[('overall', 'Overall'), ('fr', 'FR'), ('sr', 'SR')], max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('yes', models.PositiveIntegerField(default=0)),
+                ('no', models.PositiveIntegerField(default=0)),
+                ('alternate', models.PositiveIntegerField(default=0)),
+                ('not_applicable', models.PositiveIntegerField(default=0)),
+                ('unanswered', models.PositiveIntegerField(default=0)),
+                ('weight', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('version', models.CharField(blank=True, default='', max_length=64)),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='merdas.assessment')),
+                ('fr', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='merdas.fr')),
+                ('sr', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='merdas.sr')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('level', 'overall')), fields=('assessment',), name='uq_score_overall'), models.UniqueConstraint(condition=models.Q(('level', 'fr')), fields=('assessment', 'fr'), name='uq_score_fr'), models.UniqueConstraint(condition=models.Q(('level', 'sr')), fields=('assessment', 'fr', 'sr'), name='uq_score_sr')],
+            },
+        ),
+    ]
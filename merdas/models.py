@@ -123,20 +123,39 @@ class AnswerReference(BaseModel):
     file = models.FileField(upload_to='files/references/%Y/%m/%d')
 
 
+class ComplianceScore(BaseModel):
+    """
+    امتیاز انطباق یک ارزیابی (merdas.scoring) در سه سطح: هر (FR, SR)، هر FR و کل.
+    شمارش‌ها روی سوال‌های در محدوده‌ی SAL ارزیابی است؛ سوال بی‌پاسخ در مخرج حساب می‌شود.
+    """
+    class Level(models.TextChoices):
+        OVERALL = "overall", "Overall"
+        FR = "fr", "FR"
+        SR = "sr", "SR"
+
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='scores')
+    level = models.CharField(max_length=10, choices=Level.choices)
+    fr = models.ForeignKey(FR, on_delete=models.CASCADE, related_name='scores', blank=True, null=True)
+    sr = models.ForeignKey(SR, on_delete=models.CASCADE, related_name='scores', blank=True, null=True)
+
+    total = models.PositiveIntegerField(default=0)
+    yes = models.PositiveIntegerField(default=0)
+    no = models.PositiveIntegerField(default=0)
+    alternate = models.PositiveIntegerField(default=0)
+    not_applicable = models.PositiveIntegerField(default=0)
+    unanswered = models.PositiveIntegerField(default=0)
+    weight = models.PositiveIntegerField(default=0)
+    # درصد انطباق؛ null یعنی هیچ سوال قابل اعمالی نیست
+    score = models.FloatField(blank=True, null=True)
+    # فقط در ردیف overall: نسخه‌ی پرسش‌نامه‌ای که امتیازها با آن محاسبه شده‌اند
+    version = models.CharField(max_length=64, blank=True, default="")
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['assessment'], condition=models.Q(level='overall'),
+                                    name='uq_score_overall'),
+            models.UniqueConstraint(fields=['assessment', 'fr'], condition=models.Q(level='fr'),
+                                    name='uq_score_fr'),
+            models.UniqueConstraint(fields=['assessment', 'fr', 'sr'], condition=models.Q(level='sr'),
+                                    name='uq_score_sr'),
+        ]
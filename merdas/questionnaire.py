@@ -0,0 +1,106 @@
+"""
+پرسش‌نامه‌ی گروه‌بندی‌شده‌ی FR → SR → سوال برای هر (استاندارد، سطح SAL).
+
+نتیجه فقط به استاندارد و SAL بستگی دارد، پس یک بار ساخته و زیر نسخه‌ی درخت استاندارد
+(merdas.snapshots) و نسخه‌ی سوال‌های همان استاندارد کش می‌شود. هر تغییر سوال‌ها (merdas.signals)
+نسخه‌ی دوم را بعد از commit بالا می‌برد. ترتیب FR ها، SR ها و سوال‌ها ثابت است (created_at, id)
+تا خروجی و ETag بین بازسازی‌ها یکسان بماند.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from core.cache import get_versions, bump_version_on_commit
+from .models import Question, SR
+from .serializers import FRSerializer, SRSerializer, QuestionSerializer
+from .snapshots import STANDARD_VERSION_KEY, get_standard_tree
+
+LEVEL_ORDER = {
+    "Low": 0,
+    "Moderate": 1,
+    "High": 2,
+    "Very High": 3,
+}
+
+QUESTIONS_VERSION_KEY = "standard_questions_version:{pk}"
+QUESTIONNAIRE_KEY = "questionnaire:{pk}:sal{rank}:v{version}"
+QUESTIONNAIRE_TIMEOUT = getattr(settings, "QUESTIONNAIRE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def bump_question_versions(standard_ids):
+    for pk in set(standard_ids):
+        if pk is not None:
+            bump_version_on_commit(QUESTIONS_VERSION_KEY.format(pk=pk))
+
+
+def questionnaire_version(standard_id):
+    keys = [STANDARD_VERSION_KEY.format(pk=standard_id), QUESTIONS_VERSION_KEY.format(pk=standard_id)]
+    versions = get_versions(keys)
+    return f"{versions[keys[0]]}.{versions[keys[1]]}"
+
+
+def questionnaire_etag(standard_id, overall_sal, version):
+    return f'"qn-{standard_id}-{LEVEL_ORDER[overall_sal]}-{version}"'
+
+
+def build_questionnaire(standard_id, overall_sal):
+    """None اگر استاندارد وجود نداشته باشد"""
+    tree = get_standard_tree(standard_id)
+    if tree is None:
+        return None
+    standard_data = {k: v for k, v in tree.items() if k != "version"}
+
+    rank = LEVEL_ORDER[overall_sal]
+    allowed_levels = [level for level, r in LEVEL_ORDER.items() if r <= rank]
+    questions = Question.objects.filter(
+        standard_id=standard_id, question_level__in=allowed_levels,
+    ).select_related("fr", "sr").prefetch_related(
+        # SR های داخل FR هر سوال هم باید ترتیب ثابت داشته باشند
+        Prefetch("fr__sr", queryset=SR.objects.order_by("created_at", "id")),
+    ).order_by(
+        "fr__created_at", "fr_id", "sr__created_at", "sr_id", "created_at", "id",
+    )
+    # شکل هر سوال همان QuestionSerializer است؛ فقط فیلدهای تودرتو از داده‌ی از پیش ساخته پر می‌شوند
+    question_fields = QuestionSerializer().fields
+
+    # هر FR / SR فقط یک بار سریالایز می‌شود؛ ترتیب ورود به dict همان ترتیب کوئری است
+    frs, fr_data, sr_data = {}, {}, {}
+    for q in questions:
+        if q.fr_id not in fr_data:
+            fr_data[q.fr_id] = FRSerializer(q.fr).data
+            frs[q.fr_id] = {"fr_id": q.fr_id, "fr": q.fr.title, "srs": {}}
+        if q.sr_id not in sr_data:
+            sr_data[q.sr_id] = SRSerializer(q.sr).data
+        srs = frs[q.fr_id]["srs"]
+        if q.sr_id not in srs:
+            srs[q.sr_id] = {"sr_id": q.sr_id, "sr": q.sr.title, "questions": []}
+        srs[q.sr_id]["questions"].append(_question_data(q, question_fields, {
+            "standard": standard_data,
+            "fr": fr_data[q.fr_id],
+            "sr": sr_data[q.sr_id],
+        }))
+
+    return [{**fr, "srs": list(fr["srs"].values())} for fr in frs.values()]
+
+
+def _question_data(question, fields, nested):
+    data = {}
+    for name, field in fields.items():
+        if name in nested:
+            data[name] = nested[name]
+            continue
+        value = field.get_attribute(question)
+        data[name] = None if value is None else field.to_representation(value)
+    return data
+
+
+def get_questionnaire(standard_id, overall_sal):
+    """(داده، ETag)؛ داده None یعنی استاندارد یافت نشد"""
+    version = questionnaire_version(standard_id)
+    key = QUESTIONNAIRE_KEY.format(pk=standard_id, rank=LEVEL_ORDER[overall_sal], version=version)
+    data = cache.get(key)
+    if data is None:
+        data = build_questionnaire(standard_id, overall_sal)
+        if data is not None:
+            cache.set(key, data, timeout=QUESTIONNAIRE_TIMEOUT)
+    return data, questionnaire_etag(standard_id, overall_sal, version)
@@ -0,0 +1,202 @@
+"""
+موتور امتیاز انطباق ارزیابی‌ها.
+
+- سطح SR: برای هر (FR, SR) شمارش پاسخ‌ها با یک کوئری گروه‌بندی‌شده روی سوال‌های در محدوده‌ی SAL
+  (پاسخ‌های همین ارزیابی با FilteredRelation به سوال‌ها LEFT JOIN می‌شوند).
+  امتیاز = (yes + alternate) / (کل − N/A)؛ سوال بی‌پاسخ عدم انطباق حساب می‌شود.
+- سطح FR: جمع شمارش‌های SR های همان FR (از جدول امتیاز، نه دوباره از پاسخ‌ها).
+- کل: میانگین وزنی امتیاز FR ها با FR.weight (FR بدون سوال قابل اعمال کنار گذاشته می‌شود).
+
+با تغییر پاسخ‌ها فقط (FR, SR) های سوال‌های تغییرکرده و FR های آن‌ها دوباره حساب می‌شوند.
+ردیف کل نسخه‌ی پرسش‌نامه (استاندارد، SAL و خلاصه‌ی سوال‌ها و وزن FR ها) را نگه می‌دارد؛ اگر عوض شده
+باشد به‌جای به‌روزرسانی افزایشی همه از نو محاسبه می‌شود. این نسخه در دیتابیس ذخیره می‌شود، پس از خود
+داده‌ها ساخته می‌شود نه از شمارنده‌های Redis که با پاک شدن کش به ۱ برمی‌گردند.
+"""
+import hashlib
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, FilteredRelation, Max, Q, Sum
+
+from .models import Assessment, Answer, ComplianceScore, FR, Question
+from .questionnaire import LEVEL_ORDER
+
+COUNT_FIELDS = ("total", "yes", "no", "alternate", "not_applicable", "unanswered")
+
+
+def scoring_version(assessment):
+    """
+    هر تغییری در سوال‌های استاندارد (ایجاد، حذف، جابه‌جایی FR/SR/سطح) تعداد یا بیشترین updated_at
+    سوال‌ها را عوض می‌کند و هر تغییر وزن FR بیشترین updated_at یا جمع وزن‌ها را؛ با یک کوئری.
+    """
+    summary = Question.objects.filter(standard_id=assessment.standard_id).aggregate(
+        questions=Count("id"),
+        questions_at=Max("updated_at"),
+        frs_at=Max("fr__updated_at"),
+        weights=Sum("fr__weight"),
+    )
+    raw = ":".join(str(v) for v in (assessment.standard_id, assessment.overall_sal or "*", *summary.values()))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _percent(counts):
+    applicable = counts["total"] - counts["not_applicable"]
+    if applicable <= 0:
+        return None
+    return round(100 * (counts["yes"] + counts["alternate"]) / applicable, 2)
+
+
+def _pairs_q(pairs):
+    return reduce(or_, (Q(fr_id=fr, sr_id=sr) for fr, sr in pairs))
+
+
+def _questions(assessment):
+    qs = Question.objects.filter(standard_id=assessment.standard_id)
+    if assessment.overall_sal in LEVEL_ORDER:
+        rank = LEVEL_ORDER[assessment.overall_sal]
+        qs = qs.filter(question_level__in=[level for level, r in LEVEL_ORDER.items() if r <= rank])
+    return qs
+
+
+def _sr_counts(assessment, pairs=None):
+    """{(fr_id, sr_id): counts} با یک کوئری گروه‌بندی‌شده"""
+    qs = _questions(assessment)
+    if pairs is not None:
+        qs = qs.filter(_pairs_q(pairs))
+    rows = qs.annotate(
+        ans=FilteredRelation("responses", condition=Q(responses__assessment_id=assessment.pk)),
+    ).order_by().values("fr_id", "sr_id").annotate(
+        total=Count("id"),
+        yes=Count("id", filter=Q(ans__answer=Answer.AnswerChoices.YES)),
+        no=Count("id", filter=Q(ans__answer=Answer.AnswerChoices.NO)),
+        alternate=Count("id", filter=Q(ans__answer=Answer.AnswerChoices.ALT)),
+        not_applicable=Count("id", filter=Q(ans__answer=Answer.AnswerChoices.NA)),
+        unanswered=Count("id", filter=Q(ans__id__isnull=True)),
+    )
+    return {(row["fr_id"], row["sr_id"]): {k: row[k] for k in COUNT_FIELDS} for row in rows}
+
+
+def _write_sr(assessment, counts, pairs=None):
+    stale = ComplianceScore.objects.filter(assessment=assessment, level=ComplianceScore.Level.SR)
+    if pairs is not None:
+        stale = stale.filter(_pairs_q(pairs))
+    stale.delete()
+    ComplianceScore.objects.bulk_create([
+        ComplianceScore(assessment=assessment, level=ComplianceScore.Level.SR, fr_id=fr, sr_id=sr,
+                        score=_percent(c), **c)
+        for (fr, sr), c in counts.items()
+    ])
+
+
+def _write_fr(assessment, fr_ids=None):
+    sr_rows = ComplianceScore.objects.filter(assessment=assessment, level=ComplianceScore.Level.SR)
+    fr_rows = ComplianceScore.objects.filter(assessment=assessment, level=ComplianceScore.Level.FR)
+    if fr_ids is not None:
+        sr_rows = sr_rows.filter(fr_id__in=fr_ids)
+        fr_rows = fr_rows.filter(fr_id__in=fr_ids)
+    totals = sr_rows.order_by().values("fr_id").annotate(**{f: Sum(f) for f in COUNT_FIELDS})
+    totals = {row["fr_id"]: {f: row[f] for f in COUNT_FIELDS} for row in totals}
+    weights = dict(FR.objects.filter(pk__in=list(totals)).values_list("pk", "weight"))
+
+    fr_rows.delete()
+    ComplianceScore.objects.bulk_create([
+        ComplianceScore(assessment=assessment, level=ComplianceScore.Level.FR, fr_id=fr,
+                        weight=weights.get(fr, 0), score=_percent(c), **c)
+        for fr, c in totals.items()
+    ])
+
+
+def _write_overall(assessment, version):
+    frs = list(ComplianceScore.objects.filter(assessment=assessment, level=ComplianceScore.Level.FR))
+    counts = {f: sum(getattr(row, f) for row in frs) for f in COUNT_FIELDS}
+    scored = [row for row in frs if row.score is not None]
+    weight = sum(row.weight for row in scored)
+    score = round(sum(row.score * row.weight for row in scored) / weight, 2) if weight else None
+    ComplianceScore.objects.update_or_create(
+        assessment=assessment, level=ComplianceScore.Level.OVERALL,
+        defaults={**counts, "weight": weight, "score": score, "version": version},
+    )
+
+
+def _lock(assessment):
+    # به‌روزرسانی‌های هم‌زمان یک ارزیابی پشت سر هم اجرا شوند
+    return Assessment.objects.select_for_update().get(pk=assessment.pk)
+
+
+def compute_scores(assessment):
+    """محاسبه‌ی کامل امتیازهای یک ارزیابی"""
+    with transaction.atomic():
+        assessment = _lock(assessment)
+        if assessment.standard_id is None:
+            ComplianceScore.objects.filter(assessment=assessment).delete()
+            return None
+        version = scoring_version(assessment)
+        _write_sr(assessment, _sr_counts(assessment))
+        _write_fr(assessment)
+        _write_overall(assessment, version)
+        return version
+
+
+def update_scores(assessment, question_ids):
+    """
+    به‌روزرسانی افزایشی پس از تغییر پاسخ سوال‌های question_ids؛ باید داخل تراکنش نوشتن پاسخ‌ها
+    صدا زده شود.
+    """
+    with transaction.atomic():
+        assessment = _lock(assessment)
+        version = scoring_version(assessment) if assessment.standard_id else None
+        current = ComplianceScore.objects.filter(
+            assessment=assessment, level=ComplianceScore.Level.OVERALL,
+        ).values_list("version", flat=True).first()
+        if version is None or current != version:
+            return compute_scores(assessment)
+
+        pairs = set(Question.objects.filter(pk__in=set(question_ids)).values_list("fr_id", "sr_id").distinct())
+        if not pairs:
+            return version
+        _write_sr(assessment, _sr_counts(assessment, pairs), pairs)
+        _write_fr(assessment, {fr for fr, _ in pairs})
+        _write_overall(assessment, version)
+        return version
+
+
+def _counts(row):
+    return {"score": row.score, **{f: getattr(row, f) for f in COUNT_FIELDS}}
+
+
+def overall_score(assessment):
+    row = ComplianceScore.objects.filter(assessment=assessment, level=ComplianceScore.Level.OVERALL).first()
+    return None if row is None else {**_counts(row), "weight": row.weight}
+
+
+def score_report(assessment):
+    """
+    امتیازها به شکل درخت FR → SR؛ اگر محاسبه نشده یا کهنه باشند اول از نو محاسبه می‌شوند.
+    None اگر ارزیابی استاندارد نداشته باشد.
+    """
+    if assessment.standard_id is None:
+        return None
+    rows = list(ComplianceScore.objects.filter(assessment=assessment).select_related("fr", "sr"))
+    overall = next((r for r in rows if r.level == ComplianceScore.Level.OVERALL), None)
+    if overall is None or overall.version != scoring_version(assessment):
+        compute_scores(assessment)
+        rows = list(ComplianceScore.objects.filter(assessment=assessment).select_related("fr", "sr"))
+        overall = next(r for r in rows if r.level == ComplianceScore.Level.OVERALL)
+
+    frs = sorted((r for r in rows if r.level == ComplianceScore.Level.FR),
+                 key=lambda r: (r.fr.created_at, str(r.fr_id)))
+    srs = sorted((r for r in rows if r.level == ComplianceScore.Level.SR),
+                 key=lambda r: (r.sr.created_at, str(r.sr_id)))
+    return {
+        "assessment_id": assessment.pk,
+        "overall_sal": assessment.overall_sal,
+        "overall": {**_counts(overall), "weight": overall.weight},
+        "frs": [{
+            "fr_id": fr.fr_id,
+            "fr": fr.fr.title,
+            "weight": fr.weight,
+            **_counts(fr),
+            "srs": [{"sr_id": sr.sr_id, "sr": sr.sr.title, **_counts(sr)} for sr in srs if sr.fr_id == fr.fr_id],
+        } for fr in frs],
+    }
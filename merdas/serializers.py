@@ -5,6 +5,7 @@ from accounts.serializers import UserGetSerializer
 from django.db import transaction
 from accounts.models import Organization, OrganizationType
 from accounts.serializers import OrganizationReadSerializer
+from .answers import apply_answers
 
 
 User = get_user_model()
@@ -166,18 +167,28 @@ class QuestionCreateSerializer(serializers.ModelSerializer):
 
 
 class QuestionFRSRSerializer(serializers.Serializer):
-    standard_id = serializers.CharField()
-    overall_sal = serializers.CharField()
+    standard_id = serializers.UUIDField()
+    overall_sal = serializers.ChoiceField(choices=Question.QuestionLevel.choices)
 
 
 class AnswerReferenceSerializer(serializers.ModelSerializer):
+    # با id: مرجع موجود نگه داشته می‌شود (و اگر file آمده باشد جایگزین می‌شود)؛ بدون id: مرجع جدید
+    id = serializers.UUIDField(required=False)
+    file = serializers.FileField(required=False)
+
     class Meta:
         model = AnswerReference
-        fields = ['title', 'file']
+        fields = ['id', 'title', 'file']
+
+    def validate(self, attrs):
+        if not attrs.get('id') and not attrs.get('file'):
+            raise serializers.ValidationError({"file": "فایل برای مرجع جدید الزامی است"})
+        return attrs
 
 
 class AnswerSerializer(serializers.ModelSerializer):
-    question = serializers.PrimaryKeyRelatedField(queryset=Question.objects.all())
+    # وجود سوال‌ها یک‌جا در AssessmentSerializer.validate_responses بررسی می‌شود
+    question = serializers.UUIDField(source='question_id')
     references = AnswerReferenceSerializer(many=True, required=False)
 
     class Meta:
@@ -279,21 +290,10 @@ class AssessmentSerializer(serializers.ModelSerializer):
         if contacts_data:
             assessment.contacts.set(contacts_data)
 
-        for ans in answers_data:
-            # ۱. جدا کردن references از ans
-            references_data = ans.pop('references', [])
-
-            # ۲. ساخت پاسخ اصلی بدون کلید references
-            a_obj = Answer.objects.create(
-                assessment=assessment,
-                owner=user,
-                **ans
-            )
-
-            # ۳. اگر references داشت، آن‌ها را یکی‌یکی بساز
-            for ref in references_data:
-                AnswerReference.objects.create(answer=a_obj, **ref)
+        apply_answers(assessment, answers_data, user, existing={})
 
+        from .scoring import compute_scores
+        compute_scores(assessment)
         return assessment
 
     @transaction.atomic
@@ -312,38 +312,119 @@ class AssessmentSerializer(serializers.ModelSerializer):
             instance.contacts.set(contacts_data)
 
         # ۳. پاسخ‌ها
-        existing_qs = {a.question_id: a for a in instance.responses.all()}
-        for ans in answers_data:
-            # ۳.۱ جدا کردن references
-            references_data = ans.pop('references', None)
-
-            q = ans['question']
-            if q.id in existing_qs:
-                # آپدیت موجود
-                a_obj = existing_qs[q.id]
-                for k, v in ans.items():
-                    setattr(a_obj, k, v)
-                a_obj.owner = user
-                a_obj.save()
-            else:
-                # ایجاد جدید
-                a_obj = Answer.objects.create(
-                    assessment=instance, owner=user, **ans
-                )
-
-            # ۳.۲ مدیریت references پس از save
-            if references_data is not None:
-                # حذف قدیم‌ها
-                a_obj.references.all().delete()
-                # ایجاد آیتم‌های جدید
-                for ref in references_data:
-                    AnswerReference.objects.create(answer=a_obj, **ref)
+        changed = apply_answers(instance, answers_data, user)
 
+        # فقط FR/SR های سوال‌های پاسخ‌داده‌شده؛ تغییر استاندارد یا SAL خودش محاسبه‌ی کامل را رقم می‌زند
+        from .scoring import update_scores
+        update_scores(instance, changed)
         return instance
 
+    def validate_responses(self, value):
+        """
+        وجود همه‌ی سوال‌ها با یک کوئری IN و بدون سوال تکراری؛ مراجع با id هم با یک کوئری IN
+        باید متعلق به پاسخ همین ارزیابی به همان سوال باشند تا ذخیره روی ورودی کاربر شکست نخورد.
+        """
+        ids = [ans['question_id'] for ans in value]
+        found = set(Question.objects.filter(pk__in=set(ids)).values_list('pk', flat=True))
+        ref_ids = {ref['id'] for ans in value for ref in ans.get('references') or [] if ref.get('id')}
+        # ارزیابی جدید هنوز مرجعی ندارد
+        ref_owner = dict(
+            AnswerReference.objects.filter(pk__in=ref_ids, answer__assessment=self.instance)
+            .values_list('pk', 'answer__question_id')
+        ) if ref_ids and self.instance is not None else {}
+
+        errors, seen = [], set()
+        for ans in value:
+            qid = ans['question_id']
+            if qid not in found:
+                errors.append({"question": [f"سوال {qid} یافت نشد"]})
+            elif qid in seen:
+                errors.append({"question": ["برای این سوال بیش از یک پاسخ ارسال شده است"]})
+            else:
+                errors.append(self._reference_errors(ans.get('references') or [], qid, ref_owner))
+            seen.add(qid)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
+
+    @staticmethod
+    def _reference_errors(references, question_id, ref_owner):
+        errors, seen = [], set()
+        for ref in references:
+            ref_id = ref.get('id')
+            if ref_id is None:
+                errors.append({})
+            elif ref_owner.get(ref_id) != question_id:
+                errors.append({"id": [f"مرجع {ref_id} متعلق به این پاسخ نیست"]})
+            elif ref_id in seen:
+                errors.append({"id": ["این مرجع بیش از یک بار ارسال شده است"]})
+            else:
+                errors.append({})
+            seen.add(ref_id)
+        return {"references": errors} if any(errors) else {}
+
+
+AUTOSAVE_MAX_ANSWERS = 200
+
+
+class AnswerPatchItemSerializer(serializers.Serializer):
+    question = serializers.UUIDField(source='question_id')
+    answer = serializers.ChoiceField(choices=Answer.AnswerChoices.choices, required=False)
+    substitute_text = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    reviewed = serializers.BooleanField(required=False)
+
+
+class AnswerPatchSerializer(serializers.Serializer):
+    """
+    autosave: فقط پاسخ‌های تغییرکرده (بدون فایل) به شکل JSON؛ فیلدهای نیامده دست نمی‌خورند.
+    context: assessment و request
+    """
+    answers = AnswerPatchItemSerializer(many=True, allow_empty=False, max_length=AUTOSAVE_MAX_ANSWERS)
+
+    def validate_answers(self, value):
+        assessment = self.context['assessment']
+        ids = [item['question_id'] for item in value]
+        found = set(Question.objects.filter(pk__in=set(ids)).values_list('pk', flat=True))
+        existing = {a.question_id: a for a in assessment.responses.filter(question_id__in=found)}
+
+        errors, seen = [], set()
+        for item in value:
+            qid, current = item['question_id'], existing.get(item['question_id'])
+            answer = item.get('answer', current.answer if current else None)
+            substitute_text = item.get('substitute_text', current.substitute_text if current else None)
+            if qid not in found:
+                errors.append({"question": [f"سوال {qid} یافت نشد"]})
+            elif qid in seen:
+                errors.append({"question": ["برای این سوال بیش از یک پاسخ ارسال شده است"]})
+            elif answer is None:
+                errors.append({"answer": ["برای پاسخ جدید مقدار answer الزامی است"]})
+            elif answer == Answer.AnswerChoices.ALT and not substitute_text:
+                errors.append({"substitute_text": ["متن پاسخ را وارد کنید"]})
+            else:
+                errors.append({})
+            seen.add(qid)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
+
+    @transaction.atomic
+    def create(self, validated_data):
+        from .scoring import update_scores
+
+        items = validated_data['answers']
+        ids = [item['question_id'] for item in items]
+        # قفل ارزیابی قبل از خواندن پاسخ‌ها تا دو autosave هم‌زمان یک پاسخ را دو بار نسازند
+        assessment = Assessment.objects.select_for_update().get(pk=self.context['assessment'].pk)
+        existing = {a.question_id: a for a in assessment.responses.filter(question_id__in=ids)}
+        changed = apply_answers(assessment, items, self.context['request'].user, existing=existing)
+        update_scores(assessment, changed)
+        return list(assessment.responses.filter(question_id__in=ids).prefetch_related('references'))
+
 
 class AssessmentReadSerializer(serializers.ModelSerializer):
-    standard = StandardSerializer(read_only=True)
+    # درخت استاندارد از snapshot کش‌شده (merdas.snapshots) خوانده می‌شود، نه با سریالایزر تودرتو
+    standard = serializers.SerializerMethodField()
     organization = OrganizationReadSerializer()
     org_contact = UserGetSerializer()
     critical_service = UserGetSerializer()
@@ -378,6 +459,15 @@ class AssessmentReadSerializer(serializers.ModelSerializer):
             'organization_type',
         )
 
+    def get_standard(self, obj):
+        if obj.standard_id is None:
+            return None
+        trees = self.context.get("standard_trees")
+        if trees is not None and str(obj.standard_id) in trees:
+            return trees[str(obj.standard_id)]
+        from .snapshots import get_standard_tree
+        return get_standard_tree(obj.standard_id)
+
     def get_organization_type(self, obj):
         try:
             return obj.organization.organization_type.name
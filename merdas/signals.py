@@ -0,0 +1,71 @@
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.db.models import Q
+from django.dispatch import receiver
+
+from .models import Standard, FR, SR, Question
+from .snapshots import bump_standard_versions
+from .questionnaire import bump_question_versions
+
+
+@receiver([post_save, post_delete], sender=Standard)
+def invalidate_tree_on_standard_change(sender, instance, **kwargs):
+    bump_standard_versions([instance.pk])
+
+
+@receiver(post_save, sender=FR)
+@receiver(pre_delete, sender=FR)
+def invalidate_tree_on_fr_change(sender, instance, **kwargs):
+    # pre_delete: بعد از حذف، اتصال‌های M2M دیگر قابل پیدا کردن نیستند
+    bump_standard_versions(instance.standards.values_list("pk", flat=True))
+    # پرسش‌نامه‌ها FR سوال را هم (حتی اگر به استاندارد وصل نباشد) در خود دارند
+    bump_question_versions(instance.questions.values_list("standard_id", flat=True).distinct())
+
+
+@receiver(post_save, sender=SR)
+@receiver(pre_delete, sender=SR)
+def invalidate_tree_on_sr_change(sender, instance, **kwargs):
+    bump_standard_versions(Standard.objects.filter(fr__sr=instance).values_list("pk", flat=True))
+    bump_question_versions(
+        Question.objects.filter(Q(sr=instance) | Q(fr__sr=instance)).values_list("standard_id", flat=True).distinct()
+    )
+
+
+@receiver(m2m_changed, sender=Standard.fr.through)
+def invalidate_tree_on_standard_frs(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:  # standard.fr.add/remove/clear
+        bump_standard_versions([instance.pk])
+    elif action == "pre_clear":  # fr.standards.clear()
+        bump_standard_versions(instance.standards.values_list("pk", flat=True))
+    else:
+        bump_standard_versions(pk_set or ())
+
+
+@receiver(m2m_changed, sender=FR.sr.through)
+def invalidate_tree_on_fr_srs(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:  # fr.sr.add/remove/clear
+        frs = [instance.pk]
+    elif action == "pre_clear":  # sr.fr.clear()
+        frs = list(instance.fr.values_list("pk", flat=True))
+    else:
+        frs = list(pk_set or ())
+    bump_standard_versions(Standard.objects.filter(fr__in=frs).values_list("pk", flat=True))
+    bump_question_versions(Question.objects.filter(fr__in=frs).values_list("standard_id", flat=True).distinct())
+
+
+@receiver(pre_save, sender=Question)
+def invalidate_questionnaire_on_question_move(sender, instance, raw=False, **kwargs):
+    # سوالی که به استاندارد دیگری منتقل می‌شود پرسش‌نامه‌ی استاندارد قبلی را هم عوض می‌کند
+    if raw or instance._state.adding:
+        return
+    previous = Question.objects.filter(pk=instance.pk).values_list("standard_id", flat=True).first()
+    if previous is not None and previous != instance.standard_id:
+        bump_question_versions([previous])
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_questionnaire_on_question_change(sender, instance, **kwargs):
+    bump_question_versions([instance.standard_id])
@@ -0,0 +1,71 @@
+"""
+snapshot کامپایل‌شده‌ی درخت Standard → FR → SR.
+
+هر استاندارد یک نسخه‌ی جدا در Redis دارد (standard_tree_version:<id>) که با هر تغییر خود استاندارد،
+FR ها، SR ها یا اتصال‌های بین آن‌ها (merdas.signals) بعد از commit بالا می‌رود. snapshot زیر همان
+نسخه کش می‌شود و تا تغییر بعدی دست نمی‌خورد؛ ساختن چند snapshot با هم فقط سه کوئری است.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from core.cache import get_versions, bump_version_on_commit
+from .models import Standard, FR, SR
+from .serializers import StandardSerializer
+
+STANDARD_VERSION_KEY = "standard_tree_version:{pk}"
+STANDARD_TREE_KEY = "standard_tree:{pk}:v{version}"
+STANDARD_TREE_TIMEOUT = getattr(settings, "STANDARD_TREE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def bump_standard_versions(standard_ids):
+    for pk in set(standard_ids):
+        bump_version_on_commit(STANDARD_VERSION_KEY.format(pk=pk))
+
+
+def standard_etag(pk, version):
+    return f'"std-{pk}-{version}"'
+
+
+def _tree_queryset():
+    # ترتیب ثابت تا snapshot (و ETag) بین بازسازی‌ها پایدار بماند
+    return Standard.objects.prefetch_related(
+        Prefetch("fr", queryset=FR.objects.order_by("created_at", "id").prefetch_related(
+            Prefetch("sr", queryset=SR.objects.order_by("created_at", "id"))
+        ))
+    )
+
+
+def build_standard_trees(versions):
+    """versions: {standard_id: version} → {standard_id: snapshot}"""
+    trees = {}
+    for standard in _tree_queryset().filter(pk__in=list(versions)):
+        pk = str(standard.pk)
+        trees[pk] = {**StandardSerializer(standard).data, "version": versions[pk]}
+    return trees
+
+
+def get_standard_trees(standard_ids):
+    """
+    snapshot چند استاندارد با یک get_many برای نسخه‌ها و یکی برای داده‌ها؛
+    فقط موارد غایب (یک‌جا) از دیتابیس ساخته می‌شوند. خروجی: {standard_id: snapshot}
+    """
+    ids = list(dict.fromkeys(str(pk) for pk in standard_ids))
+    if not ids:
+        return {}
+    versions = get_versions(STANDARD_VERSION_KEY.format(pk=pk) for pk in ids)
+    versions = {pk: versions[STANDARD_VERSION_KEY.format(pk=pk)] for pk in ids}
+    keys = {pk: STANDARD_TREE_KEY.format(pk=pk, version=v) for pk, v in versions.items()}
+
+    found = cache.get_many(keys.values())
+    trees = {pk: found[key] for pk, key in keys.items() if key in found}
+    missing = {pk: versions[pk] for pk in ids if pk not in trees}
+    if missing:
+        built = build_standard_trees(missing)
+        cache.set_many({keys[pk]: tree for pk, tree in built.items()}, timeout=STANDARD_TREE_TIMEOUT)
+        trees.update(built)
+    return trees
+
+
+def get_standard_tree(standard_id):
+    return get_standard_trees([standard_id]).get(str(standard_id))
@@ -0,0 +1,503 @@
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .answers import apply_answers
+from .models import Standard, FR, SR, Question, Assessment, Answer, AnswerReference, ComplianceScore
+from .questionnaire import build_questionnaire
+from .snapshots import get_standard_tree
+from .serializers import AUTOSAVE_MAX_ANSWERS, AssessmentSerializer, QuestionSerializer
+from .scoring import COUNT_FIELDS, compute_scores, update_scores, overall_score, score_report, scoring_version
+
+User = get_user_model()
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class AssessmentFixtureMixin:
+    """
+    استاندارد با دو FR:
+      FR1 (وزن ۳) → SR a با چهار سوال Low
+      FR2 (وزن ۱) → SR b با دو سوال Low و یک سوال High (خارج از SAL=Low)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="assessor", is_superuser=True)
+        cls.other_user = User.objects.create(username="other", is_superuser=True)
+        cls.sr_a = SR.objects.create(title="SR a")
+        cls.sr_b = SR.objects.create(title="SR b")
+        cls.fr1 = FR.objects.create(title="FR1", weight=3)
+        cls.fr2 = FR.objects.create(title="FR2", weight=1)
+        cls.fr1.sr.add(cls.sr_a)
+        cls.fr2.sr.add(cls.sr_b)
+        cls.standard = Standard.objects.create(title="ISA")
+        cls.standard.fr.add(cls.fr1, cls.fr2)
+
+        def question(title, fr, sr, level=Question.QuestionLevel.low):
+            return Question.objects.create(title=title, standard=cls.standard, fr=fr, sr=sr, question_level=level)
+
+        cls.q1, cls.q2, cls.q3, cls.q4 = (question(f"q{i}", cls.fr1, cls.sr_a) for i in range(1, 5))
+        cls.q5, cls.q6 = (question(f"q{i}", cls.fr2, cls.sr_b) for i in range(5, 7))
+        cls.q7 = question("q7", cls.fr2, cls.sr_b, level=Question.QuestionLevel.high)
+
+    def setUp(self):
+        self.assessment = Assessment.objects.create(
+            name="A1", standard=self.standard, overall_sal=Assessment.QuestionLevel.low, created_by=self.user,
+        )
+
+    def answer(self, question, value, **extra):
+        return Answer.objects.create(
+            assessment=self.assessment, question=question, answer=value, owner=self.user, **extra,
+        )
+
+    def answer_all(self):
+        self.answer(self.q1, Answer.AnswerChoices.YES)
+        self.answer(self.q2, Answer.AnswerChoices.NO)
+        self.answer(self.q3, Answer.AnswerChoices.NA)
+        self.answer(self.q4, Answer.AnswerChoices.ALT, substitute_text="کنترل جایگزین")
+        self.answer(self.q5, Answer.AnswerChoices.YES)
+        # q6 بی‌پاسخ و q7 خارج از SAL
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StandardSnapshotTests(AssessmentFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def tree(self):
+        return get_standard_tree(self.standard.pk)
+
+    @staticmethod
+    def sr_titles(tree):
+        return {fr["title"]: [sr["title"] for sr in fr["sr"]] for fr in tree["fr"]}
+
+    def test_snapshot_is_cached_until_changed(self):
+        first = self.tree()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tree(), first)
+
+    def test_fr_sr_add_and_remove_invalidate(self):
+        before = self.tree()
+        extra = SR.objects.create(title="SR z")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fr1.sr.add(extra)
+        after = self.tree()
+        self.assertNotEqual(after["version"], before["version"])
+        self.assertEqual(self.sr_titles(after)["FR1"], ["SR a", "SR z"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extra.fr.remove(self.fr1)  # سمت معکوس M2M
+        self.assertEqual(self.sr_titles(self.tree())["FR1"], ["SR a"])
+
+    def test_reverse_clear_invalidates(self):
+        self.tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sr_b.fr.clear()
+        self.assertEqual(self.sr_titles(self.tree())["FR2"], [])
+
+    def test_standard_fr_changes_invalidate(self):
+        self.tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.standard.fr.remove(self.fr2)
+        self.assertEqual([fr["title"] for fr in self.tree()["fr"]], ["FR1"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fr2.standards.add(self.standard)
+        self.assertEqual([fr["title"] for fr in self.tree()["fr"]], ["FR1", "FR2"])
+
+    def test_sr_edit_invalidates(self):
+        self.tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sr_a.title = "SR a2"
+            self.sr_a.save()
+        self.assertEqual(self.sr_titles(self.tree())["FR1"], ["SR a2"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuestionnaireTests(AssessmentFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_grouping_and_sal_filter(self):
+        data = build_questionnaire(self.standard.pk, "Low")
+
+        self.assertEqual([fr["fr_id"] for fr in data], [self.fr1.pk, self.fr2.pk])
+        titles = [[q["title"] for q in sr["questions"]] for fr in data for sr in fr["srs"]]
+        self.assertEqual(titles, [["q1", "q2", "q3", "q4"], ["q5", "q6"]])
+        self.assertEqual(len(build_questionnaire(self.standard.pk, "High")[1]["srs"][0]["questions"]), 3)
+
+    def test_question_shape_follows_question_serializer(self):
+        question = build_questionnaire(self.standard.pk, "Low")[0]["srs"][0]["questions"][0]
+        expected = QuestionSerializer(self.q1).data
+
+        self.assertEqual(list(question), list(expected))
+        for key in ("id", "title", "description", "question_level"):
+            self.assertEqual(question[key], expected[key])
+
+    def test_embedded_srs_are_ordered(self):
+        later = SR.objects.create(title="SR z")
+        self.fr1.sr.add(later)
+
+        question = build_questionnaire(self.standard.pk, "Low")[0]["srs"][0]["questions"][0]
+
+        self.assertEqual([sr["id"] for sr in question["fr"]["sr"]], [str(self.sr_a.pk), str(later.pk)])
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    @staticmethod
+    def upload(name="ref.pdf", content=b"%PDF-1.4"):
+        return SimpleUploadedFile(name, content, content_type="application/pdf")
+
+    def reference(self, answer, title):
+        return AnswerReference.objects.create(answer=answer, title=title, file=self.upload())
+
+
+class ScoringTests(AssessmentFixtureMixin, TestCase):
+    def scores(self):
+        return sorted(
+            (row.level, str(row.fr_id), str(row.sr_id), row.score, row.weight,
+             *(getattr(row, f) for f in COUNT_FIELDS))
+            for row in ComplianceScore.objects.filter(assessment=self.assessment)
+        )
+
+    def row(self, level, **filters):
+        return ComplianceScore.objects.get(assessment=self.assessment, level=level, **filters)
+
+    def test_sr_counts_yes_alternate_over_applicable(self):
+        self.answer_all()
+        compute_scores(self.assessment)
+
+        sr_a = self.row(ComplianceScore.Level.SR, fr=self.fr1, sr=self.sr_a)
+        self.assertEqual(
+            (sr_a.total, sr_a.yes, sr_a.no, sr_a.alternate, sr_a.not_applicable, sr_a.unanswered),
+            (4, 1, 1, 1, 1, 0),
+        )
+        # (yes + alternate) / (total − N/A) = 2 / 3
+        self.assertEqual(sr_a.score, 66.67)
+
+        sr_b = self.row(ComplianceScore.Level.SR, fr=self.fr2, sr=self.sr_b)
+        # سوال High در SAL=Low شمرده نمی‌شود و سوال بی‌پاسخ عدم انطباق است
+        self.assertEqual((sr_b.total, sr_b.yes, sr_b.unanswered), (2, 1, 1))
+        self.assertEqual(sr_b.score, 50.0)
+
+    def test_overall_is_weighted_by_fr_weight(self):
+        self.answer_all()
+        compute_scores(self.assessment)
+
+        fr1 = self.row(ComplianceScore.Level.FR, fr=self.fr1)
+        fr2 = self.row(ComplianceScore.Level.FR, fr=self.fr2)
+        self.assertEqual((fr1.score, fr1.weight), (66.67, 3))
+        self.assertEqual((fr2.score, fr2.weight), (50.0, 1))
+
+        overall = overall_score(self.assessment)
+        self.assertAlmostEqual(overall["score"], (66.67 * 3 + 50.0 * 1) / 4, places=2)
+        self.assertEqual(overall["weight"], 4)
+        self.assertEqual((overall["total"], overall["yes"], overall["unanswered"]), (6, 2, 1))
+
+    def test_fr_without_applicable_questions_is_left_out_of_overall(self):
+        for q in (self.q1, self.q2, self.q3, self.q4):
+            self.answer(q, Answer.AnswerChoices.NA)
+        self.answer(self.q5, Answer.AnswerChoices.YES)
+        self.answer(self.q6, Answer.AnswerChoices.YES)
+        compute_scores(self.assessment)
+
+        self.assertIsNone(self.row(ComplianceScore.Level.FR, fr=self.fr1).score)
+        overall = overall_score(self.assessment)
+        self.assertEqual((overall["score"], overall["weight"]), (100.0, 1))
+
+    def test_incremental_update_matches_full_compute(self):
+        self.answer_all()
+        compute_scores(self.assessment)
+
+        Answer.objects.filter(assessment=self.assessment, question=self.q2).update(answer=Answer.AnswerChoices.YES)
+        self.answer(self.q6, Answer.AnswerChoices.NO)
+        update_scores(self.assessment, [self.q2.pk, self.q6.pk])
+        incremental = self.scores()
+
+        compute_scores(self.assessment)
+        self.assertEqual(incremental, self.scores())
+
+    def test_version_survives_cache_loss(self):
+        self.answer_all()
+        with override_settings(CACHES=LOCMEM_CACHES):
+            version = compute_scores(self.assessment)
+            cache.clear()
+            self.assertEqual(scoring_version(self.assessment), version)
+
+    def test_question_change_forces_full_recompute(self):
+        self.answer_all()
+        version = compute_scores(self.assessment)
+
+        Question.objects.create(
+            title="q8", standard=self.standard, fr=self.fr1, sr=self.sr_a, question_level=Question.QuestionLevel.low,
+        )
+        self.assertNotEqual(scoring_version(self.assessment), version)
+        # پاسخ q8 در به‌روزرسانی نیست؛ فقط محاسبه‌ی کامل آن را به‌عنوان بی‌پاسخ می‌شمارد
+        update_scores(self.assessment, [self.q5.pk])
+        sr_a = self.row(ComplianceScore.Level.SR, fr=self.fr1, sr=self.sr_a)
+        self.assertEqual((sr_a.total, sr_a.unanswered), (5, 1))
+        self.assertEqual(self.row(ComplianceScore.Level.OVERALL).version, scoring_version(self.assessment))
+
+    def test_fr_weight_change_invalidates_version(self):
+        version = compute_scores(self.assessment)
+        FR.objects.filter(pk=self.fr2.pk).update(weight=5)
+        self.assertNotEqual(scoring_version(self.assessment), version)
+
+    def test_score_report_computes_missing_scores(self):
+        self.answer_all()
+        report = score_report(self.assessment)
+
+        self.assertEqual([fr["fr_id"] for fr in report["frs"]], [self.fr1.pk, self.fr2.pk])
+        self.assertEqual([sr["sr_id"] for sr in report["frs"][0]["srs"]], [self.sr_a.pk])
+        self.assertEqual(report["overall"]["weight"], 4)
+
+
+class AnswerWriteTests(MediaRootMixin, AssessmentFixtureMixin, TestCase):
+    def save_responses(self, responses, instance=None):
+        serializer = AssessmentSerializer(
+            instance or self.assessment, data={"responses": responses}, partial=True,
+            context={"request": SimpleNamespace(user=self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_only_changed_answers_are_written(self):
+        same = self.answer(self.q1, Answer.AnswerChoices.YES)
+        changed = self.answer(self.q2, Answer.AnswerChoices.NO)
+
+        result = apply_answers(self.assessment, [
+            {"question_id": self.q1.pk, "answer": Answer.AnswerChoices.YES},
+            {"question_id": self.q2.pk, "answer": Answer.AnswerChoices.YES},
+            {"question_id": self.q5.pk, "answer": Answer.AnswerChoices.NO},
+        ], self.user)
+
+        self.assertEqual(result, [self.q2.pk, self.q5.pk])
+        same_after = Answer.objects.get(pk=same.pk)
+        changed_after = Answer.objects.get(pk=changed.pk)
+        self.assertEqual(same_after.updated_at, same.updated_at)
+        self.assertEqual(changed_after.answer, Answer.AnswerChoices.YES)
+        self.assertGreater(changed_after.updated_at, changed.updated_at)
+        self.assertTrue(Answer.objects.filter(assessment=self.assessment, question=self.q5).exists())
+
+    def test_reference_diff(self):
+        answer = self.answer(self.q1, Answer.AnswerChoices.YES)
+        kept = self.reference(answer, "kept")
+        retitled = self.reference(answer, "old title")
+        replaced = self.reference(answer, "replaced")
+        dropped = self.reference(answer, "dropped")
+
+        self.save_responses([{
+            "question": str(self.q1.pk),
+            "answer": Answer.AnswerChoices.YES,
+            "references": [
+                {"id": str(kept.pk), "title": "kept"},
+                {"id": str(retitled.pk), "title": "new title"},
+                {"id": str(replaced.pk), "title": "replaced", "file": self.upload("v2.pdf")},
+                {"title": "added", "file": self.upload("new.pdf")},
+            ],
+        }])
+
+        refs = {r.title: r for r in AnswerReference.objects.filter(answer=answer)}
+        self.assertEqual(set(refs), {"kept", "new title", "replaced", "added"})
+        # نگه‌داشته: همان ردیف بدون نوشتن
+        self.assertEqual(refs["kept"].pk, kept.pk)
+        self.assertEqual(refs["kept"].updated_at, kept.updated_at)
+        # فقط عنوان: همان ردیف و همان فایل
+        self.assertEqual(refs["new title"].pk, retitled.pk)
+        self.assertEqual(refs["new title"].file.name, retitled.file.name)
+        # فایل جدید: ردیف جدید جای قبلی را می‌گیرد
+        self.assertNotEqual(refs["replaced"].pk, replaced.pk)
+        self.assertIn("v2", refs["replaced"].file.name)
+        self.assertFalse(AnswerReference.objects.filter(pk__in=[replaced.pk, dropped.pk]).exists())
+
+    def test_answer_without_references_keeps_them(self):
+        answer = self.answer(self.q1, Answer.AnswerChoices.YES)
+        ref = self.reference(answer, "kept")
+
+        self.save_responses([{"question": str(self.q1.pk), "answer": Answer.AnswerChoices.NO}])
+
+        self.assertTrue(AnswerReference.objects.filter(pk=ref.pk).exists())
+
+    def test_foreign_and_duplicate_reference_ids_are_rejected_per_item(self):
+        answer = self.answer(self.q1, Answer.AnswerChoices.YES)
+        own = self.reference(answer, "own")
+        other_assessment = Assessment.objects.create(name="A2", standard=self.standard, created_by=self.user)
+        foreign = self.reference(
+            Answer.objects.create(assessment=other_assessment, question=self.q1, answer="yes", owner=self.user),
+            "foreign",
+        )
+        # مرجع پاسخ همین ارزیابی ولی سوال دیگر هم متعلق به این پاسخ نیست
+        sibling = self.reference(self.answer(self.q2, Answer.AnswerChoices.NO), "sibling")
+
+        serializer = AssessmentSerializer(self.assessment, data={"responses": [{
+            "question": str(self.q1.pk),
+            "answer": Answer.AnswerChoices.YES,
+            "references": [
+                {"id": str(own.pk), "title": "own"},
+                {"id": str(foreign.pk), "title": "foreign"},
+                {"id": str(own.pk), "title": "own again"},
+                {"id": str(sibling.pk), "title": "sibling"},
+            ],
+        }]}, partial=True, context={"request": SimpleNamespace(user=self.user)})
+
+        self.assertFalse(serializer.is_valid())
+        errors = serializer.errors["responses"][0]["references"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("id", errors[1])
+        self.assertIn("id", errors[2])
+        self.assertIn("id", errors[3])
+        self.assertEqual(AnswerReference.objects.get(pk=own.pk).title, "own")
+
+    def test_reference_id_on_create_is_rejected(self):
+        answer = self.answer(self.q1, Answer.AnswerChoices.YES)
+        ref = self.reference(answer, "existing")
+
+        serializer = AssessmentSerializer(data={"name": "A3", "standard": str(self.standard.pk), "responses": [{
+            "question": str(self.q1.pk),
+            "answer": Answer.AnswerChoices.YES,
+            "references": [{"id": str(ref.pk), "title": "existing"}],
+        }]}, context={"request": SimpleNamespace(user=self.user)})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("id", serializer.errors["responses"][0]["references"][0])
+
+    def test_new_reference_requires_file(self):
+        serializer = AssessmentSerializer(self.assessment, data={"responses": [{
+            "question": str(self.q1.pk),
+            "answer": Answer.AnswerChoices.YES,
+            "references": [{"title": "no file"}],
+        }]}, partial=True, context={"request": SimpleNamespace(user=self.user)})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("file", serializer.errors["responses"][0]["references"][0])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnswerAutosaveTests(MediaRootMixin, AssessmentFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def patch(self, answers, assessment=None):
+        url = reverse("assessment-answers", args=[(assessment or self.assessment).pk])
+        return self.client.patch(url, {"answers": answers}, format="json")
+
+    def test_new_answer_requires_answer_value(self):
+        response = self.patch([{"question": str(self.q1.pk), "comment": "بعداً"}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("answer", response.data["errors"]["answers"][0])
+        self.assertFalse(Answer.objects.filter(assessment=self.assessment).exists())
+
+    def test_missing_fields_keep_stored_values(self):
+        self.answer(self.q1, Answer.AnswerChoices.NO, comment="یادداشت")
+
+        response = self.patch([{"question": str(self.q1.pk), "reviewed": True}])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stored = Answer.objects.get(assessment=self.assessment, question=self.q1)
+        self.assertEqual((stored.answer, stored.comment, stored.reviewed), (Answer.AnswerChoices.NO, "یادداشت", True))
+
+    def test_alternate_uses_stored_substitute_text(self):
+        self.answer(self.q1, Answer.AnswerChoices.NO, substitute_text="کنترل جایگزین")
+        self.answer(self.q2, Answer.AnswerChoices.NO)
+
+        ok = self.patch([{"question": str(self.q1.pk), "answer": Answer.AnswerChoices.ALT}])
+        self.assertEqual(ok.status_code, status.HTTP_200_OK)
+
+        missing = self.patch([{"question": str(self.q2.pk), "answer": Answer.AnswerChoices.ALT}])
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("substitute_text", missing.data["errors"]["answers"][0])
+
+        cleared = self.patch([{"question": str(self.q1.pk), "substitute_text": ""}])
+        self.assertEqual(cleared.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_answer_count_is_capped(self):
+        answers = [{"question": str(self.q1.pk), "answer": Answer.AnswerChoices.YES}] * (AUTOSAVE_MAX_ANSWERS + 1)
+
+        response = self.patch(answers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("answers", response.data["errors"])
+
+    def test_response_carries_incremental_score(self):
+        self.answer_all()
+        compute_scores(self.assessment)
+
+        response = self.patch([{"question": str(self.q2.pk), "answer": Answer.AnswerChoices.YES}])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([a["question"] for a in response.data["data"]["answers"]], [str(self.q2.pk)])
+        # SR a: (yes ۲ + alternate ۱) / ۳ = ۱۰۰ و SR b: ۵۰ → (۱۰۰×۳ + ۵۰×۱) / ۴
+        self.assertEqual(response.data["data"]["score"]["score"], 87.5)
+        compute_scores(self.assessment)
+        self.assertEqual(response.data["data"]["score"], overall_score(self.assessment))
+
+    def test_other_users_assessment_is_not_found(self):
+        other = Assessment.objects.create(name="A2", standard=self.standard, created_by=self.other_user)
+
+        response = self.patch([{"question": str(self.q1.pk), "answer": Answer.AnswerChoices.YES}], other)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Answer.objects.filter(assessment=other).exists())
+
+    def reference_url(self, assessment, question, ref=None):
+        if ref is None:
+            return reverse("answer-references", args=[assessment.pk, question.pk])
+        return reverse("answer-reference-detail", args=[assessment.pk, question.pk, ref.pk])
+
+    def test_reference_post_requires_own_answer(self):
+        self.answer(self.q1, Answer.AnswerChoices.YES)
+        other = Assessment.objects.create(name="A2", standard=self.standard, created_by=self.other_user)
+        Answer.objects.create(assessment=other, question=self.q1, answer="yes", owner=self.other_user)
+
+        created = self.client.post(self.reference_url(self.assessment, self.q1),
+                                   {"title": "سند", "file": self.upload()}, format="multipart")
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+
+        foreign = self.client.post(self.reference_url(other, self.q1),
+                                   {"title": "سند", "file": self.upload()}, format="multipart")
+        self.assertEqual(foreign.status_code, status.HTTP_404_NOT_FOUND)
+
+        unanswered = self.client.post(self.reference_url(self.assessment, self.q2),
+                                      {"title": "سند", "file": self.upload()}, format="multipart")
+        self.assertEqual(unanswered.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(AnswerReference.objects.count(), 1)
+
+    def test_reference_delete_requires_own_answer(self):
+        own = self.reference(self.answer(self.q1, Answer.AnswerChoices.YES), "own")
+        other = Assessment.objects.create(name="A2", standard=self.standard, created_by=self.other_user)
+        foreign = self.reference(
+            Answer.objects.create(assessment=other, question=self.q1, answer="yes", owner=self.other_user), "foreign",
+        )
+
+        response = self.client.delete(self.reference_url(other, self.q1, foreign))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # شناسه‌ی درست زیر مسیر سوال دیگر هم پیدا نمی‌شود
+        response = self.client.delete(self.reference_url(self.assessment, self.q2, own))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(AnswerReference.objects.count(), 2)
+
+        response = self.client.delete(self.reference_url(self.assessment, self.q1, own))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(AnswerReference.objects.filter(pk=own.pk).exists())
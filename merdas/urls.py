@@ -19,6 +19,12 @@ urlpatterns = [
 
     path('assessments/', AssessmentCreateView.as_view(), name='assessment-create'),
     path('assessments/<uuid:pk>/', AssessmentUpdateView.as_view(), name='assessment-update'),
+    path('assessments/<uuid:pk>/scores/', AssessmentScoreView.as_view(), name='assessment-scores'),
+    path('assessments/<uuid:pk>/answers/', AssessmentAnswersView.as_view(), name='assessment-answers'),
+    path('assessments/<uuid:pk>/answers/<uuid:question_id>/references/',
+         AnswerReferenceView.as_view(), name='answer-references'),
+    path('assessments/<uuid:pk>/answers/<uuid:question_id>/references/<uuid:ref_id>/',
+         AnswerReferenceView.as_view(), name='answer-reference-detail'),
 
     path('questions/upload-csv-by-title/', QuestionCSVUploadByTitleView.as_view(), name='upload_questions_by_title'),
     path('questions/template-csv/', QuestionCSVTemplateDownloadView.as_view(), name='download_questions_csv_template')
@@ -4,17 +4,20 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import SR, FR, Standard, Assessment
+from .models import SR, FR, Standard, Assessment, Answer, AnswerReference
 from .serializers import *
-from core.utils import CustomResponse
+from core.utils import CustomResponse, etag_matches, not_modified, with_etag
+from core.cache import get_version
 from drf_spectacular.utils import extend_schema
 from core.persian_response import *
-from collections import defaultdict
 import csv
 import codecs
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
 from io import StringIO
 from django.http import HttpResponse
+from .questionnaire import get_questionnaire, questionnaire_etag, questionnaire_version
+from .scoring import overall_score, score_report
+from .snapshots import STANDARD_VERSION_KEY, get_standard_trees, get_standard_tree, standard_etag
 
 
 class SRListCreateView(APIView):
@@ -126,9 +129,9 @@ class StandardListCreateView(APIView):
 
     @extend_schema(responses=StandardSerializer)
     def get(self, request):
-        standard = Standard.objects.all()
-        serializer = StandardSerializer(standard, many=True)
-        return CustomResponse.success(message=get_all_data(), data=serializer.data)
+        ids = [str(pk) for pk in Standard.objects.order_by("created_at", "id").values_list("pk", flat=True)]
+        trees = get_standard_trees(ids)
+        return CustomResponse.success(message=get_all_data(), data=[trees[pk] for pk in ids if pk in trees])
 
     @extend_schema(responses=StandardSerializer, request=StandardCreateSerializer)
     def post(self, request):
@@ -144,12 +147,14 @@ class StandardDetailView(APIView):
 
     @extend_schema(responses=StandardSerializer)
     def get(self, request, pk):
-        try:
-            standard = Standard.objects.get(pk=pk)
-        except Standard.DoesNotExist:
+        # نسخه فقط از Redis؛ اگر کلاینت همین نسخه را دارد بدون کوئری 304 برمی‌گردد
+        etag = standard_etag(pk, get_version(STANDARD_VERSION_KEY.format(pk=pk)))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        tree = get_standard_tree(pk)
+        if tree is None:
             return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
-        serializer = StandardSerializer(standard)
-        return CustomResponse.success(message=get_single_data(), data=serializer.data)
+        return with_etag(CustomResponse.success(message=get_single_data(), data=tree), standard_etag(pk, tree["version"]))
 
     @extend_schema(responses=StandardSerializer, request=StandardCreateSerializer)
     def put(self, request, pk):
@@ -228,55 +233,30 @@ class QuestionDetailView(APIView):
 class QuestionsGroupedByFRSRView(APIView):
     queryset = Question.objects.all()
 
-    LEVEL_ORDER = {
-        "Low": 0,
-        "Moderate": 1,
-        "High": 2,
-        "Very High": 3,
-    }
+    def _questionnaire(self, request, data, message):
+        serializer = QuestionFRSRSerializer(data=data)
+        if not serializer.is_valid():
+            return CustomResponse.error("ناموفق", errors=serializer.errors)
+        standard_id = serializer.validated_data["standard_id"]
+        overall_sal = serializer.validated_data["overall_sal"]
+
+        # نسخه‌ها فقط از Redis؛ اگر کلاینت همین نسخه را دارد بدون ساختن پرسش‌نامه 304 برمی‌گردد
+        if request.method == "GET":
+            etag = questionnaire_etag(standard_id, overall_sal, questionnaire_version(standard_id))
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        result, etag = get_questionnaire(standard_id, overall_sal)
+        if result is None:
+            return CustomResponse.error(message="داده مورد نظر یافت نشد", status=status.HTTP_404_NOT_FOUND)
+        return with_etag(CustomResponse.success(message=message, data=result), etag)
+
+    @extend_schema(parameters=[QuestionFRSRSerializer])
+    def get(self, request):
+        return self._questionnaire(request, request.query_params, get_all_data())
 
     @extend_schema(request=QuestionFRSRSerializer)
     def post(self, request):
-        standard_id = request.data.get("standard_id")
-        overall_sal = request.data.get("overall_sal")
-
-        if not standard_id or not overall_sal:
-            return CustomResponse.error("standard_id and overall_sal are required")
-
-        level_threshold = self.LEVEL_ORDER.get(overall_sal)
-        if level_threshold is None:
-            return CustomResponse.error("Invalid overall_sal value")
-
-        allowed_levels = [level for level, rank in self.LEVEL_ORDER.items() if rank <= level_threshold]
-
-        questions = Question.objects.filter(
-            standard_id=standard_id,
-            question_level__in=allowed_levels
-        ).select_related('fr', 'sr')
-
-        # گروه‌بندی: FR -> SR -> سوال‌ها
-        fr_map = defaultdict(lambda: defaultdict(list))
-
-        for q in questions:
-            fr_map[(q.fr.id, q.fr.title)][(q.sr.id, q.sr.title)].append(q)
-
-        # تبدیل به ساختار JSON
-        result = []
-        for (fr_id, fr_title), sr_dict in fr_map.items():
-            sr_list = []
-            for (sr_id, sr_title), q_list in sr_dict.items():
-                sr_list.append({
-                    "sr_id": sr_id,
-                    "sr": sr_title,
-                    "questions": QuestionSerializer(q_list, many=True).data
-                })
-            result.append({
-                "fr_id": fr_id,
-                "fr": fr_title,
-                "srs": sr_list
-            })
-
-        return CustomResponse.success(message=create_data(), data=result)
+        return self._questionnaire(request, request.data, create_data())
 
 
 class AssessmentCreateView(APIView):
@@ -286,7 +266,8 @@ class AssessmentCreateView(APIView):
     @extend_schema(responses=AssessmentReadSerializer)
     def get(self, request):
         qs = Assessment.objects.filter(created_by=request.user)
-        serializer = AssessmentReadSerializer(qs, many=True)
+        trees = get_standard_trees({a.standard_id for a in qs if a.standard_id})
+        serializer = AssessmentReadSerializer(qs, many=True, context={"standard_trees": trees})
         return CustomResponse.success(message=get_all_data(), data=serializer.data)
 
     @extend_schema(request=AssessmentSerializer)
@@ -332,6 +313,69 @@ class AssessmentUpdateView(APIView):
         return CustomResponse.success(message=delete_data(), status=status.HTTP_204_NO_CONTENT)
 
 
+class AssessmentScoreView(APIView):
+    queryset = Assessment.objects.all()
+
+    def get(self, request, pk):
+        try:
+            assessment = Assessment.objects.get(created_by=request.user, pk=pk)
+        except Assessment.DoesNotExist:
+            return CustomResponse.error("یافت نشد", status=status.HTTP_404_NOT_FOUND)
+        report = score_report(assessment)
+        if report is None:
+            return CustomResponse.error("برای این ارزیابی استانداردی انتخاب نشده است")
+        return CustomResponse.success(message=get_single_data(), data=report)
+
+
+class AssessmentAnswersView(APIView):
+    """autosave سبک: فقط پاسخ‌های تغییرکرده به شکل JSON؛ فایل مراجع از AnswerReferenceView"""
+    parser_classes = (JSONParser,)
+    queryset = Assessment.objects.all()
+
+    @extend_schema(request=AnswerPatchSerializer, responses=AnswerSerializer)
+    def patch(self, request, pk):
+        try:
+            assessment = Assessment.objects.get(created_by=request.user, pk=pk)
+        except Assessment.DoesNotExist:
+            return CustomResponse.error("یافت نشد", status=status.HTTP_404_NOT_FOUND)
+        serializer = AnswerPatchSerializer(data=request.data, context={'request': request, 'assessment': assessment})
+        if not serializer.is_valid():
+            return CustomResponse.error("ناموفق", errors=serializer.errors)
+        answers = serializer.save()
+        return CustomResponse.success(update_data(), data={
+            "answers": AnswerSerializer(answers, many=True).data,
+            "score": overall_score(assessment),
+        })
+
+
+class AnswerReferenceView(APIView):
+    parser_classes = (MultiPartParser,)
+    queryset = AnswerReference.objects.all()
+
+    @extend_schema(request=AnswerReferenceSerializer, responses=AnswerReferenceSerializer)
+    def post(self, request, pk, question_id):
+        try:
+            answer = Answer.objects.get(assessment__created_by=request.user, assessment_id=pk, question_id=question_id)
+        except Answer.DoesNotExist:
+            return CustomResponse.error("پاسخی برای این سوال ثبت نشده است", status=status.HTTP_404_NOT_FOUND)
+        serializer = AnswerReferenceSerializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.error("ناموفق", errors=serializer.errors)
+        if serializer.validated_data.get('id') is not None:
+            return CustomResponse.error("ناموفق", errors={"id": ["برای مرجع جدید id ارسال نکنید"]})
+        serializer.save(answer=answer)
+        return CustomResponse.success(create_data(), data=serializer.data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, pk, question_id, ref_id):
+        deleted, _ = AnswerReference.objects.filter(
+            pk=ref_id, answer__question_id=question_id,
+            answer__assessment_id=pk, answer__assessment__created_by=request.user,
+        ).delete()
+        if not deleted:
+            return CustomResponse.error("یافت نشد", status=status.HTTP_404_NOT_FOUND)
+        return CustomResponse.success(message=delete_data(), status=status.HTTP_204_NO_CONTENT)
+
+
 class QuestionCSVUploadByTitleView(APIView):
     parser_classes = [MultiPartParser]
     queryset = Question.objects.all()